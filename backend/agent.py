@@ -1,14 +1,17 @@
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.agents import AgentExecutor, create_react_agent
 from react_template import get_react_prompt_template
-from langchain_groq import ChatGroq
-from langchain_ollama import ChatOllama
-from langchain_google_genai import ChatGoogleGenerativeAI
 from tools.mytools import *
+from tools import parallel
+from prompt_budget import budgeted_react_agent, usage_scope
+import registry
+import telemetry
+import llm_guard
+import os
 # no warnings
 import warnings
 import sys
+import io
+from contextlib import redirect_stdout
 warnings.filterwarnings("ignore")
 
 
@@ -18,28 +21,57 @@ warnings.filterwarnings("ignore")
 # load environment variables
 load_dotenv()
 
-# Choose the LLM to use
-llm = ChatGroq(model="llama-3.3-70b-versatile")
-
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro")
-
 # set my message
 query = """ Should I invest in Cipla pharmaceuticals? """
 
-# set the tools
-tools = [add, subtract, multiply, divide, power, search, repl_tool, get_historical_price, get_current_price, get_company_info, schedule_task, check_system_time]
+def _traced(tool):
+    # Times every real execution of the tool (memo hits are not counted)
+    if getattr(tool, "func", None) is None or not telemetry.ENABLED:
+        return tool
+    return tool.model_copy(update={"func": telemetry.traced(tool.name, "tool")(tool.func)})
+
+# set the tools; repeated calls within a run are answered from the run's memo
+tools = [parallel.memoized(_traced(t)) for t in [add, subtract, multiply, divide, power, search, repl_tool, get_historical_price, get_current_price, get_current_prices, get_company_info, check_system_time]]
+# lets the model ask for several independent tool calls in one step
+tools.append(parallel.parallel_tool(tools))
 # print(tools)
-# Get the react prompt template
-prompt_template = get_react_prompt_template()
 
-# Construct the ReAct agent
-agent = create_react_agent(llm, tools, prompt_template)
+# The LLM client and executor are built on first use (or by registry.warm_up),
+# so importing this module does not pay for them.
+def _build_llm():
+    # Choose the LLM to use
+    # from langchain_groq import ChatGroq
+    # return ChatGroq(model="llama-3.3-70b-versatile")
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    # The rest of the backend configures Gemini with GEMINI_API_KEY
+    api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
+    # One attempt per call; deadlines and retries are handled by llm_guard
+    return ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=api_key, timeout=llm_guard.TIMEOUT,
+                                  max_retries=1, **registry.gemini_client_options())
+
+def _build_agent_executor():
+    from langchain.agents import AgentExecutor
+    # Get the react prompt template
+    prompt_template = get_react_prompt_template()
+
+    # Construct the ReAct agent; like create_react_agent, but the prompt stays
+    # bounded as the Thought/Action/Observation chain grows, and each LLM step
+    # runs under a deadline (see llm_guard.py)
+    agent = budgeted_react_agent(registry.get("agent_llm"), tools, prompt_template, guard=llm_guard.get("agent_step"))
+
+    # Create an agent executor by passing in the agent and tools; the whole run
+    # stops after AGENT_MAX_SECONDS so it finishes before the worker's job timeout
+    return AgentExecutor(agent=agent, tools=tools, verbose=True,
+                         max_execution_time=float(os.environ.get("AGENT_MAX_SECONDS", "100")))
 
-# Create an agent executor by passing in the agent and tools
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+registry.register("agent_llm", _build_llm)
+registry.register("agent_executor", _build_agent_executor)
+
+def get_agent_executor():
+    return registry.get("agent_executor")
 
 # # Get the current time
-# x = agent_executor.invoke({"input": query})
+# x = get_agent_executor().invoke({"input": query})
 
 # # print the result
 # print(x)
@@ -47,12 +79,53 @@ agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
 
 def get_agent_response(user_input: str) -> str:
     try:
-        response = agent_executor.invoke({"input": user_input})
+        with parallel.scope(parallel.session_memo()):
+            response = get_agent_executor().invoke({"input": user_input})
         return response["output"]
     except Exception as e:
         # print("Error:", e)
         return f"Sorry, I couldn't understand that. Please try again."
 
+# ================== WORKER POOL HOOKS ==================
+# Used by worker_pool.WorkerPool (see app.py): each worker process builds the
+# executor and tools once at start-up, then every job reuses them.
+
+def worker_setup():
+    # Only what the agent needs: the other Gemini clients want GEMINI_API_KEY, and the
+    # Python REPL's sandbox pool is started on first use rather than in every worker
+    registry.warm_up(["agent_llm", "agent_executor"])
+    return get_agent_executor()
+
+def worker_run(executor, payload, emit):
+    # verbose=True prints the Thought/Action/Observation log; keep it as the thought.
+    # Each ReAct step is also emitted as it happens for /agent/stream.
+    # payload is the query, or {"input": ..., "session_id": ...} to share tool results across a session.
+    if isinstance(payload, dict):
+        user_input, session_id = payload["input"], payload.get("session_id")
+        telemetry.request_id.set(payload.get("request_id"))
+    else:
+        user_input, session_id = payload, None
+    log = io.StringIO()
+    output = None
+    with redirect_stdout(log), parallel.scope(parallel.session_memo(session_id)), usage_scope() as usage:
+        try:
+            for chunk in executor.stream({"input": user_input}):
+                for action in chunk.get("actions", []):
+                    thought = action.log.split("Action:")[0].strip()
+                    if thought:
+                        emit({"type": "thought", "text": thought})
+                    emit({"type": "action", "tool": action.tool, "input": str(action.tool_input)})
+                for step in chunk.get("steps", []):
+                    emit({"type": "observation", "tool": step.action.tool, "text": str(step.observation)})
+                if "output" in chunk:
+                    output = chunk["output"]
+        except Exception as e:
+            print("Error:", e)
+    if output is None:
+        output = "Sorry, I couldn't understand that. Please try again."
+    # Metrics recorded in this worker travel back with the result
+    return {"output": output, "thought": log.getvalue(), "usage": usage, "metrics": telemetry.drain()}
+
 # def run_agent_final()
 
 # Test case
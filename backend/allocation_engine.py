@@ -0,0 +1,168 @@
+"""
+Rule-based asset allocation for the financial path view.
+
+Builds the same allocation tree that gemini_fin_path asks Gemini for from the
+amount, risk profile and horizon alone, in well under a millisecond, so
+/ai-financial-path does not have to wait on the LLM. graph_layout turns it
+into the nodes/edges graph.
+"""
+import re
+
+from graph_layout import format_inr, layout
+
+DEFAULT_AMOUNT = 100000
+DEFAULT_HORIZON = 5
+
+# id: (label, asset class)
+CATEGORIES = {
+    "liquid": ("Liquid Funds", "cash"),
+    "fd": ("Fixed Deposits", "debt"),
+    "debt": ("Debt Funds", "debt"),
+    "index": ("Index Funds", "equity"),
+    "largecap": ("Large-Cap Funds", "equity"),
+    "midcap": ("Mid-Cap Stocks", "equity"),
+    "smallcap": ("Small-Cap Funds", "equity"),
+    "international": ("International Equity", "equity"),
+    "gold": ("Gold Investment", "gold"),
+}
+
+# Base weights (%) per risk profile
+BASE_ALLOCATIONS = {
+    "conservative": {"fd": 30, "debt": 25, "index": 20, "gold": 15, "liquid": 10},
+    "moderate": {"index": 30, "debt": 20, "largecap": 15, "midcap": 15, "gold": 10, "liquid": 10},
+    "aggressive": {"index": 25, "midcap": 25, "smallcap": 20, "international": 15, "gold": 10, "liquid": 5},
+}
+
+_WORD_NUMBERS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15,
+    "twenty": 20, "twenty five": 25, "thirty": 30, "forty": 40, "fifty": 50,
+    "hundred": 100, "a": 1, "an": 1,
+}
+_MULTIPLIERS = {
+    "k": 1e3, "thousand": 1e3, "l": 1e5, "lac": 1e5, "lacs": 1e5, "lakh": 1e5,
+    "lakhs": 1e5, "cr": 1e7, "crore": 1e7, "crores": 1e7, "million": 1e6,
+}
+_AMOUNT_RE = re.compile(
+    r"(?:₹|rs\.?|inr)?\s*(\d[\d,]*(?:\.\d+)?|" + "|".join(sorted(_WORD_NUMBERS, key=len, reverse=True)) + r")"
+    r"\s*(" + "|".join(sorted(_MULTIPLIERS, key=len, reverse=True)) + r")?\b",
+    re.IGNORECASE,
+)
+# "7-10 years", "1.5 years", "18 months"; not the tail of "50,000 monthly" or an age ("30 years old")
+_HORIZON_RE = re.compile(
+    r"(?<![\d,.])\b(\d+(?:\.\d+)?)(?:\s*(?:-|to)\s*(\d+(?:\.\d+)?))?\s*(years?|yrs?|months?)\b(?!\s*-?\s*old\b)",
+    re.IGNORECASE,
+)
+# The same after "for", "over", "in", ..., which marks it as the horizon rather than some other duration
+_FOR_HORIZON_RE = re.compile(r"\b(?:for|over|in|within|next)\s+(?:the\s+)?" + _HORIZON_RE.pattern, re.IGNORECASE)
+
+
+def parse_amount(text: str, default=DEFAULT_AMOUNT) -> int:
+    """Find the investment amount in free text ("10 lakhs", "₹1,00,000", "ten lakh")."""
+    best = None
+    for number, unit in _AMOUNT_RE.findall(text):
+        if number.lower() in _WORD_NUMBERS:
+            if not unit:
+                continue
+            value = _WORD_NUMBERS[number.lower()]
+        else:
+            value = float(number.replace(",", ""))
+        value *= _MULTIPLIERS.get(unit.lower(), 1) if unit else 1
+        # Bare numbers below 1000 are more likely years or percentages
+        if value >= 1000 and (best is None or value > best):
+            best = value
+    return int(best) if best else default
+
+
+def parse_horizon(text: str, default=DEFAULT_HORIZON) -> float:
+    """Find the investment horizon in years ("7-10 years" -> 7, "1.5 years" -> 1.5, "18 months" -> 1.5)."""
+    match = _FOR_HORIZON_RE.search(text) or _HORIZON_RE.search(text)
+    if not match:
+        return default
+    value = float(match.group(1))
+    return value / 12 if match.group(3).lower().startswith("month") else value
+
+
+def _shift(weights, fraction, source, into):
+    """Move `fraction` of the weight of the `source` asset classes into the `into` categories."""
+    weights = dict(weights)
+    moved = 0
+    for k in weights:
+        if CATEGORIES[k][1] in source:
+            moved += weights[k] * fraction
+            weights[k] *= 1 - fraction
+    for k, share in into.items():
+        weights[k] = weights.get(k, 0) + moved * share
+    return weights
+
+
+def _round_percents(weights):
+    """Integer percentages summing to 100 (largest remainder method)."""
+    total = sum(weights.values())
+    raw = {k: w * 100 / total for k, w in weights.items()}
+    percents = {k: int(v) for k, v in raw.items()}
+    for k in sorted(raw, key=lambda k: raw[k] - percents[k], reverse=True)[:100 - sum(percents.values())]:
+        percents[k] += 1
+    return percents
+
+
+def allocate(amount: float, risk: str = "conservative", horizon: float = DEFAULT_HORIZON):
+    """
+    Split `amount` across asset categories.
+
+    Returns:
+        list: (category id, percent, amount) tuples, largest first.
+    """
+    weights = dict(BASE_ALLOCATIONS.get(risk.lower(), BASE_ALLOCATIONS["conservative"]))
+
+    # Short horizons cannot ride out equity drawdowns; long ones can take more
+    if horizon < 3:
+        weights = _shift(weights, 0.5, {"equity"}, {"debt": 0.7, "liquid": 0.3})
+    elif horizon < 5:
+        weights = _shift(weights, 0.25, {"equity"}, {"debt": 0.7, "liquid": 0.3})
+    elif horizon >= 10:
+        weights = _shift(weights, 0.3, {"debt"}, {"index": 0.7, "midcap": 0.3})
+
+    # Small amounts are easier to manage in fewer buckets
+    if amount < 25000:
+        weights = dict(sorted(weights.items(), key=lambda kv: kv[1], reverse=True)[:3])
+
+    percents = _round_percents(weights)
+    step = 1000 if amount >= 100000 else 100 if amount >= 10000 else 10
+    amounts = {k: round(amount * p / 100 / step) * step for k, p in percents.items() if p > 0}
+    # Put the rounding difference on the largest bucket so amounts add up
+    largest = max(amounts, key=amounts.get)
+    amounts[largest] += amount - sum(amounts.values())
+    # Label each bucket with its share of the rounded amounts, so the two agree
+    percents = _round_percents({k: a for k, a in amounts.items() if a > 0})
+    allocation = [(k, percents[k], amounts[k]) for k in percents]
+    allocation.sort(key=lambda a: a[2], reverse=True)
+    return allocation
+
+
+def build_tree(amount: float, risk: str = "conservative", horizon: float = DEFAULT_HORIZON):
+    """Return the allocation as a graph_layout allocation tree."""
+    return {"amount": amount, "children": [
+        {"id": key, "category": CATEGORIES[key][0], "amount": value, "percent": percent}
+        for key, percent, value in allocate(amount, risk, horizon)
+    ]}
+
+
+def build_graph(amount: float, risk: str = "conservative", horizon: float = DEFAULT_HORIZON):
+    """Return the allocation as a React Flow nodes/edges graph (fin-path.json format)."""
+    return layout(build_tree(amount, risk, horizon))
+
+
+def graph_from_text(user_input: str, risk: str = "conservative", horizon=None):
+    """Build the graph straight from the user's free-text request."""
+    amount = parse_amount(user_input)
+    if horizon is None:
+        horizon = parse_horizon(user_input)
+    return build_graph(amount, risk, float(horizon))
+
+
+if __name__ == "__main__":
+    import json
+    test_query = "I have around ten lakh rupees where should I invest them for 7-10 years"
+    print("Test Query:", test_query)
+    print(json.dumps(graph_from_text(test_query, "moderate"), indent=2, ensure_ascii=False))
@@ -0,0 +1,360 @@
+"""
+Loan amortization for the onboarding `liabilities` records.
+
+Every liability ({amount, interestrateanually, startdate, duedate}) becomes a
+row in a set of NumPy arrays, so EMIs, balances, interest totals and
+prepayment what-ifs for any number of loans (and users) are computed as array
+operations rather than per-loan loops.
+
+Recompute a whole user base from JSON lines ({"user_id": ..., "liabilities": [...]}):
+    python amortization.py bulk users.jsonl summaries.jsonl
+
+Users with a malformed record are written to an errors file
+(summaries.jsonl.errors.jsonl by default) and the rest of the batch goes on.
+"""
+import argparse
+import datetime
+import json
+import os
+import time
+
+import numpy as np
+
+# Longest loan accepted (months); anything longer is taken to be a bad record
+MAX_TENURE_MONTHS = int(os.environ.get("AMORTIZATION_MAX_TENURE_MONTHS", "600"))
+# Largest loans x months schedule one request may build (each matrix is 8 bytes per element)
+MAX_SCHEDULE_ELEMENTS = int(float(os.environ.get("AMORTIZATION_MAX_SCHEDULE_ELEMENTS", "2e6")))
+
+
+def _month(dates):
+    return np.array(dates, dtype="datetime64[D]").astype("datetime64[M]")
+
+
+def parse_liability(liability):
+    """
+    Check one liability record.
+
+    Returns:
+        tuple: (name, principal, annual rate in %, start month, tenure in months).
+
+    Raises:
+        ValueError: If a field is missing, not a number or date, negative, or the
+            tenure is negative or longer than MAX_TENURE_MONTHS.
+    """
+    if not isinstance(liability, dict):
+        raise ValueError("a liability must be an object")
+    values = []
+    for key, default in (("amount", 0), ("interestrateanually", 0)):
+        raw = liability.get(key, default)
+        try:
+            value = float(str(raw if raw not in (None, "") else 0).replace(",", ""))
+        except ValueError:
+            raise ValueError(f"{key} {raw!r} is not a number") from None
+        if not np.isfinite(value) or value < 0:
+            raise ValueError(f"{key} must be a non-negative number, got {raw!r}")
+        values.append(value)
+    months = []
+    for key in ("startdate", "duedate"):
+        if not liability.get(key):
+            raise ValueError(f"missing {key}")
+        try:
+            months.append(np.datetime64(str(liability[key]), "D").astype("datetime64[M]"))
+        except ValueError:
+            raise ValueError(f"{key} {liability[key]!r} is not a YYYY-MM-DD date") from None
+    tenure = int((months[1] - months[0]).astype(np.int64))
+    if tenure < 0:
+        raise ValueError("duedate is before startdate")
+    if tenure > MAX_TENURE_MONTHS:
+        raise ValueError(f"tenure of {tenure} months is longer than {MAX_TENURE_MONTHS}")
+    return liability.get("name", ""), values[0], values[1], months[0], max(tenure, 1)
+
+
+def _arrays(rows, user_index=None):
+    names, principal, annual_rate, start, tenure = zip(*rows) if rows else ((),) * 5
+    return {
+        "name": list(names),
+        "principal": np.array(principal, dtype=np.float64),
+        "rate": np.array(annual_rate, dtype=np.float64) / 1200,  # monthly rate
+        "start": np.array(start, dtype="datetime64[M]"),
+        "tenure": np.array(tenure, dtype=np.int64),
+        "user": np.zeros(len(rows), dtype=np.int64) if user_index is None else np.asarray(user_index),
+    }
+
+
+def to_arrays(liabilities, user_index=None):
+    """
+    Turn liability records into column arrays.
+
+    Args:
+        liabilities (list): Records in the onboarding schema.
+        user_index (list): Optional owning-user number per record, for per-user totals.
+
+    Raises:
+        ValueError: If a record is malformed (see parse_liability).
+    """
+    rows = []
+    for i, liability in enumerate(liabilities):
+        try:
+            rows.append(parse_liability(liability))
+        except ValueError as e:
+            name = liability.get("name") if isinstance(liability, dict) else None
+            raise ValueError(f"liability {name or i + 1}: {e}") from None
+    return _arrays(rows, user_index)
+
+
+def emi(principal, rate, months):
+    """Equated monthly instalment; rate is the monthly rate (0 means interest-free)."""
+    growth = np.power(1 + rate, months)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = principal * rate * growth / (growth - 1)
+    return np.where(rate > 0, payment, principal / months)
+
+
+def balance(principal, rate, payment, k):
+    """Outstanding balance after k instalments."""
+    growth = np.power(1 + rate, k)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        remaining = principal * growth - payment * (growth - 1) / rate
+    remaining = np.where(rate > 0, remaining, principal - payment * k)
+    return np.maximum(remaining, 0)
+
+
+def summarize(loans, as_of=None):
+    """EMI, total interest and position as of a date for every loan."""
+    as_of = _month([as_of or datetime.date.today().isoformat()])[0]
+    p, r, n = loans["principal"], loans["rate"], loans["tenure"]
+    payment = emi(p, r, n)
+    paid = np.clip((as_of - loans["start"]).astype(np.int64), 0, n)
+    outstanding = balance(p, r, payment, paid)
+    return {
+        "emi": payment,
+        "total_interest": payment * n - p,
+        "months_paid": paid,
+        "remaining_months": n - paid,
+        "outstanding": outstanding,
+        "interest_paid": payment * paid - (p - outstanding),
+    }
+
+
+def schedule(loans):
+    """
+    Full month-by-month schedules as (loans x longest tenure) matrices.
+    Months past a loan's tenure are zero.
+
+    Raises:
+        ValueError: If loans x longest tenure exceeds MAX_SCHEDULE_ELEMENTS.
+    """
+    if len(loans["tenure"]) * int(loans["tenure"].max(initial=0)) > MAX_SCHEDULE_ELEMENTS:
+        raise ValueError(f"Schedule too large: at most {MAX_SCHEDULE_ELEMENTS} loan-months")
+    p, r, n = loans["principal"][:, None], loans["rate"][:, None], loans["tenure"][:, None]
+    payment = emi(p, r, n)
+    k = np.arange(1, int(n.max()) + 1)[None, :]
+    active = k <= n
+    opening = balance(p, r, payment, k - 1)
+    interest = np.where(active, opening * r, 0)
+    principal = np.where(active, np.minimum(payment - interest, opening), 0)
+    return {
+        "interest": interest,
+        "principal": principal,
+        "balance": np.where(active, opening - principal, 0),
+    }
+
+
+def prepayment(loans, amount, at_month, mode="reduce_tenure"):
+    """
+    What-if of a lump-sum prepayment after `at_month` instalments.
+
+    Args:
+        amount (float or array): Prepaid amount per loan.
+        at_month (int or array): Instalments paid before prepaying.
+        mode (str): "reduce_tenure" keeps the EMI, "reduce_emi" keeps the tenure.
+    """
+    p, r, n = loans["principal"], loans["rate"], loans["tenure"]
+    payment = emi(p, r, n)
+    m = np.clip(np.asarray(at_month), 0, n)
+    before = balance(p, r, payment, m)
+    after = np.maximum(before - np.asarray(amount, dtype=np.float64), 0)
+    remaining = n - m
+    interest_before = payment * remaining - before
+
+    if mode == "reduce_emi":
+        new_emi = np.where(remaining > 0, emi(after, r, np.maximum(remaining, 1)), 0)
+        new_remaining = np.where(after > 0, remaining, 0)
+    else:
+        new_emi = payment
+        with np.errstate(divide="ignore", invalid="ignore"):
+            months = np.where(
+                r > 0,
+                -np.log1p(-r * after / payment) / np.log1p(r),
+                after / payment,
+            )
+        new_remaining = np.ceil(np.round(np.nan_to_num(months), 6)).astype(np.int64)
+    # The last instalment only covers what is left of the balance
+    full = np.maximum(new_remaining - 1, 0)
+    last = balance(after, r, new_emi, full) * (1 + r)
+    interest_after = np.where(new_remaining > 0, new_emi * full + last - after, 0)
+    interest_after = np.maximum(interest_after, 0)
+    return {
+        "new_emi": new_emi,
+        "new_remaining_months": new_remaining,
+        "interest_saved": interest_before - interest_after,
+        "months_saved": remaining - new_remaining,
+    }
+
+
+def per_user_totals(loans, summary, users):
+    """Sum EMI, outstanding balance and total interest per user (bincount, no loops)."""
+    totals = {}
+    for key in ("emi", "outstanding", "total_interest"):
+        totals[key] = np.bincount(loans["user"], weights=summary[key], minlength=users)
+    return totals
+
+
+def amortize(payload):
+    """Handle one /liabilities/amortization request body."""
+    liabilities = payload.get("liabilities") or []
+    if not liabilities:
+        raise ValueError("No liabilities provided")
+    loans = to_arrays(liabilities)
+    summary = summarize(loans, payload.get("as_of"))
+
+    rows = []
+    for i, name in enumerate(loans["name"]):
+        rows.append({
+            "name": name,
+            "emi": round(float(summary["emi"][i]), 2),
+            "tenure_months": int(loans["tenure"][i]),
+            "total_interest": round(float(summary["total_interest"][i]), 2),
+            "total_payable": round(float(summary["emi"][i] * loans["tenure"][i]), 2),
+            "months_paid": int(summary["months_paid"][i]),
+            "remaining_months": int(summary["remaining_months"][i]),
+            "outstanding": round(float(summary["outstanding"][i]), 2),
+            "interest_paid": round(float(summary["interest_paid"][i]), 2),
+        })
+
+    what_if = payload.get("prepayment")
+    if what_if:
+        result = prepayment(
+            loans,
+            float(what_if.get("amount", 0)),
+            what_if.get("at_month", summary["months_paid"]),
+            what_if.get("mode", "reduce_tenure"),
+        )
+        for i, row in enumerate(rows):
+            row["prepayment"] = {
+                "new_emi": round(float(result["new_emi"][i]), 2),
+                "new_remaining_months": int(result["new_remaining_months"][i]),
+                "interest_saved": round(float(result["interest_saved"][i]), 2),
+                "months_saved": int(result["months_saved"][i]),
+            }
+
+    if payload.get("include_schedule"):
+        plan = schedule(loans)
+        for i, row in enumerate(rows):
+            n = int(loans["tenure"][i])
+            row["schedule"] = [
+                {"month": k + 1, "interest": round(float(plan["interest"][i, k]), 2),
+                 "principal": round(float(plan["principal"][i, k]), 2),
+                 "balance": round(float(plan["balance"][i, k]), 2)}
+                for k in range(n)
+            ]
+
+    return {
+        "liabilities": rows,
+        "totals": {
+            "emi": round(float(summary["emi"].sum()), 2),
+            "outstanding": round(float(summary["outstanding"].sum()), 2),
+            "total_interest": round(float(summary["total_interest"].sum()), 2),
+        },
+    }
+
+
+def _parse_user(line):
+    """(user, parsed liabilities) for one JSON line. Raises ValueError if it is malformed."""
+    user = json.loads(line)
+    if not isinstance(user, dict):
+        raise ValueError("a user must be an object")
+    liabilities = user.get("liabilities") or []
+    if not isinstance(liabilities, list):
+        raise ValueError("liabilities must be a list")
+    rows = []
+    for i, liability in enumerate(liabilities):
+        try:
+            rows.append(parse_liability(liability))
+        except ValueError as e:
+            raise ValueError(f"liability {i + 1}: {e}") from None
+    return user, rows
+
+
+def bulk(input_path, output_path, chunk_size=100000, as_of=None, errors_path=None):
+    """
+    Recompute per-user liability totals for a JSON-lines file of users,
+    `chunk_size` users at a time so memory stays bounded.
+
+    Users whose line or liabilities are malformed are skipped and written to
+    `errors_path` (default: `output_path` + ".errors.jsonl") as
+    {"line", "user_id", "error"}.
+
+    Returns:
+        int: Number of users recomputed.
+    """
+    started = time.perf_counter()
+    processed = rejected = 0
+    errors_path = errors_path or output_path + ".errors.jsonl"
+
+    def flush(users, out):
+        rows, owners = [], []
+        for i, (_, parsed) in enumerate(users):
+            rows += parsed
+            owners += [i] * len(parsed)
+        totals = {"emi": [0] * len(users), "outstanding": [0] * len(users), "total_interest": [0] * len(users)}
+        if rows:
+            loans = _arrays(rows, owners)
+            totals = per_user_totals(loans, summarize(loans, as_of), len(users))
+        for i, (user, parsed) in enumerate(users):
+            out.write(json.dumps({
+                "user_id": user.get("user_id"),
+                "loans": len(parsed),
+                "emi": round(float(totals["emi"][i]), 2),
+                "outstanding": round(float(totals["outstanding"][i]), 2),
+                "total_interest": round(float(totals["total_interest"][i]), 2),
+            }) + "\n")
+
+    with open(input_path) as src, open(output_path, "w") as out, open(errors_path, "w") as errors:
+        users = []
+        for number, line in enumerate(src, 1):
+            if line.strip():
+                try:
+                    users.append(_parse_user(line))
+                except ValueError as e:  # json.JSONDecodeError included
+                    try:
+                        user_id = json.loads(line).get("user_id")
+                    except (ValueError, AttributeError):
+                        user_id = None
+                    errors.write(json.dumps({"line": number, "user_id": user_id, "error": str(e)}) + "\n")
+                    rejected += 1
+            if len(users) >= chunk_size:
+                flush(users, out)
+                processed += len(users)
+                users = []
+        if users:
+            flush(users, out)
+            processed += len(users)
+
+    elapsed = time.perf_counter() - started
+    print(f"Recomputed liabilities for {processed} users in {elapsed:.1f}s"
+          + (f", {rejected} rejected (see {errors_path})" if rejected else ""))
+    return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loan amortization engine")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bulk_parser = sub.add_parser("bulk", help="recompute per-user totals for a JSON-lines file of users")
+    bulk_parser.add_argument("input")
+    bulk_parser.add_argument("output")
+    bulk_parser.add_argument("--chunk-size", type=int, default=100000)
+    bulk_parser.add_argument("--as-of", help="YYYY-MM-DD, defaults to today")
+    bulk_parser.add_argument("--errors", help="where rejected users go, defaults to <output>.errors.jsonl")
+    args = parser.parse_args()
+    bulk(args.input, args.output, args.chunk_size, args.as_of, args.errors)
@@ -1,82 +1,154 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from onboard import *
 from flask_cors import CORS
-import subprocess
-import re
-from jgaad_ai_agent_backup import jgaad_chat_with_gemini
+import os
+import json
+import math
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from jgaad_ai_agent_backup import jgaad_chat_with_gemini, jgaad_stream_with_gemini, get_cache_stats
 import gemini_fin_path
+import allocation_engine
+from caching import TTLCache, make_key, normalize_query
+from worker_pool import WorkerPool, WorkerError, WorkerTimeout
+from backpressure import UpstreamLimiter, Saturated
+from singleflight import SingleFlight
+import registry
+import ingest
+import telemetry
+import time
+import llm_guard
 
 app = Flask(__name__)
 CORS(app)
 
+# Warm agent workers, each holding a pre-built AgentExecutor from agent.py
+agent_pool = WorkerPool(
+    "agent:worker_setup",
+    "agent:worker_run",
+    size=int(os.environ.get("AGENT_POOL_SIZE", "2")),
+    max_jobs=int(os.environ.get("AGENT_MAX_JOBS_PER_WORKER", "25")),
+    timeout=float(os.environ.get("AGENT_JOB_TIMEOUT", "180")),
+    name="agent-worker",
+)
+
+def warm_up():
+    """Build the Gemini clients and boot the agent workers before taking traffic."""
+    timings = registry.warm_up()
+    agent_pool.start()
+    ingest.get_store()
+    print(f"Warmed up: {timings}")
+    return timings
+
+# Caps concurrent Gemini/agent calls; excess requests queue, then get 429/503
+upstream = UpstreamLimiter(
+    max_concurrent=int(os.environ.get("MAX_UPSTREAM_CONCURRENCY", "8")),
+    max_queue=int(os.environ.get("MAX_UPSTREAM_QUEUE", "32")),
+    queue_timeout=float(os.environ.get("UPSTREAM_QUEUE_TIMEOUT", "30")),
+)
+
+# Identical concurrent /agent and /ai-financial-path requests share one upstream call
+inflight = SingleFlight()
+
+@app.before_request
+def start_request():
+    request.started = time.perf_counter()
+    request.request_id = telemetry.start_request(request.headers.get('X-Request-ID'))
+
+@app.after_request
+def finish_request(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    status = str(response.status_code)
+    if telemetry.ENABLED:
+        # For streamed responses this is the time to the first byte
+        telemetry.http_duration.observe(time.perf_counter() - request.started, route, request.method, status)
+        telemetry.http_requests.inc(route, request.method, status)
+        timing = telemetry.server_timing()
+        if timing:
+            response.headers['Server-Timing'] = timing
+    response.headers['X-Request-ID'] = request.request_id
+    return response
+
+telemetry.gauge('wealthwise_upstream_slots', 'Upstream calls running and waiting for a slot.',
+                lambda: {(('state', state),): upstream.stats()[state] for state in ('active', 'waiting')})
+telemetry.gauge('wealthwise_inflight_calls', 'Distinct upstream calls currently shared by coalesced requests.',
+                lambda: {(): inflight.stats()['in_flight']})
+
+@app.errorhandler(Saturated)
+def handle_saturated(e):
+    response = jsonify({'error': str(e), 'status': 'busy'})
+    response.status_code = e.status
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
 @app.route('/', methods=['GET'])
 def home():
     return jsonify("HI")
 
 # =================== DYNAMIC APIS ===================
-@app.route('/agent', methods=['POST'])
-def agent():
-    try:
-        inp = request.form.get('input')
-        if not inp:
-            return jsonify({'error': 'No input provided'}), 400
-
-        print(f"Received query: {inp}")
-        
+def answer_agent_query(inp, session_id=None):
+    """Answer with Gemini, falling back to the agent. Returns (body, status)."""
+    with upstream.slot():
         # First try direct Gemini response
         try:
-            direct_response = jgaad_chat_with_gemini(inp)
+            with telemetry.span('gemini_answer'):
+                direct_response = jgaad_chat_with_gemini(inp)
             if direct_response:
-                return jsonify({
+                return {
                     'output': direct_response,
                     'source': 'gemini',
                     'status': 'success'
-                })
+                }, 200
+        except llm_guard.CircuitOpen:
+            # The agent needs Gemini too; answer 503 now rather than after its timeout
+            raise
         except Exception as e:
             print(f"Gemini direct response failed: {str(e)}")
-        
+
         # Fallback to agent if Gemini fails
         try:
-            process = subprocess.Popen(
-                ['python', 'agent.py', inp],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            
-            output = []
-            while True:
-                line = process.stdout.readline()
-                if not line and process.poll() is not None:
-                    break
-                if line:
-                    print(f"Agent output: {line.strip()}")
-                    output.append(line)
-            
-            output_str = ''.join(output)
-            process.wait()
-
-            final_answer = re.search(r'<Response>(.*?)</Response>', output_str, re.DOTALL)
-            if final_answer:
-                return jsonify({
-                    'output': final_answer.group(1).strip(),
-                    'thought': output_str,
-                    'source': 'agent',
-                    'status': 'success'
-                })
-            else:
-                return jsonify({
-                    'error': 'Could not extract response from agent',
-                    'raw_output': output_str
-                }), 500
-                
-        except Exception as e:
+            with telemetry.span('agent_worker'):
+                result = agent_pool.submit({'input': inp, 'session_id': session_id, 'request_id': telemetry.request_id.get()})
+            telemetry.merge(result.pop('metrics', None))
+            print(f"Agent output: {result['output']}")
+            print(f"Agent steps: {result.get('usage')}")
+            return {
+                'output': result['output'],
+                'thought': result['thought'],
+                'source': 'agent',
+                'status': 'success'
+            }, 200
+        except WorkerTimeout as e:
+            print(f"Agent timed out: {str(e)}")
+            return {
+                'error': f'Agent timed out: {str(e)}',
+                'status': 'error'
+            }, 504
+        except WorkerError as e:
             print(f"Agent processing failed: {str(e)}")
-            return jsonify({
+            return {
                 'error': f'Agent processing failed: {str(e)}',
                 'status': 'error'
-            }), 500
-            
+            }, 500
+
+@app.route('/agent', methods=['POST'])
+def agent():
+    try:
+        inp = request.form.get('input')
+        # Optional: lets follow-up questions reuse the agent's tool results
+        session_id = request.form.get('session_id')
+        if not inp:
+            return jsonify({'error': 'No input provided'}), 400
+
+        print(f"Received query: {inp}")
+        # A session's answer depends on its earlier tool results, so only
+        # identical requests from the same session (or none) share a call
+        key = make_key('agent', normalize_query(inp), session_id)
+        body, status = inflight.do(key, lambda: answer_agent_query(inp, session_id))
+        return jsonify(body), status
+
+    except Saturated:
+        raise
     except Exception as e:
         print(f"General error in /agent endpoint: {str(e)}")
         return jsonify({
@@ -84,30 +156,271 @@ def agent():
             'status': 'error'
         }), 500
 
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/agent/stream', methods=['GET', 'POST'])
+def agent_stream():
+    # GET is accepted too so the browser EventSource API can be used
+    inp = request.values.get('input')
+    session_id = request.values.get('session_id')
+    if not inp:
+        return jsonify({'error': 'No input provided'}), 400
+
+    print(f"Received streaming query: {inp}")
+    upstream.acquire()
+    # The generator runs after this view returns, outside the request context
+    request_id = request.request_id
+
+    def events():
+        yield sse('start', {'status': 'started'})
+
+        # First try streaming the direct Gemini response
+        started = False
+        try:
+            for text in jgaad_stream_with_gemini(inp):
+                if not started:
+                    started = True
+                    yield sse('source', {'source': 'gemini'})
+                yield sse('token', {'text': text})
+            if started:
+                yield sse('done', {'source': 'gemini', 'status': 'success'})
+                return
+        except llm_guard.CircuitOpen as e:
+            # The agent needs Gemini too, so there is nothing to fall back to
+            yield sse('error', {'error': str(e), 'status': 'busy', 'retry_after': e.retry_after})
+            return
+        except Exception as e:
+            print(f"Gemini streaming failed: {str(e)}")
+            if started:
+                yield sse('error', {'error': str(e), 'status': 'error'})
+                return
+
+        # Fallback to the agent, streaming each Thought/Action/Observation
+        yield sse('source', {'source': 'agent'})
+        try:
+            for kind, value in agent_pool.stream({'input': inp, 'session_id': session_id, 'request_id': request_id}):
+                if kind == 'event':
+                    yield sse(value['type'], value)
+                else:
+                    telemetry.merge(value.pop('metrics', None))
+                    yield sse('output', {'output': value['output']})
+            yield sse('done', {'source': 'agent', 'status': 'success'})
+        except WorkerError as e:
+            print(f"Agent streaming failed: {str(e)}")
+            yield sse('error', {'error': f'Agent processing failed: {str(e)}', 'status': 'error'})
+
+    response = sse_response(events())
+    # Runs once the stream ends or the client goes away, even if it never started
+    response.call_on_close(upstream.release)
+    return response
+
+# LLM refinements of locally built financial paths, polled by id
+fin_path_refinements = TTLCache(maxsize=1024, ttl=3600)
+refine_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("FIN_PATH_REFINE_WORKERS", "4")))
+
+def fin_path_from_gemini(input_text, risk):
+    def call():
+        with upstream.slot():
+            return gemini_fin_path.get_gemini_response(input_text, risk)
+    return inflight.do(make_key('fin-path', normalize_query(input_text), risk), call)
+
+def refine_fin_path(refinement_id, input_text, risk):
+    try:
+        graph = fin_path_from_gemini(input_text, risk)
+        fin_path_refinements.set(refinement_id, {'status': 'done', 'graph': graph})
+    except Exception as e:
+        print(f"Financial path refinement failed: {str(e)}")
+        fin_path_refinements.set(refinement_id, {'status': 'error', 'error': str(e)})
+
+def horizon_param(value):
+    """The optional 'horizon' form value in years, or None if not given. Raises ValueError if it is not a number."""
+    if value is None or not value.strip():
+        return None
+    horizon = float(value)
+    if not math.isfinite(horizon) or horizon < 0:
+        raise ValueError(value)
+    return horizon
+
 @app.route('/ai-financial-path', methods=['POST'])
 def ai_financial_path():
     if 'input' not in request.form:
-        print(request.form['input'])
         return jsonify({'error': 'No input provided'}), 400
         
     input_text = request.form.get('input','')
     risk = request.form.get('risk', 'conservative')
+    try:
+        horizon = horizon_param(request.form.get('horizon'))
+    except ValueError:
+        return jsonify({'error': 'horizon must be a number'}), 400
+    # local:  rule-based graph only (milliseconds)
+    # enrich: local graph now, Gemini refinement polled via refinement_id
+    # llm:    wait for Gemini, falling back to the local graph on failure
+    mode = request.form.get('mode', os.environ.get('FIN_PATH_MODE', 'local'))
     print(input_text)
     try:
-        response = gemini_fin_path.get_gemini_response(input_text, risk)
-        return jsonify(response)
+        if mode == 'llm':
+            try:
+                return jsonify(fin_path_from_gemini(input_text, risk))
+            except Exception as e:
+                print(f"Gemini financial path failed, using local allocation: {str(e)}")
+
+        graph = allocation_engine.graph_from_text(input_text, risk, horizon)
+        if mode == 'enrich':
+            refinement_id = uuid.uuid4().hex
+            fin_path_refinements.set(refinement_id, {'status': 'pending'})
+            refine_pool.submit(refine_fin_path, refinement_id, input_text, risk)
+            graph['refinement_id'] = refinement_id
+        return jsonify(graph)
     except Exception as e:
         return jsonify({'error': 'Something went wrong'}), 500
 
+@app.route('/ai-financial-path/stream', methods=['GET', 'POST'])
+def ai_financial_path_stream():
+    # The local graph is sent first; in the enrich and llm modes Gemini's graph
+    # follows, each node and edge as soon as it has been written. A 'source'
+    # event means the graph drawn so far is about to be replaced
+    input_text = request.values.get('input')
+    if not input_text:
+        return jsonify({'error': 'No input provided'}), 400
+    risk = request.values.get('risk', 'conservative')
+    try:
+        horizon = horizon_param(request.values.get('horizon'))
+    except ValueError:
+        return jsonify({'error': 'horizon must be a number'}), 400
+    mode = request.values.get('mode', os.environ.get('FIN_PATH_MODE', 'local'))
+    use_gemini = mode in ('enrich', 'llm')
+
+    print(f"Received streaming financial path query: {input_text}")
+    if use_gemini:
+        upstream.acquire()
+
+    def local_events(graph):
+        yield sse('source', {'source': 'local'})
+        for node in graph['nodes']:
+            yield sse('node', node)
+        for edge in graph['edges']:
+            yield sse('edge', edge)
+
+    def events():
+        yield sse('start', {'status': 'started'})
+        try:
+            graph = allocation_engine.graph_from_text(input_text, risk, horizon)
+        except Exception:
+            yield sse('error', {'error': 'Something went wrong', 'status': 'error'})
+            return
+        yield from local_events(graph)
+        if not use_gemini:
+            yield sse('done', {'source': 'local', 'status': 'success', 'graph': graph})
+            return
+
+        replaced = False
+        try:
+            for kind, value in gemini_fin_path.stream_gemini_response(input_text, risk):
+                if kind == 'graph':
+                    yield sse('done', {'source': 'gemini', 'status': 'success', 'graph': value})
+                    return
+                if not replaced:
+                    replaced = True
+                    yield sse('source', {'source': 'gemini'})
+                yield sse(kind, value)
+        except Exception as e:
+            print(f"Gemini financial path stream failed, keeping the local allocation: {str(e)}")
+        if replaced:
+            # Part of Gemini's graph was drawn over the local one
+            yield from local_events(graph)
+        yield sse('done', {'source': 'local', 'status': 'success', 'graph': graph})
+
+    response = sse_response(events())
+    if use_gemini:
+        response.call_on_close(upstream.release)
+    return response
+
+@app.route('/ai-financial-path/refinement/<refinement_id>', methods=['GET'])
+def ai_financial_path_refinement(refinement_id):
+    refinement = fin_path_refinements.get(refinement_id)
+    if refinement is None:
+        return jsonify({'error': 'Unknown refinement id'}), 404
+    return jsonify(refinement)
+
+@app.route('/projection', methods=['POST'])
+def portfolio_projection():
+    # Imported here so NumPy does not slow down app start-up
+    import projection
+    payload = request.get_json(silent=True) or {}
+    try:
+        return jsonify(projection.project(payload))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/liabilities/amortization', methods=['POST'])
+def liabilities_amortization():
+    import amortization
+    payload = request.get_json(silent=True) or {}
+    try:
+        return jsonify(amortization.amortize(payload))
+    except KeyError as e:
+        return jsonify({'error': f'Missing field {e}'}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
 # =================== STATIC APIS ===================
+# Served from ingested statements (see ingest.py) when a user_id is given,
+# otherwise from the sample data in onboard.py
 @app.route('/auto-bank-data', methods=['get'])
 def AutoBankData():
+    user_id = request.args.get('user_id')
+    if user_id:
+        return ingest.get_store().holdings(user_id, 'bank') or bank_data
     return bank_data
 
 @app.route('/auto-mf-data', methods=['get'])
 def AutoMFData():
+    user_id = request.args.get('user_id')
+    if user_id:
+        return ingest.get_store().holdings(user_id, 'mf') or mf_data
     return mf_data
 
+@app.route('/net-worth', methods=['get'])
+def NetWorth():
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+    net_worth = ingest.get_store().net_worth(user_id)
+    if net_worth is None:
+        return jsonify({'error': 'No statements ingested for this user'}), 404
+    return jsonify(net_worth)
+
+@app.route('/transactions', methods=['get'])
+def Transactions():
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+    source = request.args.get('source')
+    # type=int gives None (not the default) for a value that is there but not an integer
+    limit = request.args.get('limit', type=int) if 'limit' in request.args else 100
+    if limit is None:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    # SQLite reads a negative LIMIT as no limit at all
+    limit = max(1, min(limit, 1000))
+    return jsonify(ingest.get_store().transactions(user_id, source, limit))
+
+
+@app.route('/metrics', methods=['get'])
+def Metrics():
+    return Response(telemetry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache/stats', methods=['get'])
+def CacheStats():
+    return jsonify({'gemini_response': get_cache_stats(), 'upstream': upstream.stats(), 'inflight': inflight.stats(),
+                    'llm_guard': llm_guard.stats()})
+
 
 # =================== CONENCTION APIS ===================
 
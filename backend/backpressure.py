@@ -0,0 +1,89 @@
+"""
+Bounded concurrency for slow upstream calls (Gemini, the agent workers).
+
+At most `max_concurrent` upstream calls run at once, up to `max_queue` more
+wait for a slot, and anything beyond that is turned away straight away with
+a Saturated error that app.py maps to 429 (queue full) or 503 (waited too
+long) instead of piling up threads until the server falls over.
+"""
+import threading
+from contextlib import contextmanager
+
+
+class Saturated(Exception):
+    """Raised when a request cannot get an upstream slot."""
+
+    def __init__(self, message, status=503, retry_after=1):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class UpstreamLimiter:
+    """
+    Semaphore with a bounded wait queue.
+
+    Args:
+        max_concurrent (int): Upstream calls allowed to run at once.
+        max_queue (int): Requests allowed to wait for a slot.
+        queue_timeout (float): Seconds a request may wait before giving up.
+    """
+
+    def __init__(self, max_concurrent=8, max_queue=32, queue_timeout=30):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def acquire(self):
+        """
+        Take a slot, waiting in the queue if needed.
+
+        Raises:
+            Saturated: With status 429 if the queue is full, 503 if the wait timed out.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise Saturated("Server is busy, too many queued requests", status=429)
+                self.waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            if not acquired:
+                with self._lock:
+                    self.timed_out += 1
+                raise Saturated("Server is busy, please try again shortly", status=503)
+        with self._lock:
+            self.active += 1
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+        self._slots.release()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
@@ -0,0 +1,243 @@
+"""
+Local stand-ins for the Gemini REST API and the Yahoo Finance API.
+
+They let the backend run, and be load-tested, without network access or API
+quota. Point the backend at them with:
+
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8701 GEMINI_API_KEY=fake
+    YAHOO_API_URL=http://127.0.0.1:8702
+
+Gemini (generateContent and streamGenerateContent):
+- answers after --latency seconds, then produces --tokens output tokens at
+  --token-rate tokens per second (streamed in chunks when asked to stream);
+- answers financial-path prompts with a ```json allocation tree, ReAct agent
+  prompts with one get_current_price action and then a Final Answer, and
+  anything else with advisor-style prose;
+- rejects prompts containing FORCE_AGENT with a 400, so /agent falls back to
+  the agent workers.
+
+Yahoo: /v1/finance/search returns "<NAME>.NS" for any query and
+/v8/finance/chart/<symbol> returns deterministic synthetic daily bars, both
+after --yahoo-latency seconds.
+
+    python -m bench.fakes                 # from backend/; serves both until interrupted
+"""
+import argparse
+import datetime
+import json
+import math
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FORCE_AGENT = "[bench:agent]"
+
+WORDS = (
+    "diversify across equity and debt funds keep six months of expenses as an emergency fund "
+    "review your asset allocation every year and increase your SIP as income grows"
+).split()
+
+ALLOCATION = {
+    "amount": 100000,
+    "children": [
+        {"category": "Index Funds", "amount": 50000, "percent": 50},
+        {"category": "Debt Funds", "amount": 35000, "percent": 35},
+        {"category": "Gold", "amount": 15000, "percent": 15},
+    ],
+}
+
+
+def prose(tokens, seed=0):
+    """`tokens` words of advisor-sounding filler."""
+    return " ".join(WORDS[(seed + i) % len(WORDS)] for i in range(tokens)) + "."
+
+
+def gemini_reply(prompt, system, tokens):
+    """The text a Gemini stand-in answers `prompt` with."""
+    if "Action Input" in prompt:
+        # The ReAct agent: look up one price, then answer
+        if "Observation:" not in prompt.rsplit("Begin!", 1)[-1]:
+            return "Thought: I should check the current price first.\nAction: get_current_price\nAction Input: Cipla"
+        return "Thought: I now know the final answer\nFinal Answer: " + prose(tokens)
+    if '"children"' in system:
+        return "Here is your financial path:\n```json\n" + json.dumps(ALLOCATION, indent=2) + "\n```"
+    return prose(tokens, seed=len(prompt))
+
+
+def _texts(value):
+    """Every "text" part in a Gemini request body."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "text" and isinstance(item, str):
+                yield item
+            else:
+                yield from _texts(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _texts(item)
+
+
+def _candidate(text, finished):
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return candidate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class GeminiHandler(_Handler):
+    def do_POST(self):
+        settings = self.server.settings
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        match = re.search(r"/models/([^/:]+):(generateContent|streamGenerateContent)", self.path)
+        if not match:
+            return self._json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        prompt = "\n".join(_texts(body.get("contents", [])))
+        system = "\n".join(_texts(body.get("systemInstruction") or body.get("system_instruction") or {}))
+        if FORCE_AGENT in prompt and "Action Input" not in prompt:
+            return self._json(400, {"error": {"code": 400, "message": "Rejected by the bench stand-in", "status": "INVALID_ARGUMENT"}})
+
+        time.sleep(settings["latency"])
+        text = gemini_reply(prompt, system, settings["tokens"])
+        per_token = 1 / settings["token_rate"] if settings["token_rate"] > 0 else 0
+        words = text.split(" ")
+        usage = {"promptTokenCount": len(prompt) // 4 + 1, "candidatesTokenCount": len(words),
+                 "totalTokenCount": len(prompt) // 4 + 1 + len(words)}
+
+        if match.group(2) == "generateContent":
+            time.sleep(len(words) * per_token)
+            return self._json(200, {"candidates": [_candidate(text, True)], "usageMetadata": usage})
+
+        # Streamed as a JSON array of responses, which is what the REST transport parses
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        size = settings["chunk_tokens"]
+        chunks = [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+        for i, chunk in enumerate(chunks):
+            time.sleep(len(chunk.split()) * per_token)
+            last = i == len(chunks) - 1
+            response = {"candidates": [_candidate(chunk, last)]}
+            if last:
+                response["usageMetadata"] = usage
+            self._chunk((("[" if i == 0 else ",\r\n") + json.dumps(response)).encode())
+        self._chunk(b"]")
+        self._chunk(b"")
+
+
+def chart(symbol, period1, period2):
+    """Synthetic weekday bars for [period1, period2) that depend only on the symbol and date."""
+    seed = zlib.crc32(symbol.encode()) % 1000
+    first, last = period1 // 86400, (period2 - 1) // 86400
+    timestamps, closes = [], []
+    for day in range(first, last + 1):
+        if datetime.date(1970, 1, 1) + datetime.timedelta(days=day) >= datetime.date.today() + datetime.timedelta(days=1):
+            break
+        if (day + 3) % 7 >= 5:  # Saturday, Sunday
+            continue
+        timestamps.append(day * 86400 + 4 * 3600)  # 09:30 IST
+        closes.append(round(100 + seed + 20 * math.sin(day / 30) + (day % 7), 2))
+    quote = {
+        "open": [c * 0.99 for c in closes], "high": [c * 1.01 for c in closes],
+        "low": [c * 0.98 for c in closes], "close": closes, "volume": [100000 + seed] * len(closes),
+    }
+    return {"chart": {"result": [{
+        "meta": {"symbol": symbol, "currency": "INR", "gmtoffset": 19800},
+        "timestamp": timestamps,
+        "indicators": {"quote": [quote], "adjclose": [{"adjclose": closes}]},
+    }], "error": None}}
+
+
+class YahooHandler(_Handler):
+    def do_GET(self):
+        time.sleep(self.server.settings["yahoo_latency"])
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/v1/finance/search":
+            name = re.sub(r"[^A-Z0-9]", "", query.get("q", "").upper())[:10] or "UNKNOWN"
+            return self._json(200, {"quotes": [{"symbol": name + ".NS", "shortname": query.get("q", "")}]})
+        match = re.match(r"/v8/finance/chart/([^/]+)$", url.path)
+        if match:
+            now = int(time.time())
+            if "range" in query:
+                period1, period2 = now - 86400 * 5, now
+            else:
+                period1, period2 = int(query.get("period1", now - 86400 * 30)), int(query.get("period2", now))
+            return self._json(200, chart(match.group(1), period1, period2))
+        self._json(404, {"error": "not found"})
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients giving up early (deadlines, hedging) is expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def serve(handler, port, settings, host="127.0.0.1"):
+    """Start `handler` on a background thread. Returns the server (`.shutdown()` to stop)."""
+    server = _Server((host, port), handler)
+    server.daemon_threads = True
+    server.settings = settings
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_arguments(parser):
+    parser.add_argument("--gemini-port", type=int, default=8701)
+    parser.add_argument("--yahoo-port", type=int, default=8702)
+    parser.add_argument("--latency", type=float, default=0.5, help="Gemini seconds to first token")
+    parser.add_argument("--token-rate", type=float, default=200, help="Gemini output tokens per second (0: instant)")
+    parser.add_argument("--tokens", type=int, default=150, help="Gemini output tokens per answer")
+    parser.add_argument("--chunk-tokens", type=int, default=10, help="Gemini tokens per streamed chunk")
+    parser.add_argument("--yahoo-latency", type=float, default=0.05, help="Yahoo seconds per request")
+
+
+def settings_from(args):
+    return {
+        "latency": args.latency, "token_rate": args.token_rate, "tokens": args.tokens,
+        "chunk_tokens": max(1, args.chunk_tokens), "yahoo_latency": args.yahoo_latency,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_arguments(parser)
+    args = parser.parse_args()
+    settings = settings_from(args)
+    serve(GeminiHandler, args.gemini_port, settings)
+    serve(YahooHandler, args.yahoo_port, settings)
+    print(f"Gemini stand-in on http://127.0.0.1:{args.gemini_port}, Yahoo stand-in on http://127.0.0.1:{args.yahoo_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
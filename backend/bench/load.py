@@ -0,0 +1,371 @@
+"""
+Offline load test for the backend.
+
+Starts the Gemini and Yahoo stand-ins from bench/fakes.py, boots serve.py
+against them with a throwaway cache directory, and drives each scenario at a
+fixed concurrency. Reports throughput, latency percentiles, errors and the
+server's resident memory (its agent and sandbox workers included), and can
+save the results as a JSON baseline and compare a run against one.
+
+    python -m bench.load                                      # from backend/
+    python -m bench.load --scenarios agent,fin_path --concurrency 16 --requests 200
+    python -m bench.load --json baseline.json                 # save a baseline
+    python -m bench.load --baseline baseline.json             # compare; exits 1 on a regression
+    python -m bench.load --url http://127.0.0.1:5000          # an already running server
+
+Scenarios:
+    static          GET /, /auto-bank-data and /auto-mf-data in turn
+    agent           POST /agent answered directly by Gemini
+    agent_stream    POST /agent/stream, read to the end
+    agent_tools     POST /agent/stream falling back to the agent workers (one tool call)
+    fin_path        POST /ai-financial-path with mode=llm
+    fin_path_stream POST /ai-financial-path/stream, read to the end
+    fin_path_local  POST /ai-financial-path with the rule-based engine
+
+Every request asks a different question unless --repeat is given, so the
+response caches do not hide upstream latency.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench import fakes
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "static": lambda n: ("GET", ("/", "/auto-bank-data", "/auto-mf-data")[n % 3], None),
+    "agent": lambda n: ("POST", "/agent", {"input": f"How should I invest ₹{10000 + n} every month?"}),
+    "agent_stream": lambda n: ("POST", "/agent/stream", {"input": f"Is a ₹{10000 + n} SIP enough for retirement?"}),
+    "agent_tools": lambda n: ("POST", "/agent/stream", {"input": f"{fakes.FORCE_AGENT} Should I buy Cipla with ₹{10000 + n}?"}),
+    "fin_path": lambda n: ("POST", "/ai-financial-path", {
+        "input": f"I have ₹{100000 + n} to invest for 10 years", "risk": "moderate", "mode": "llm"}),
+    "fin_path_stream": lambda n: ("POST", "/ai-financial-path/stream", {
+        "input": f"I have ₹{100000 + n} to invest for 10 years", "risk": "moderate", "mode": "llm"}),
+    "fin_path_local": lambda n: ("POST", "/ai-financial-path", {
+        "input": f"I have ₹{100000 + n} to invest for 10 years", "risk": "moderate", "mode": "local"}),
+}
+
+# Metrics where a higher value is better; for the rest lower is better
+HIGHER_IS_BETTER = {"throughput_rps"}
+COMPARED = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def tree_rss_mb(pid):
+    """Resident memory of a process and all its descendants (Linux only; None elsewhere)."""
+    if not os.path.isdir("/proc"):
+        return None
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after its closing paren
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return round(total_kb / 1024, 1)
+
+
+class RSSSampler:
+    """Samples the server's memory in the background; `peak` is the highest value seen."""
+
+    def __init__(self, pid, interval=0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.pid is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = tree_rss_mb(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            self._stop.wait(self.interval)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+def start_server(port, gemini_url, yahoo_url, workdir, extra_env=()):
+    """Boot serve.py against the stand-ins. Returns the process once it answers GET /."""
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port), "HOST": "127.0.0.1",
+        "GEMINI_API_ENDPOINT": gemini_url, "GEMINI_API_KEY": "bench", "GOOGLE_API_KEY": "bench",
+        "YAHOO_API_URL": yahoo_url,
+        "WEALTHWISE_CACHE_DIR": os.path.join(workdir, "cache"),
+        "STATEMENT_DROP_DIR": os.path.join(workdir, "statements"),
+        "PYTHONUNBUFFERED": "1",
+    })
+    env.update(extra_env)
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "serve.py"], cwd=BACKEND_DIR, env=env,
+        stdout=log, stderr=subprocess.STDOUT, start_new_session=True,
+    )
+    deadline = time.monotonic() + 180
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py exited with {process.returncode}; see {log.name}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    stop_server(process)
+    raise RuntimeError(f"serve.py did not start within 180s; see {log.name}")
+
+
+def stop_server(process):
+    # Agent and sandbox workers run in the server's process group
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = (len(sorted_values) - 1) * q
+    low = int(index)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (index - low)
+
+
+def run_scenario(base_url, name, concurrency, total, repeat=False, timeout=300, pid=None, offset=0):
+    """
+    Send `total` requests of a scenario, `concurrency` at a time, and summarise them.
+    Request n asks question n + offset (question 0 every time with `repeat`).
+    """
+    build = SCENARIOS[name]
+    numbers = itertools.count()
+    numbers_lock = threading.Lock()
+    local = threading.local()
+    latencies, statuses = [], {}
+    results_lock = threading.Lock()
+
+    def worker():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        while True:
+            with numbers_lock:
+                n = next(numbers)
+            if n >= total:
+                return
+            method, path, data = build(0 if repeat else n + offset)
+            started = time.perf_counter()
+            try:
+                response = local.session.request(method, base_url + path, data=data, timeout=timeout, stream=True)
+                # Read the whole body, so streamed responses are timed to their end
+                body = b"".join(response.iter_content(chunk_size=None))
+                status = str(response.status_code)
+                # Streams report failures in an event after a 200
+                if b"event: error" in body:
+                    status = "stream_error"
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with results_lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    with RSSSampler(pid) as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(worker) for _ in range(concurrency)]:
+                future.result()
+        wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda value: round(value * 1000, 1) if value is not None else None
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "mean_ms": ms(statistics.fmean(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+        "peak_rss_mb": rss.peak,
+        "rss_after_mb": tree_rss_mb(pid) if pid is not None else None,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Print the change of each metric against `baseline`. Returns the regressions found."""
+    regressions = []
+    for setting in ("concurrency", "requests", "repeat", "stand_ins", "cpus"):
+        if baseline.get("meta", {}).get(setting) != current["meta"][setting]:
+            print(f"Note: {setting} differs from the baseline; the numbers may not be comparable")
+    print(f"\n{'scenario':<16} {'metric':<15} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric in COMPARED:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = "  REGRESSED" if worse > tolerance else ""
+            if flag:
+                regressions.append((name, metric, old, new))
+            print(f"{name:<16} {metric:<15} {old:>10} {new:>10} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated; default: all")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=None, help="untimed requests per scenario first (default: --concurrency)")
+    parser.add_argument("--repeat", action="store_true", help="send the same question every time")
+    parser.add_argument("--url", help="drive this running server instead of booting one against the stand-ins")
+    parser.add_argument("--pid", type=int, help="with --url: server process to measure memory of")
+    parser.add_argument("--json", help="write the results to this file (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="compare against the results in this file")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--keep", action="store_true", help="keep the server's cache and log directory")
+    fakes.add_arguments(parser)
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios {unknown}; choose from {', '.join(SCENARIOS)}")
+
+    settings = fakes.settings_from(args)
+    warmup = args.concurrency if args.warmup is None else args.warmup
+    # Stop the server (and its workers) on kill as well as on Ctrl-C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(1))
+    servers, process, workdir = [], None, None
+    if args.url:
+        base_url, pid = args.url.rstrip("/"), args.pid
+    else:
+        workdir = tempfile.mkdtemp(prefix="wealthwise-bench-")
+        gemini_port = args.gemini_port or _free_port()
+        yahoo_port = args.yahoo_port or _free_port()
+        servers = [
+            fakes.serve(fakes.GeminiHandler, gemini_port, settings),
+            fakes.serve(fakes.YahooHandler, yahoo_port, settings),
+        ]
+        port = _free_port()
+        print(f"Booting serve.py on port {port} (log: {os.path.join(workdir, 'server.log')})")
+        process = start_server(port, f"http://127.0.0.1:{gemini_port}", f"http://127.0.0.1:{yahoo_port}", workdir)
+        base_url, pid = f"http://127.0.0.1:{port}", process.pid
+
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": warmup,
+            "repeat": args.repeat,
+            "stand_ins": None if args.url else settings,
+            "idle_rss_mb": tree_rss_mb(pid) if pid is not None else None,
+        },
+        "scenarios": {},
+    }
+    try:
+        print(f"{'scenario':<16} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'peak RSS MB':>12}")
+        for name in names:
+            # Lets workers, clients and connection pools start before timing
+            run_scenario(base_url, name, args.concurrency, warmup, args.repeat, offset=10 ** 6)
+            r = run_scenario(base_url, name, args.concurrency, args.requests, args.repeat, pid=pid)
+            results["scenarios"][name] = r
+            print(f"{name:<16} {r['throughput_rps']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} "
+                  f"{r['errors']:>7} {r['peak_rss_mb'] if r['peak_rss_mb'] is not None else '-':>12}")
+    finally:
+        if process is not None:
+            stop_server(process)
+        for server in servers:
+            server.shutdown()
+        if workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Cold-start benchmark for the backend.
+
+Imports app.py and agent.py in fresh interpreters and reports import time and
+peak RSS, plus the cost of warming up (building the LLM clients, tools and
+agent executor). Keep these low so new instances can take traffic quickly
+when autoscaling.
+
+    python -m bench.startup                    # from backend/
+    python -m bench.startup --runs 10 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter() - start
+warm = None
+if {warm}:
+    import registry
+    start = time.perf_counter()
+    registry.warm_up()
+    warm = time.perf_counter() - start
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+except ImportError:
+    rss_mb = None
+print(json.dumps({{"import_s": imported, "warm_s": warm, "rss_mb": rss_mb}}))
+"""
+
+CASES = [
+    ("app", "app", False),
+    ("app+warm", "app", True),
+    ("agent", "agent", False),
+    ("agent+warm", "agent", True),
+]
+
+
+def run_case(module, warm):
+    code = SNIPPET.format(module=module, warm=warm)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    # Modules may print while importing; the measurement is the last line
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples, key):
+    values = [s[key] for s in samples if s[key] is not None]
+    if not values:
+        return None
+    return {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per case")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, module, warm in CASES:
+        try:
+            samples = [run_case(module, warm) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<12} failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        results[name] = {key: summarize(samples, key) for key in ("import_s", "warm_s", "rss_mb")}
+
+    print(f"{'case':<12} {'import (s)':>11} {'warm-up (s)':>12} {'peak RSS (MB)':>14}")
+    for name, r in results.items():
+        warm = f"{r['warm_s']['median']:.3f}" if r["warm_s"] else "-"
+        rss = f"{r['rss_mb']['median']:.1f}" if r["rss_mb"] else "-"
+        print(f"{name:<12} {r['import_s']['median']:>11.3f} {warm:>12} {rss:>14}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Per-session conversation memory for the chatbots.
+
+Every session keeps a rolling window of recent turns plus a short running
+summary of older ones, within a token budget, so prompts stay the same size
+however long a user chats. Sessions live in an LRU cache and are dropped
+after CHAT_SESSION_IDLE_TTL seconds without use. Setting CHAT_MEMORY_DB
+also writes them to SQLite, so conversations survive restarts.
+
+    memory = SessionMemory()
+    history = memory.gemini_history(session_id)      # or memory.render(session_id)
+    ...
+    memory.append(session_id, question, answer)
+    memory.append(session_id, with_attachments(question, paths), answer)   # image/file turns
+"""
+import os
+import re
+import threading
+
+from caching import SQLiteCache, TieredCache, TTLCache
+
+TOKEN_BUDGET = int(os.environ.get("CHAT_MEMORY_TOKENS", "2000"))
+WINDOW = int(os.environ.get("CHAT_MEMORY_WINDOW", "12"))
+IDLE_TTL = float(os.environ.get("CHAT_SESSION_IDLE_TTL", "1800"))
+MAX_SESSIONS = int(os.environ.get("CHAT_MAX_SESSIONS", "1000"))
+PERSIST_TTL = 30 * 24 * 3600
+SUMMARY_LINE_CHARS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) without a tokenizer."""
+    return len(text) // 4 + 1
+
+
+def summarize_turns(summary, turns, budget):
+    """
+    Default summariser: keeps the first sentence of every dropped turn and
+    trims the oldest lines once the summary exceeds `budget` tokens.
+
+    Args:
+        summary (str): The running summary so far.
+        turns (list): [role, text] pairs being dropped from the window.
+        budget (int): Token budget for the summary.
+    """
+    lines = summary.splitlines() if summary else []
+    for role, text in turns:
+        first = re.split(r"(?<=[.!?])\s", " ".join(text.split()), maxsplit=1)[0]
+        lines.append(f"{'User' if role == 'user' else 'Assistant'}: {first[:SUMMARY_LINE_CHARS]}")
+    while lines and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def with_attachments(text, paths):
+    """
+    A media turn as the text kept in memory: the message plus the names of the
+    files sent with it (the media itself is not replayed on later turns).
+    """
+    names = ", ".join(os.path.basename(str(p)) for p in paths or [])
+    return f"{text}\n[Attached: {names}]" if names else text
+
+
+class SessionMemory:
+    """
+    Session-keyed conversation memory.
+
+    Args:
+        token_budget (int): Max tokens of history (summary + window) per session.
+        window (int): Max recent messages kept verbatim.
+        idle_ttl (float): Seconds of inactivity after which a session is evicted.
+        max_sessions (int): Sessions kept in memory; least recently used are evicted.
+        db_path (str): Optional SQLite file to persist sessions in.
+        summarize: Callable(summary, dropped_turns, budget) -> summary, e.g. an
+            LLM-backed summariser; defaults to `summarize_turns`.
+    """
+
+    def __init__(self, token_budget=TOKEN_BUDGET, window=WINDOW, idle_ttl=IDLE_TTL,
+                 max_sessions=MAX_SESSIONS, db_path=None, summarize=summarize_turns):
+        self.token_budget = token_budget
+        self.window = window
+        self.summarize = summarize
+        db_path = db_path or os.environ.get("CHAT_MEMORY_DB")
+        self._sessions = TieredCache(
+            TTLCache(maxsize=max_sessions, ttl=idle_ttl),
+            SQLiteCache(db_path, maxsize=max_sessions * 100, ttl=PERSIST_TTL) if db_path else None,
+        )
+        self._lock = threading.Lock()
+
+    def _load(self, session_id):
+        # Stored as {"summary": str, "turns": [[role, text], ...]}
+        return self._sessions.get(session_id) or {"summary": "", "turns": []}
+
+    def append(self, session_id, user_text, ai_text):
+        """Record one exchange and shrink the session back within its budget."""
+        with self._lock:
+            # The summary gets at most a quarter of the budget, the window the rest
+            summary_budget = self.token_budget // 4
+            # A single huge message may not take the whole window
+            max_chars = (self.token_budget - summary_budget) * 2
+            state = self._load(session_id)
+            turns = state["turns"] + [["user", user_text[:max_chars]], ["model", ai_text[:max_chars]]]
+
+            dropped = []
+            while len(turns) > self.window:
+                dropped.append(turns.pop(0))
+            while len(turns) > 2 and sum(estimate_tokens(t) for _, t in turns) > self.token_budget - summary_budget:
+                dropped.append(turns.pop(0))
+            summary = self.summarize(state["summary"], dropped, summary_budget) if dropped else state["summary"]
+
+            # Re-setting refreshes the idle timer
+            self._sessions.set(session_id, {"summary": summary, "turns": turns})
+
+    def history(self, session_id):
+        """Return (summary, [[role, text], ...]) for a session."""
+        with self._lock:
+            state = self._load(session_id)
+            return state["summary"], state["turns"]
+
+    def render(self, session_id):
+        """History as plain text for prompt templates."""
+        summary, turns = self.history(session_id)
+        parts = [f"Summary of the earlier conversation:\n{summary}"] if summary else []
+        parts += [f"{'User' if role == 'user' else 'Assistant'}: {text}" for role, text in turns]
+        return "\n".join(parts)
+
+    def gemini_history(self, session_id):
+        """History in the google.generativeai `start_chat(history=...)` format."""
+        summary, turns = self.history(session_id)
+        history = []
+        if summary:
+            # Gemini histories must alternate user/model turns
+            history.append({"role": "user", "parts": [f"Summary of our earlier conversation:\n{summary}"]})
+            history.append({"role": "model", "parts": ["Understood."]})
+        history += [{"role": role, "parts": [text]} for role, text in turns]
+        return history
+
+    def tokens(self, session_id):
+        summary, turns = self.history(session_id)
+        return estimate_tokens(summary) + sum(estimate_tokens(t) for _, t in turns)
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id)
+
+    def stats(self):
+        return self._sessions.stats()
@@ -2,8 +2,8 @@ from langchain.prompts import ChatPromptTemplate
 from langchain.schema import StrOutputParser
 from langchain_ollama import ChatOllama
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.chat_message_histories import ChatMessageHistory
 from dotenv import load_dotenv
+from chat_memory import SessionMemory
 import google.generativeai as genai
 
 load_dotenv()
@@ -36,7 +36,8 @@ Provide balanced, ethical financial advice and acknowledge when certain situatio
 system_prompt = 'You are a helpful assistant.\n\n{messages}'
 
 
-demo_ephemeral_chat_history = ChatMessageHistory()
+# Bounded per-session history (rolling window + summary of older turns)
+memory = SessionMemory()
 
 
 # Initialize the model
@@ -74,10 +75,10 @@ runnable = prompt | llm | StrOutputParser()
 #     print(chunk, end="", flush=True)
 
 # Output:
-def ask_question(question):
-    ans = runnable.invoke({'messages': demo_ephemeral_chat_history.messages, "question": question})
-    demo_ephemeral_chat_history.add_user_message(question)
-    demo_ephemeral_chat_history.add_ai_message(ans.split('</think>')[1])
+def ask_question(question, session_id="default"):
+    ans = runnable.invoke({'messages': memory.render(session_id), "question": question})
+    # deepseek-r1 prefixes its reasoning in <think>...</think>; only remember the answer
+    memory.append(session_id, question, ans.split('</think>')[-1].strip())
     return ans
 
 
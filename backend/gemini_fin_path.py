@@ -1,13 +1,15 @@
 import os
-import google.generativeai as genai
 import re
 import json
 from dotenv import load_dotenv
+import registry
+import telemetry
+import llm_guard
+import graph_layout
+from graph_stream import GraphParser
 
 load_dotenv()
 
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-
 # Create the model
 generation_config = {
   "temperature": 1,
@@ -17,27 +19,77 @@ generation_config = {
   "response_mime_type": "text/plain",
 }
 
-model = genai.GenerativeModel(
-  model_name="models/gemini-2.5-pro",
-  generation_config=generation_config,
-  system_instruction="You are a personal financial advisor dedicated to helping in  financial journey. Focus on providing guidance on budgeting, investing, retirement planning, debt management, and wealth building strategies. Be precise and practical in your advice while considering individual circumstances.\\n\\nKey areas of expertise:\\n- Budgeting and expense tracking\\n- Investment strategies and portfolio management\\n- Retirement planning\\n- Debt management and elimination\\n- Tax planning considerations\\n- Emergency fund planning\\n- Risk management and insurance\\n\\nProvide balanced, ethical financial advice and acknowledge when certain situations may require consultation with other financial professionals.\n\nYou can increase the number of nodes and edges in the response if needed.\n\nFor the given user query you have to response a proper output by giving proper response in the following format\nStrictly follow the given format only\n\n\n\n{\n  \"nodes\": [\n    {\n      \"id\": \"start\",\n      \"position\": { \"x\": 250, \"y\": 50 },\n      \"data\": { \"label\": \"Investment\\n₹1,00,000\" },\n      \"style\": {\n        \"background\": \"bg-blue-100\",\n        \"border\": \"border-blue-500\"\n      }\n    },\n    {\n      \"id\": \"index\",\n      \"position\": { \"x\": 50, \"y\": 200 },\n      \"data\": { \"label\": \"Index Funds\\n₹40,000\" },\n      \"style\": {\n        \"background\": \"bg-indigo-100\",\n        \"border\": \"border-indigo-500\"\n      }\n    },\n    {\n      \"id\": \"midcap\",\n      \"position\": { \"x\": 250, \"y\": 200 },\n      \"data\": { \"label\": \"Mid-Cap Stocks\\n₹35,000\" },\n      \"style\": {\n        \"background\": \"bg-orange-100\",\n        \"border\": \"border-orange-500\"\n      }\n    },\n    {\n      \"id\": \"gold\",\n      \"position\": { \"x\": 450, \"y\": 200 },\n      \"data\": { \"label\": \"Gold Investment\\n₹25,000\" },\n      \"style\": {\n        \"background\": \"bg-yellow-100\",\n        \"border\": \"border-yellow-500\"\n      }\n    }\n  ],\n  \"edges\": [\n    {\n      \"id\": \"e-index\",\n      \"source\": \"start\",\n      \"target\": \"index\",\n      \"label\": \"40%\",\n      \"style\": { \"stroke\": \"stroke-indigo-500\" }\n    },\n    {\n      \"id\": \"e-midcap\",\n      \"source\": \"start\",\n      \"target\": \"midcap\",\n      \"label\": \"35%\",\n      \"style\": { \"stroke\": \"stroke-orange-500\" }\n    },\n    {\n      \"id\": \"e-gold\",\n      \"source\": \"start\",\n      \"target\": \"gold\",\n      \"label\": \"25%\",\n      \"style\": { \"stroke\": \"stroke-yellow-500\" }\n    }\n  ]\n}",
-)
+SYSTEM_INSTRUCTION = "You are a personal financial advisor dedicated to helping in  financial journey. Focus on providing guidance on budgeting, investing, retirement planning, debt management, and wealth building strategies. Be precise and practical in your advice while considering individual circumstances.\\n\\nKey areas of expertise:\\n- Budgeting and expense tracking\\n- Investment strategies and portfolio management\\n- Retirement planning\\n- Debt management and elimination\\n- Tax planning considerations\\n- Emergency fund planning\\n- Risk management and insurance\\n\\nProvide balanced, ethical financial advice and acknowledge when certain situations may require consultation with other financial professionals.\n\nSplit the investment into as many categories as the user's situation needs; a category can be split further with its own children.\n\nFor the given user query respond only with the allocation as compact JSON in the following format, with no positions, colours or ids (amounts in rupees, percent of the parent):\nStrictly follow the given format only\n\n{\"amount\":100000,\"children\":[{\"category\":\"Index Funds\",\"amount\":40000,\"percent\":40},{\"category\":\"Mid-Cap Stocks\",\"amount\":35000,\"percent\":35},{\"category\":\"Gold Investment\",\"amount\":25000,\"percent\":25}]}"
+
+# Built on first use (or by registry.warm_up) so importing this module stays cheap
+def _build_model():
+  return registry.get("genai").GenerativeModel(
+    model_name="models/gemini-2.5-pro",
+    generation_config=generation_config,
+    system_instruction=SYSTEM_INSTRUCTION,
+  )
+
+registry.register("fin_path_model", _build_model)
+
+# Graphs are long answers, so they get a longer deadline than chat
+guard = llm_guard.get("fin_path", timeout=float(os.environ.get("FIN_PATH_LLM_TIMEOUT", "90")))
 
 def get_gemini_response(user_input: str, risk:str) -> str:
-    # Start a new chat session for each request
-    chat_session = model.start_chat(history=[])
-    response = chat_session.send_message(f'{user_input} \nMy risk profile is:{risk}')
+    def send(timeout):
+        # Start a new chat session for each attempt
+        chat_session = registry.get("fin_path_model").start_chat(history=[])
+        return chat_session.send_message(f'{user_input} \nMy risk profile is:{risk}',
+                                         request_options=llm_guard.request_options(timeout))
+
+    with telemetry.span("gemini_fin_path", "upstream"):
+        response = guard.call(send)
     markdown_text = response.text
     # Extract content between ```json and ``` blocks
     json_match = re.search(r'```json\s*(.*?)\s*```', markdown_text, re.DOTALL)
-    print(json_match.group(1))
     if json_match:
+        print(json_match.group(1))
         resp = json.loads(json_match.group(1))
     else:
         # Fallback to try parsing the entire response as JSON
         resp = json.loads(markdown_text)
 
-    return resp
+    # The model only allocates; positions and colours are ours
+    return graph_layout.to_graph(resp)
+
+def stream_gemini_response(user_input: str, risk: str):
+    """
+    Stream the financial path while Gemini generates it.
+
+    Yields ("node", node) and ("edge", edge) as soon as each allocation is
+    complete in the model output, then ("graph", graph) with the whole graph.
+    Positions are those of the tree so far, so nodes sent early may sit
+    elsewhere in the final graph.
+
+    Raises:
+        ValueError: If the output did not contain a complete graph.
+    """
+    parser = GraphParser()
+    allocations, sent = [], set()
+    chat_session = registry.get("fin_path_model").start_chat(history=[])
+    with telemetry.span("gemini_fin_path_stream", "upstream"), guard.streaming() as check_deadline:
+        response = chat_session.send_message(
+            f'{user_input} \nMy risk profile is:{risk}', stream=True,
+            request_options=llm_guard.request_options(llm_guard.STREAM_TIMEOUT),
+        )
+        for chunk in response:
+            check_deadline()
+            for kind, item in parser.feed(chunk.text):
+                if kind != "allocation":
+                    yield kind, item
+                    continue
+                allocations.append(item)
+                graph = graph_layout.layout({**parser.fields, "children": allocations})
+                for part, elements in (("node", graph["nodes"]), ("edge", graph["edges"])):
+                    for element in elements:
+                        if (part, element["id"]) not in sent:
+                            sent.add((part, element["id"]))
+                            yield part, element
+    yield "graph", graph_layout.to_graph(parser.result())
 
 if __name__ == "__main__":
     # Sample test query
@@ -1,6 +1,7 @@
 import os
 import google.generativeai as genai
 from dotenv import load_dotenv
+from chat_memory import SessionMemory, with_attachments
 
 load_dotenv()
 
@@ -32,22 +33,23 @@ model = genai.GenerativeModel(
   """,
 )
 
-chat_session = model.start_chat(
-  history=[
-  ]
-)
+# Bounded per-session history (rolling window + summary of older turns)
+memory = SessionMemory()
 
-def chat_with_gemini(message, media_file_path=None):
-  global chat_session
+def chat_with_gemini(message, media_file_path=None, session_id="default"):
+  chat_session = model.start_chat(history=memory.gemini_history(session_id))
   files = []
   if media_file_path:
     for media_file in media_file_path:
       files.append(upload_to_gemini(media_file, mime_type="audio/mpeg"))
   
-    response = chat_session.send_message(message, media_files=files)
+    response = chat_session.send_message([message, *files])
+    # Recorded like a text turn, so the next message knows what was sent
+    memory.append(session_id, with_attachments(message, media_file_path), response.text)
     return response
   else:
     response = chat_session.send_message(message)
+    memory.append(session_id, message, response.text)
     return response.text
   
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+"""
+Turns an allocation tree into the React Flow nodes/edges graph (fin-path.json
+format) the financial path view draws.
+
+Gemini and allocation_engine only decide what goes where:
+
+    {"amount": 100000, "children": [
+        {"category": "Index Funds", "amount": 40000, "percent": 40},
+        {"category": "Debt", "amount": 60000, "percent": 60, "children": [
+            {"category": "Fixed Deposits", "percent": 50}, {"category": "Debt Funds", "percent": 50}]}]}
+
+and `layout` adds the ids, positions, labels and colours: the root at the top,
+each level of children one row further down, and every parent centred over
+its children. Either of "amount" and "percent" may be left out of a child
+(amounts are then worked out from the parent's, percentages are of the parent).
+"""
+import itertools
+import re
+
+ROOT_X, ROOT_Y = 250, 50
+ROW_GAP = 150     # vertical distance between levels
+COLUMN_GAP = 200  # horizontal distance between neighbouring leaves
+
+ROOT_COLOUR = "blue"
+# Colours by the start of a word in the category name, first match wins
+KEYWORD_COLOURS = (
+    ("liquid", "cyan"), ("savings", "cyan"), ("emergency", "cyan"),
+    ("fixed deposit", "emerald"), ("fd", "emerald"), ("ppf", "lime"), ("epf", "lime"), ("nps", "lime"),
+    ("debt", "teal"), ("bond", "teal"), ("gilt", "teal"),
+    ("index", "indigo"), ("large", "blue"), ("mid", "orange"), ("small", "red"),
+    ("international", "purple"), ("global", "purple"), ("foreign", "purple"),
+    ("gold", "yellow"), ("silver", "slate"), ("real estate", "amber"), ("reit", "amber"),
+    ("crypto", "pink"),
+)
+# For categories none of the keywords match, in order of appearance
+PALETTE = ("indigo", "orange", "green", "yellow", "purple", "teal", "red", "pink", "amber", "cyan")
+
+
+def format_inr(amount: float) -> str:
+    """Format with Indian digit grouping: 1000000 -> ₹10,00,000."""
+    digits = str(int(round(amount)))
+    if len(digits) > 3:
+        head, tail = digits[:-3], digits[-3:]
+        head = re.sub(r"(\d)(?=(\d{2})+$)", r"\1,", head)
+        digits = f"{head},{tail}"
+    return f"₹{digits}"
+
+
+def colour_for(category, fallback):
+    name = category.lower()
+    for keyword, colour in KEYWORD_COLOURS:
+        if re.search(rf"\b{re.escape(keyword)}", name):
+            return colour
+    return fallback
+
+
+def _number(value):
+    try:
+        return float(str(value).replace(",", "").replace("₹", "").rstrip("%"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _resolve(node, parent_amount):
+    """(amount, percent of the parent) for a tree node."""
+    amount, percent = _number(node.get("amount")), _number(node.get("percent"))
+    if amount is None and percent is not None and parent_amount:
+        amount = parent_amount * percent / 100
+    if percent is None and amount is not None and parent_amount:
+        percent = amount * 100 / parent_amount
+    return amount, percent
+
+
+def _slug(category):
+    return re.sub(r"[^a-z0-9]+", "-", category.lower()).strip("-") or "node"
+
+
+def layout(tree):
+    """
+    Lay an allocation tree out as a nodes/edges graph.
+
+    Args:
+        tree (dict): {"amount", "category" (optional, default "Investment"),
+            "children": [{"category", "amount", "percent", "children", "id" (optional)}]}.
+
+    Returns:
+        dict: {"nodes": [...], "edges": [...]} in fin-path.json format.
+    """
+    children = [c for c in tree.get("children") or [] if isinstance(c, dict)]
+    amount = _number(tree.get("amount"))
+    if amount is None:
+        amount = sum(_resolve(c, None)[0] or 0 for c in children)
+
+    nodes, edges, used_ids = [], [], set()
+    unmatched = itertools.cycle(PALETTE)
+    next_leaf = [0]
+
+    def place(node, node_id, category, amount, depth, colour):
+        kids = [c for c in node.get("children") or [] if isinstance(c, dict)]
+        entry = {
+            "id": node_id,
+            "position": {"x": 0, "y": ROOT_Y + depth * ROW_GAP},
+            "data": {"label": f"{category}\n{format_inr(amount)}" if amount is not None else category},
+            "style": {"background": f"bg-{colour}-100", "border": f"border-{colour}-500"},
+        }
+        nodes.append(entry)
+        xs = []
+        for kid in kids:
+            kid_category = str(kid.get("category") or kid.get("name") or "Other")
+            kid_id = str(kid.get("id") or _slug(kid_category))
+            while kid_id in used_ids:
+                kid_id += "-2"
+            used_ids.add(kid_id)
+            # Below the first level, unnamed kinds of asset keep their branch's colour
+            fallback = next(unmatched) if depth == 0 else colour
+            kid_colour = colour_for(kid_category, fallback)
+            kid_amount, kid_percent = _resolve(kid, amount)
+            edges.append({
+                "id": f"e-{kid_id}",
+                "source": node_id,
+                "target": kid_id,
+                "label": f"{round(kid_percent)}%" if kid_percent is not None else "",
+                "style": {"stroke": f"stroke-{kid_colour}-500"},
+            })
+            xs.append(place(kid, kid_id, kid_category, kid_amount, depth + 1, kid_colour))
+        if xs:
+            x = (xs[0] + xs[-1]) / 2
+        else:
+            x = next_leaf[0] * COLUMN_GAP
+            next_leaf[0] += 1
+        entry["position"]["x"] = x
+        return x
+
+    used_ids.add("start")
+    root_x = place(tree, "start", str(tree.get("category") or "Investment"), amount, 0, ROOT_COLOUR)
+    for node in nodes:
+        node["position"]["x"] += ROOT_X - root_x
+    return {"nodes": nodes, "edges": edges}
+
+
+def to_graph(answer):
+    """The graph for a model answer in either the allocation tree or the full nodes/edges format."""
+    if "nodes" in answer:
+        return answer
+    return layout(answer)
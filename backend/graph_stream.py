@@ -0,0 +1,151 @@
+"""
+Incremental parsing of the financial-path graph while the model writes it.
+
+The model answers with some prose, a ```json fence and an object like
+{"amount": ..., "children": [...]} (see graph_layout), or the older
+{"nodes": [...], "edges": [...]}. GraphParser takes that text in chunks of any
+size and hands back each element of those arrays as soon as its closing
+brace arrives, so the graph can be drawn while the rest is still being
+generated.
+
+    parser = GraphParser()
+    for chunk in chunks:
+        for kind, item in parser.feed(chunk):   # ("allocation" / "node" / "edge", {...})
+            ...
+    parser.fields                               # top-level values written before the arrays
+    graph = parser.result()                     # the whole object, once complete
+
+Prose before the object is ignored, braces in it included: a ``` fence
+discards anything that looked like an object before it, and a "{" that is not
+followed by a key ("{goal}") or whose object turns out not to be JSON is
+dropped and the search for the real object starts again. Anything after the
+object's closing brace is ignored.
+"""
+import json
+
+# Top-level arrays whose elements are emitted one by one, and what they are called
+STREAMED = {"children": "allocation", "nodes": "node", "edges": "edge"}
+
+
+class GraphParser:
+    def __init__(self):
+        self._fenced = False        # a ``` fence was seen, so the next "{" is the real object
+        self._backticks = 0         # consecutive backticks seen outside a fenced object
+        self._result = None
+        self.done = False
+        self._restart()
+
+    def _restart(self):
+        """Forget the object being read (it was prose) and look for the next one."""
+        self._text = []             # the object's characters seen so far
+        self._stack = []            # open "{" and "[" containers
+        self._in_string = False
+        self._escaped = False
+        self._expect_key = False    # the object was just opened: a key or "}" must follow
+        self._string_start = None   # where the current top-level string started
+        self._last_key = None       # last string closed directly in the top-level object
+        self._key_start = None      # and where it started
+        self._array = None          # kind of the top-level array we are in, if streamed
+        self._item_start = None     # where the current streamed element started
+        self.fields = {}
+
+    def feed(self, chunk):
+        """
+        Consume the next piece of model output.
+
+        Returns:
+            list: ("allocation" | "node" | "edge", dict) for every element completed by this chunk.
+        """
+        items = []
+        for char in chunk:
+            if self.done:
+                break
+            if not (self._stack and self._fenced):
+                self._backticks = self._backticks + 1 if char == "`" else 0
+                if self._backticks == 3:
+                    # The opening fence: anything that looked like an object so far was prose
+                    self._restart()
+                    self._fenced = True
+                    continue
+            if not self._stack:
+                if char == "{":
+                    self._text.append(char)
+                    self._stack.append(char)
+                    self._expect_key = True
+                continue
+
+            self._text.append(char)
+            if self._expect_key and not char.isspace():
+                self._expect_key = False
+                if char not in '"}':
+                    # "{goal}" in the prose, not a JSON object
+                    self._restart()
+                    continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._string_start is not None:
+                        self._last_key = "".join(self._text[self._string_start:])
+                        self._key_start, self._string_start = self._string_start, None
+            elif char == '"':
+                self._in_string = True
+                if len(self._stack) == 1:
+                    self._string_start = len(self._text) - 1
+            elif char in "{[":
+                self._stack.append(char)
+                if len(self._stack) == 2 and char == "[":
+                    self._array = STREAMED.get(_decode(self._last_key))
+                    if self._array and not self.fields:
+                        self.fields = _head(self._text[:self._key_start])
+                elif len(self._stack) == 3 and self._array:
+                    self._item_start = len(self._text) - 1
+            elif char in "}]":
+                self._stack.pop()
+                if len(self._stack) == 2 and self._item_start is not None:
+                    item = json.loads("".join(self._text[self._item_start:]))
+                    self._item_start = None
+                    if isinstance(item, dict):
+                        items.append((self._array, item))
+                elif len(self._stack) == 1:
+                    self._array = None
+                elif not self._stack:
+                    try:
+                        self._result = json.loads("".join(self._text))
+                    except ValueError:
+                        self._restart()
+                        continue
+                    self.done = True
+        return items
+
+    def result(self):
+        """
+        The whole parsed object.
+
+        Raises:
+            ValueError: If the output held no complete JSON object.
+        """
+        if not self.done:
+            raise ValueError("The model output ended before the graph was complete")
+        return self._result
+
+
+def _head(text):
+    """The complete key/value pairs in the start of an object, e.g. '{"amount": 5, '."""
+    try:
+        return json.loads("".join(text).rstrip().rstrip(",") + "}")
+    except ValueError:
+        return {}
+
+
+def _decode(raw):
+    """A JSON string literal (quotes included) as text; None if it is not one."""
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
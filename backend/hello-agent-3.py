@@ -6,6 +6,7 @@ from langchain_groq import ChatGroq
 from langchain_ollama import ChatOllama
 from langchain_google_genai import ChatGoogleGenerativeAI
 from tools.mytools import *
+import time
 # no warnings
 import warnings
 warnings.filterwarnings("ignore")
@@ -21,7 +22,7 @@ load_dotenv()
 # llm = ChatOpenAI(model="gpt-4")
 # llm = ChatGroq(model="llama-3.3-70b-versatile")
 # llm = ChatOllama(model="deepseek-r1:14b", temperature=0.5)
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp")
+llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", timeout=60, max_retries=1)
 
 # set my message
 query = """ Should I invest in Cipla pharmaceuticals? """
@@ -35,8 +36,11 @@ prompt_template = get_react_prompt_template()
 # Construct the ReAct agent
 agent = create_react_agent(llm, tools, prompt_template)
 
-# Create an agent executor by passing in the agent and tools
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+# Create an agent executor by passing in the agent and tools; a run may not take more than two minutes
+agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, max_execution_time=120)
+
+# Give up on a question after this many failed runs
+MAX_ATTEMPTS = 3
 
 # # Get the current time
 # x = agent_executor.invoke({"input": query})
@@ -49,15 +53,20 @@ while True:
     # Get the user input
     user_input = input("You: ")
 
-    # Invoke the agent
+    # Invoke the agent, retrying a few times with a growing pause
     response = None
-    while response is None:
+    for attempt in range(MAX_ATTEMPTS):
         try:
             response = agent_executor.invoke({"input": user_input})
+            break
         except Exception as e:
-            
-            print("================= RETRY =================\n\n\n\n\n")
-            
+            print(f"Attempt {attempt + 1} failed: {e}")
+            if attempt + 1 < MAX_ATTEMPTS:
+                print("================= RETRY =================\n\n\n\n\n")
+                time.sleep(2 ** attempt)
 
     # Print the response
-    print("Bot:", response["output"])
\ No newline at end of file
+    if response is None:
+        print("Bot: Sorry, I couldn't answer that right now. Please try again later.")
+    else:
+        print("Bot:", response["output"])
\ No newline at end of file
@@ -0,0 +1,554 @@
+"""
+Account-statement ingestion.
+
+Stands in for the FinBox / Account Aggregator / MF Central feeds mentioned in
+onboard.py: statement exports dropped into a directory are stream-parsed (CSV
+row by row, JSON arrays and JSON lines object by object) into a SQLite
+transaction store, and a per-user holdings and net-worth index is updated in
+the same transaction as each file. /auto-bank-data and /auto-mf-data are
+served from that index.
+
+Drop layout (the root defaults to backend/.cache/statements, see STATEMENT_DROP_DIR):
+
+    <root>/<user_id>/bank/*.csv|*.json|*.jsonl
+    <root>/<user_id>/mf/*.csv|*.json|*.jsonl
+
+Rows can be transactions (date, amount or withdrawal/deposit, balance, ...)
+or holding snapshots in the onboard.py shape (Name, Type, Value, DateUpdated).
+Re-dropping a file, re-exporting it under another name or dropping exports
+with overlapping date ranges is safe: transactions are identified by the
+provider's transaction id when the export has one, otherwise by their content
+(account, date, amount, description) and how many identical rows came before
+them in the same file, so two equal purchases on one day are kept apart while
+rows already ingested are skipped.
+
+    python ingest.py scan                 # from backend/
+    python ingest.py show <user_id>
+"""
+import csv
+import functools
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from caching import cache_dir
+
+SOURCES = ("bank", "mf")
+BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "5000"))
+READ_CHUNK = 1 << 16
+POLL_SECONDS = float(os.environ.get("INGEST_POLL_SECONDS", "30"))
+# Bumped when transaction ids change; older stores are rebuilt from the statements
+STORE_VERSION = 2
+
+LIABILITY_TYPES = {"loan", "creditcard", "liability", "overdraft", "mortgage"}
+
+# Column aliases seen in bank and MF exports, compared lower-case without punctuation
+# (there is deliberately no user column: rows always belong to the user whose folder they were dropped in)
+_ALIASES = {
+    "date": ("date", "txndate", "transactiondate", "valuedate", "dateupdated", "postingdate"),
+    "description": ("description", "narration", "particulars", "remarks", "details"),
+    "account": ("account", "accountname", "accountno", "accountnumber", "name", "scheme", "schemename", "fund"),
+    "type": ("type", "assettype", "accounttype", "category"),
+    "txn_type": ("txntype", "transactiontype", "drcr", "crdr", "txn"),
+    "txn_id": ("txnid", "transactionid", "referenceid", "utr"),
+    "amount": ("amount", "txnamount", "transactionamount"),
+    "debit": ("withdrawal", "withdrawalamt", "debit", "debitamount", "dr"),
+    "credit": ("deposit", "depositamt", "credit", "creditamount", "cr"),
+    "balance": ("balance", "closingbalance", "runningbalance"),
+    "value": ("value", "currentvalue", "marketvalue"),
+    "units": ("units", "quantity"),
+    "nav": ("nav", "price"),
+}
+_LOOKUP = {alias: field for field, aliases in _ALIASES.items() for alias in aliases}
+_OUTFLOW_WORDS = ("dr", "debit", "withdrawal", "redemption", "redeem", "switchout", "sell")
+
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]")
+
+
+@functools.lru_cache(maxsize=4096)
+def _key(name):
+    # Only called on column names and type markers, which repeat on every row
+    return _NON_ALNUM.sub("", str(name).lower())
+
+
+def _number(value):
+    if value is None:
+        return None
+    text = str(value).strip().replace(",", "").replace("₹", "").replace("Rs.", "")
+    if not text or text == "-":
+        return None
+    negative = text.startswith("(") and text.endswith(")")
+    try:
+        number = float(text.strip("()"))
+    except ValueError:
+        return None
+    return -number if negative else number
+
+
+def _date(value):
+    """Normalise the date formats seen in exports to YYYY-MM-DD (unknown formats are kept)."""
+    text = str(value or "").strip()
+    match = re.match(r"^(\d{4})-(\d{1,2})-(\d{1,2})", text)
+    if match:
+        y, m, d = match.groups()
+        return f"{y}-{int(m):02d}-{int(d):02d}"
+    match = re.match(r"^(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})$", text)
+    if match:
+        d, m, y = match.groups()
+        y = f"20{y}" if len(y) == 2 else y
+        return f"{y}-{int(m):02d}-{int(d):02d}"
+    return text
+
+
+# ----------------------------- streaming parsers -----------------------------
+
+def iter_csv(f):
+    for row in csv.DictReader(f):
+        yield row
+
+
+def iter_json_lines(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK):
+    """
+    Yield the elements of the first JSON array in `f` one at a time, reading
+    `chunk_size` characters at a time. Works for a top-level array as well as
+    the onboard.py {"assets": [...]} shape.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+
+    def fill():
+        nonlocal buffer, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+    while "[" not in buffer:
+        if eof:
+            return
+        fill()
+    buffer = buffer[buffer.index("[") + 1:]
+    pos = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                return
+            buffer, pos = "", 0
+            fill()
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            buffer, pos = buffer[pos:], 0
+            fill()
+            continue
+        yield item
+
+
+def iter_records(path):
+    """Stream the records of one statement file without loading it whole."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if ext == ".csv":
+            yield from iter_csv(f)
+        elif ext in (".jsonl", ".ndjson"):
+            yield from iter_json_lines(f)
+        elif ext == ".json":
+            yield from iter_json_array(f)
+
+
+def normalize(record, source):
+    """
+    Map one raw record onto the store's fields.
+
+    Returns:
+        list: Normalised dicts (snapshots in the onboard.py shape may nest a
+        list of liabilities, which is flattened).
+    """
+    if "liabilities" in record and isinstance(record["liabilities"], list):
+        return [n for item in record["liabilities"] for n in normalize({**item, "_liability": True}, source)]
+
+    raw = {}
+    for name, value in record.items():
+        field = _LOOKUP.get(_key(name))
+        if field and field not in raw:
+            raw[field] = value
+
+    if _key(raw.get("type", "")) in ("cr", "dr", "credit", "debit") and "txn_type" not in raw:
+        # Some banks put the CR/DR marker in a column simply called "Type"
+        raw["txn_type"] = raw.pop("type")
+
+    kind = "liability" if record.get("_liability") or _key(raw.get("type", "")) in LIABILITY_TYPES else "asset"
+    out = {
+        "date": _date(raw.get("date")),
+        "account": str(raw.get("account") or ("Bank Account" if source == "bank" else "Mutual Fund")),
+        "type": str(raw.get("type") or ("Cash" if source == "bank" else "Mutual Fund")),
+        "kind": kind,
+    }
+
+    value = _number(raw.get("value"))
+    if value is not None and raw.get("amount") is None:
+        out.update(record_type="snapshot", value=value, units=_number(raw.get("units")))
+        return [out]
+
+    amount = _number(raw.get("amount"))
+    if amount is None:
+        credit, debit = _number(raw.get("credit")) or 0.0, _number(raw.get("debit")) or 0.0
+        if not credit and not debit:
+            return []
+        amount = credit - debit
+    elif amount > 0 and raw.get("txn_type"):
+        txn_type = _key(raw["txn_type"])
+        if any(w in txn_type for w in _OUTFLOW_WORDS):
+            amount = -amount
+
+    units = _number(raw.get("units"))
+    if units is not None and amount < 0 and units > 0:
+        units = -units
+    out.update(
+        record_type="transaction",
+        txn_id=str(raw["txn_id"]).strip() if raw.get("txn_id") not in (None, "") else None,
+        description=str(raw.get("description") or ""),
+        amount=amount,
+        units=units,
+        nav=_number(raw.get("nav")),
+        balance=_number(raw.get("balance")),
+    )
+    return [out]
+
+
+def _content(rec):
+    """What identifies a transaction without a provider id, in a form every export of it shares."""
+    return (rec["account"], rec["date"], round(rec["amount"], 2), " ".join(rec["description"].lower().split()))
+
+
+# ------------------------------- store & index -------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY, user_id TEXT, source TEXT, account TEXT, date TEXT,
+    description TEXT, amount REAL, units REAL, nav REAL, balance REAL
+);
+CREATE INDEX IF NOT EXISTS transactions_user ON transactions (user_id, source, date);
+CREATE TABLE IF NOT EXISTS holdings (
+    user_id TEXT, source TEXT, name TEXT, kind TEXT, type TEXT,
+    value REAL, units REAL, nav REAL, date_updated TEXT,
+    PRIMARY KEY (user_id, source, name)
+);
+CREATE TABLE IF NOT EXISTS net_worth (
+    user_id TEXT PRIMARY KEY, assets REAL, liabilities REAL, updated REAL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, size INTEGER, mtime REAL, records INTEGER
+);
+"""
+
+
+class StatementStore:
+    """
+    Normalised transactions plus an incrementally maintained holdings and
+    net-worth index in one SQLite file.
+
+    Args:
+        db_path (str): SQLite file.
+        drop_dir (str): Directory scanned for statement files.
+        batch_size (int): Records folded into the index at a time; each file is committed whole.
+    """
+
+    def __init__(self, db_path, drop_dir, batch_size=BATCH_SIZE):
+        self.drop_dir = drop_dir
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < STORE_VERSION:
+            # Ids from older versions cannot be matched with new ones: rebuild from the drop directory
+            self._conn.executescript("DELETE FROM transactions; DELETE FROM holdings; DELETE FROM net_worth; DELETE FROM files;")
+            self._conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+        self._conn.commit()
+        # Reads use their own connection: under WAL they see the last committed
+        # file and never a file the writer is half way through
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+
+    def _read(self, query, args):
+        with self._read_lock:
+            return self._reader.execute(query, args).fetchall()
+
+    # -- writing --
+
+    def _load_holding(self, key):
+        row = self._conn.execute(
+            "SELECT kind, type, value, units, nav, date_updated FROM holdings WHERE user_id = ? AND source = ? AND name = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        kind, type_, value, units, nav, updated = row
+        return {"kind": kind, "type": type_, "value": value, "units": units, "nav": nav, "updated": updated}
+
+    def _apply_batch(self, batch):
+        """
+        Insert a batch of (user_id, source, record, occurrence) and fold it into
+        the index. `occurrence` counts the identical rows before this one in its
+        file; with the row's content it identifies transactions without a
+        provider transaction id. Transactions already in the store are skipped.
+
+        Returns:
+            int: Number of new records applied.
+        """
+        digests = [
+            hashlib.sha1(repr(
+                (user_id, source, rec["account"], "txn", rec["txn_id"]) if rec["txn_id"]
+                else (user_id, source) + _content(rec) + (occurrence,)
+            ).encode()).hexdigest()
+            if rec["record_type"] == "transaction" else None
+            for user_id, source, rec, occurrence in batch
+        ]
+        wanted = [d for d in digests if d]
+        seen = set()
+        for i in range(0, len(wanted), 500):
+            chunk = wanted[i:i + 500]
+            query = f"SELECT id FROM transactions WHERE id IN ({','.join('?' * len(chunk))})"
+            seen.update(row[0] for row in self._conn.execute(query, chunk))
+
+        holdings, before, rows = {}, {}, []
+        applied = 0
+        for (user_id, source, rec, _), digest in zip(batch, digests):
+            key = (user_id, source, rec["account"])
+            if key not in holdings:
+                holdings[key] = self._load_holding(key)
+                before[key] = dict(holdings[key]) if holdings[key] else None
+            old = holdings[key] or {"kind": rec["kind"], "type": rec["type"], "value": 0.0, "units": None, "nav": None, "updated": ""}
+            new = dict(old, kind=rec["kind"], type=rec["type"])
+
+            if digest is None:
+                if holdings[key] and rec["date"] < old["updated"]:
+                    continue
+                new.update(value=rec["value"], units=rec["units"], updated=rec["date"])
+            else:
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                rows.append((digest, user_id, source, rec["account"], rec["date"], rec["description"],
+                             rec["amount"], rec["units"], rec["nav"], rec["balance"]))
+                if rec["units"] is not None:
+                    # MF transactions: track units, value at the latest NAV
+                    new["units"] = (old["units"] or 0.0) + rec["units"]
+                    if rec["nav"] and rec["date"] >= old["updated"]:
+                        new["nav"] = rec["nav"]
+                    new["value"] = new["units"] * new["nav"] if new["nav"] else old["value"] + rec["amount"]
+                elif rec["balance"] is not None:
+                    # Bank statements carry a running balance; the latest one wins
+                    if rec["date"] >= old["updated"]:
+                        new["value"] = rec["balance"]
+                else:
+                    new["value"] = old["value"] + (-rec["amount"] if rec["kind"] == "liability" else rec["amount"])
+                new["updated"] = max(old["updated"], rec["date"])
+            holdings[key] = new
+            applied += 1
+
+        changed = [key for key, h in holdings.items() if h is not None and h != before[key]]
+        deltas = {}
+        for key in changed:
+            for state, sign in ((holdings[key], 1), (before[key], -1)):
+                if state:
+                    assets, liabilities = deltas.get(key[0], (0.0, 0.0))
+                    if state["kind"] == "liability":
+                        liabilities += sign * state["value"]
+                    else:
+                        assets += sign * state["value"]
+                    deltas[key[0]] = (assets, liabilities)
+
+        self._conn.executemany("INSERT OR IGNORE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO holdings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [key + (h["kind"], h["type"], h["value"], h["units"], h["nav"], h["updated"])
+             for key, h in ((key, holdings[key]) for key in changed)],
+        )
+        now = time.time()
+        self._conn.executemany(
+            "INSERT INTO net_worth VALUES (?, ?, ?, ?) ON CONFLICT(user_id) DO UPDATE SET "
+            "assets = assets + excluded.assets, liabilities = liabilities + excluded.liabilities, updated = excluded.updated",
+            [(user_id, assets, liabilities, now) for user_id, (assets, liabilities) in deltas.items()],
+        )
+        return applied
+
+    def ingest_file(self, path, user_id, source):
+        """
+        Stream one statement file into the store, `batch_size` records at a
+        time, and commit it as one transaction.
+
+        Returns:
+            int: Number of new records applied.
+        """
+        applied = 0
+        batch = []
+        occurrences = {}
+        with self._lock:
+            try:
+                for record in iter_records(path):
+                    if not isinstance(record, dict):
+                        continue
+                    for rec in normalize(record, source):
+                        content = _content(rec) if rec["record_type"] == "transaction" else None
+                        occurrence = occurrences.get(content, 0)
+                        occurrences[content] = occurrence + 1
+                        batch.append((user_id, source, rec, occurrence))
+                    if len(batch) >= self.batch_size:
+                        applied += self._apply_batch(batch)
+                        batch = []
+                if batch:
+                    applied += self._apply_batch(batch)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return applied
+
+    def scan(self):
+        """
+        Ingest new or changed files under the drop directory.
+
+        Returns:
+            dict: New records applied per file.
+        """
+        results = {}
+        for user_id in sorted(os.listdir(self.drop_dir)):
+            for source in SOURCES:
+                folder = os.path.join(self.drop_dir, user_id, source)
+                if not os.path.isdir(folder):
+                    continue
+                for name in sorted(os.listdir(folder)):
+                    path = os.path.join(folder, name)
+                    if not os.path.isfile(path):
+                        continue
+                    stat = os.stat(path)
+                    seen = self._conn.execute("SELECT size, mtime FROM files WHERE path = ?", (path,)).fetchone()
+                    if seen == (stat.st_size, stat.st_mtime):
+                        continue
+                    try:
+                        applied = self.ingest_file(path, user_id, source)
+                    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+                        print(f"Skipping statement {path}: {e}")
+                        continue
+                    with self._lock:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                            (path, stat.st_size, stat.st_mtime, applied),
+                        )
+                        self._conn.commit()
+                    results[path] = applied
+        return results
+
+    # -- reading --
+
+    def holdings(self, user_id, source):
+        """Holdings for one source in the onboard.py bank_data / mf_data shape, or None."""
+        rows = self._read(
+            "SELECT name, kind, type, value, units, date_updated FROM holdings "
+            "WHERE user_id = ? AND source = ? ORDER BY name",
+            (str(user_id), source),
+        )
+        if not rows:
+            return None
+        assets, liabilities = [], []
+        for name, kind, type_, value, units, updated in rows:
+            item = {"Name": name, "Type": type_, "Value": f"{value:.2f}", "DateUpdated": updated}
+            if units is not None:
+                item["Quantity"] = f"{units:.3f}"
+            (liabilities if kind == "liability" else assets).append(item)
+        if liabilities:
+            assets.append({"liabilities": liabilities})
+        return {"assets": assets}
+
+    def net_worth(self, user_id):
+        rows = self._read("SELECT assets, liabilities FROM net_worth WHERE user_id = ?", (str(user_id),))
+        if not rows:
+            return None
+        assets, liabilities = rows[0]
+        return {
+            "assets": round(assets, 2),
+            "liabilities": round(liabilities, 2),
+            "net_worth": round(assets - liabilities, 2),
+        }
+
+    def transactions(self, user_id, source=None, limit=100):
+        query = "SELECT source, account, date, description, amount, units, nav, balance FROM transactions WHERE user_id = ?"
+        args = [str(user_id)]
+        if source:
+            query += " AND source = ?"
+            args.append(source)
+        query += " ORDER BY date DESC LIMIT ?"
+        args.append(int(limit))
+        columns = ("source", "account", "date", "description", "amount", "units", "nav", "balance")
+        return [dict(zip(columns, row)) for row in self._read(query, args)]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _poll(store):
+    while True:
+        try:
+            store.scan()
+        except Exception as e:
+            print(f"Statement scan failed: {e}")
+        time.sleep(POLL_SECONDS)
+
+
+def get_store():
+    """Shared store; the first call starts a background thread polling the drop directory."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            drop_dir = os.environ.get("STATEMENT_DROP_DIR") or cache_dir("statements")
+            os.makedirs(drop_dir, exist_ok=True)
+            _store = StatementStore(os.path.join(cache_dir(), "statements.sqlite"), drop_dir)
+            if POLL_SECONDS > 0:
+                threading.Thread(target=_poll, args=(_store,), name="statement-scan", daemon=True).start()
+            else:
+                _store.scan()
+        return _store
+
+
+if __name__ == "__main__":
+    store = StatementStore(
+        os.path.join(cache_dir(), "statements.sqlite"),
+        os.environ.get("STATEMENT_DROP_DIR") or cache_dir("statements"),
+    )
+    if len(sys.argv) > 1 and sys.argv[1] == "show":
+        user = sys.argv[2]
+        print(json.dumps({
+            "bank_data": store.holdings(user, "bank"),
+            "mf_data": store.holdings(user, "mf"),
+            "net_worth": store.net_worth(user),
+        }, indent=2))
+    else:
+        start = time.perf_counter()
+        results = store.scan()
+        print(f"Ingested {sum(results.values())} records from {len(results)} files in {time.perf_counter() - start:.1f}s")
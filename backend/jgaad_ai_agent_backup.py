@@ -1,11 +1,13 @@
 import os
-import google.generativeai as genai
+import hashlib
 from dotenv import load_dotenv
+from caching import TTLCache, SQLiteCache, TieredCache, make_key, normalize_query
+import registry
+import telemetry
+import llm_guard
 
 load_dotenv()
 
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-
 # Create the model
 generation_config = {
   "temperature": 0.7,
@@ -14,10 +16,9 @@ generation_config = {
   "max_output_tokens": 2048,
 }
 
-model = genai.GenerativeModel(
-  model_name="models/gemini-2.5-pro",
-  generation_config=generation_config,
-  system_instruction=f"""You are a knowledgeable personal financial advisor dedicated to helping individuals navigate their financial journey. Focus on providing guidance on budgeting, investing, retirement planning, debt management, and wealth building strategies. Be precise and practical in your advice while considering individual circumstances.
+MODEL_NAME = "models/gemini-2.5-pro"
+
+SYSTEM_INSTRUCTION = f"""You are a knowledgeable personal financial advisor dedicated to helping individuals navigate their financial journey. Focus on providing guidance on budgeting, investing, retirement planning, debt management, and wealth building strategies. Be precise and practical in your advice while considering individual circumstances.
 
 Key areas of expertise:
 - Budgeting and expense tracking
@@ -31,31 +32,113 @@ Key areas of expertise:
 Provide balanced, ethical financial advice and acknowledge when certain situations may require consultation with other financial professionals.
 
 If the user provides you the research data then use it for your response.
-  """,
+  """
+
+# Built on first use (or by registry.warm_up) so importing this module stays cheap
+def _build_model():
+  return registry.get("genai").GenerativeModel(
+    model_name=MODEL_NAME,
+    generation_config=generation_config,
+    system_instruction=SYSTEM_INSTRUCTION,
+  )
+
+registry.register("advisor_model", _build_model)
+
+# Bounds every advisor call (deadline, hedging, circuit breaker; see llm_guard.py)
+guard = llm_guard.get("advisor")
+
+# Cache of final answers, keyed on the normalised query, the research context
+# and the model settings. Set GEMINI_CACHE_DB to a file path to add a SQLite
+# tier that survives restarts and is shared between processes.
+_cache_db = os.environ.get("GEMINI_CACHE_DB")
+response_cache = TieredCache(
+  TTLCache(
+    maxsize=int(os.environ.get("GEMINI_CACHE_SIZE", "512")),
+    ttl=float(os.environ.get("GEMINI_CACHE_TTL", "3600")),
+  ),
+  SQLiteCache(
+    _cache_db,
+    maxsize=int(os.environ.get("GEMINI_CACHE_DB_SIZE", "10000")),
+    ttl=float(os.environ.get("GEMINI_CACHE_TTL", "3600")),
+  ) if _cache_db else None,
 )
 
+def _cache_key(query, research=''):
+  research_hash = hashlib.sha256(research.encode("utf-8")).hexdigest()
+  return make_key(normalize_query(query), research_hash, MODEL_NAME, generation_config)
+
+def get_cache_stats():
+  return response_cache.stats()
+
+def _build_prompt(query, research=''):
+    prompt = ""
+    if research:
+        prompt += f"Research Information:\n{research}\n\n"
+    prompt += f"Question: {query}\n\nPlease provide a detailed analysis and answer."
+    return prompt
+
 def jgaad_chat_with_gemini(query, research=''):
+    key = _cache_key(query, research)
+    cached = response_cache.get(key)
+    telemetry.cache_result("gemini_response", cached is not None)
+    if cached is not None:
+        print(f"Cache hit for query: {query}")
+        return cached
     try:
-        # Start a new chat session for each request
-        chat_session = model.start_chat(history=[])
-        
         # Prepare the prompt
-        prompt = ""
-        if research:
-            prompt += f"Research Information:\n{research}\n\n"
-        prompt += f"Question: {query}\n\nPlease provide a detailed analysis and answer."
-        
+        prompt = _build_prompt(query, research)
+
+        def send(timeout):
+            # Start a new chat session for each attempt
+            chat_session = registry.get("advisor_model").start_chat(history=[])
+            return chat_session.send_message(prompt, request_options=llm_guard.request_options(timeout))
+
         print(f"Sending query to Gemini: {query}")
-        response = chat_session.send_message(prompt)
+        with telemetry.span("gemini", "upstream"):
+            response = guard.call(send)
         print(f"Received response from Gemini")
         
         if not response or not response.text:
             return "I apologize, but I couldn't generate a response at this time. Please try again."
             
+        response_cache.set(key, response.text)
         return response.text
+    except llm_guard.CircuitOpen:
+        # Gemini is down; let the caller answer quickly instead
+        raise
     except Exception as e:
         print(f"Error in chat_with_gemini: {str(e)}")
         return f"I encountered an error while processing your request. Please try again. Error: {str(e)}"
+
+def jgaad_stream_with_gemini(query, research=''):
+    """
+    Stream the Gemini answer as text chunks while it is being generated.
+    Unlike jgaad_chat_with_gemini, errors are raised so the caller can fall back.
+    """
+    key = _cache_key(query, research)
+    cached = response_cache.get(key)
+    telemetry.cache_result("gemini_response", cached is not None)
+    if cached is not None:
+        print(f"Cache hit for query: {query}")
+        yield cached
+        return
+
+    chat_session = registry.get("advisor_model").start_chat(history=[])
+    print(f"Streaming query to Gemini: {query}")
+    parts = []
+    with telemetry.span("gemini_stream", "upstream"), guard.streaming() as check_deadline:
+        response = chat_session.send_message(
+            _build_prompt(query, research), stream=True,
+            request_options=llm_guard.request_options(llm_guard.STREAM_TIMEOUT),
+        )
+        for chunk in response:
+            check_deadline()
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+    print(f"Finished streaming response from Gemini")
+    if parts:
+        response_cache.set(key, "".join(parts))
   
 if __name__ == "__main__":
   # Sample test query
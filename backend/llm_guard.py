@@ -0,0 +1,336 @@
+"""
+Deadlines, hedging, retry budgets and a circuit breaker for LLM calls.
+
+Gemini calls otherwise wait up to the client's 600s default, retrying 503s
+the whole time, so one slow response can hold a worker for minutes. A Guard
+bounds every call:
+
+- deadline: the call fails with DeadlineExceeded after `timeout` seconds, and
+  the remaining time is passed down so the HTTP request gives up too;
+- hedging: if the first attempt is slower than the recent p95, a second
+  identical attempt is started and whichever finishes first wins;
+- retries: failures that may be transient (timeouts, 5xx, connection errors)
+  are retried while time remains;
+- retry budget: hedges and retries together may add at most LLM_RETRY_BUDGET
+  (default 10%) to the calls made, so a struggling upstream is not hit twice
+  as hard;
+- circuit breaker: after LLM_BREAKER_FAILURES transient failures in a row
+  the upstream is considered down, and calls fail at once with CircuitOpen
+  for LLM_BREAKER_RESET seconds (then one trial call is let through), so
+  callers can serve a cached or local answer instead of waiting.
+
+    guard = llm_guard.get("fin_path")
+    response = guard.call(lambda timeout: model.generate_content(prompt, request_options=llm_guard.request_options(timeout)))
+
+Guards of the same upstream share one breaker; each keeps its own latency
+history, since different prompts take very different times.
+"""
+import collections
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from backpressure import Saturated
+import telemetry
+
+TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "60"))
+STREAM_TIMEOUT = float(os.environ.get("LLM_STREAM_TIMEOUT", "120"))
+HEDGING = os.environ.get("LLM_HEDGE", "1") == "1"
+HEDGE_MIN_DELAY = float(os.environ.get("LLM_HEDGE_MIN_DELAY", "1"))
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "1"))
+RETRY_BUDGET = float(os.environ.get("LLM_RETRY_BUDGET", "0.1"))
+BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.environ.get("LLM_BREAKER_RESET", "30"))
+
+# Latencies needed before the p95 is trusted for hedging
+MIN_SAMPLES = 20
+# HTTP statuses worth another attempt
+RETRYABLE_STATUS = {408, 500, 502, 503, 504}
+
+calls = telemetry.Counter("wealthwise_llm_calls_total", "Guarded LLM calls by outcome.", ("guard", "outcome"))
+extra_attempts = telemetry.Counter("wealthwise_llm_extra_attempts_total", "Hedged and retried LLM attempts.", ("guard", "kind"))
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call did not finish within its deadline."""
+
+
+class CircuitOpen(Saturated):
+    """The upstream is failing; calls are refused until it has had time to recover."""
+
+    def __init__(self, upstream, retry_after):
+        super().__init__(f"{upstream} is temporarily unavailable, please try again shortly",
+                         status=503, retry_after=max(1, int(retry_after)))
+
+
+def is_transient(exc):
+    """Whether a failure may go away on its own (timeouts, 5xx, dropped connections)."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, (TimeoutError, OSError)):
+            return True
+        # google.api_core errors carry the HTTP status as `code`
+        code = getattr(exc, "code", None)
+        if isinstance(code, int) and code in RETRYABLE_STATUS:
+            return True
+        # langchain wraps the client's error
+        exc = exc.__cause__
+    return False
+
+
+def request_options(timeout):
+    """google.generativeai request options: our deadline, and no retries of its own."""
+    return {"timeout": max(timeout, 0.1), "retry": None}
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Args:
+        name (str): Upstream name, for messages.
+        failures (int): Transient failures in a row that open the circuit.
+        reset_after (float): Seconds the circuit stays open before a trial call.
+    """
+
+    def __init__(self, name, failures=BREAKER_FAILURES, reset_after=BREAKER_RESET):
+        self.name = name
+        self.failures = failures
+        self.reset_after = reset_after
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def check(self):
+        """
+        Raises:
+            CircuitOpen: If calls are currently refused.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return
+            waited = time.monotonic() - self._opened_at
+            if self.state == "open" and waited >= self.reset_after:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                # Let exactly one call find out whether the upstream is back
+                self._trial_running = True
+                return
+            raise CircuitOpen(self.name, self.reset_after - waited)
+
+    def record(self, ok):
+        with self._lock:
+            self._trial_running = False
+            if ok:
+                self._consecutive = 0
+                self.state = "closed"
+                return
+            self._consecutive += 1
+            if self.state == "half_open" or self._consecutive >= self.failures:
+                if self.state != "open":
+                    print(f"Circuit for {self.name} opened after {self._consecutive} failures")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        return {"state": self.state, "consecutive_failures": self._consecutive}
+
+
+class RetryBudget:
+    """
+    Token bucket limiting hedges and retries to a fraction of calls.
+
+    Every call adds `ratio` tokens (up to `max_tokens`); every extra attempt
+    takes one.
+    """
+
+    def __init__(self, ratio=RETRY_BUDGET, max_tokens=10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = float(max_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class Guard:
+    """
+    Guards calls to one kind of LLM request.
+
+    Args:
+        name (str): Name in metrics and logs.
+        breaker (CircuitBreaker): Shared by all guards of the same upstream.
+        timeout (float): Default deadline per call, in seconds.
+        hedge (bool): Start a second attempt when the first is slower than the p95.
+        max_retries (int): Extra attempts after transient failures.
+        budget (RetryBudget): Limits hedges and retries together.
+    """
+
+    def __init__(self, name, breaker, timeout=TIMEOUT, hedge=HEDGING, max_retries=MAX_RETRIES, budget=None):
+        self.name = name
+        self.breaker = breaker
+        self.timeout = timeout
+        self.hedge = hedge
+        self.max_retries = max_retries
+        self.budget = budget or RetryBudget()
+        self._latencies = collections.deque(maxlen=200)
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging: the recent p95, or None while there is too little history."""
+        if len(self._latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return max(HEDGE_MIN_DELAY, ordered[int(len(ordered) * 0.95) - 1])
+
+    def _start(self, fn, deadline):
+        def attempt():
+            # Time spent queued for a thread counts against the deadline
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"{self.name} had no time left to start")
+            return fn(remaining)
+
+        # Each attempt runs in its own copy of the caller's context (request id, memo, ...)
+        return _pool.submit(contextvars.copy_context().run, attempt)
+
+    def _check(self):
+        try:
+            self.breaker.check()
+        except CircuitOpen:
+            calls.inc(self.name, "rejected")
+            raise
+
+    def call(self, fn, timeout=None):
+        """
+        Run `fn(remaining_seconds)` under this guard and return its result.
+
+        Raises:
+            CircuitOpen: Straight away, if the upstream is considered down.
+            DeadlineExceeded: If no attempt finished in time.
+            Exception: The last attempt's error, if every attempt failed.
+        """
+        self._check()
+        self.budget.deposit()
+        started = time.monotonic()
+        deadline = started + (timeout or self.timeout)
+        delay = self.hedge_delay() if self.hedge else None
+        hedge_at = started + delay if delay is not None else None
+
+        attempts = {self._start(fn, deadline)}
+        retries, error = 0, None
+        while attempts:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wake = min(deadline, hedge_at) if hedge_at is not None else deadline
+            done, attempts = wait(attempts, timeout=max(0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    elapsed = time.monotonic() - started
+                    self._latencies.append(elapsed)
+                    self.breaker.record(True)
+                    calls.inc(self.name, "ok")
+                    return future.result()
+                error = future.exception()
+                if is_transient(error) and retries < self.max_retries and self.budget.withdraw():
+                    retries += 1
+                    extra_attempts.inc(self.name, "retry")
+                    attempts.add(self._start(fn, deadline))
+            if hedge_at is not None and time.monotonic() >= hedge_at and attempts:
+                hedge_at = None
+                if self.budget.withdraw():
+                    extra_attempts.inc(self.name, "hedge")
+                    attempts.add(self._start(fn, deadline))
+
+        if attempts:
+            # Still running; they finish (or hit their own timeout) in the background
+            error = DeadlineExceeded(f"{self.name} did not answer within {deadline - started:.3f}s")
+        # Only failures that say the upstream is unwell count against it
+        self.breaker.record(not is_transient(error))
+        calls.inc(self.name, "timeout" if isinstance(error, DeadlineExceeded) else "error")
+        raise error
+
+    @contextmanager
+    def streaming(self, timeout=None):
+        """
+        Guard a streamed call made inside the block. Yields a `check()` to call
+        per chunk, which raises DeadlineExceeded once the deadline has passed.
+        There is no hedging or retrying once output has started.
+        """
+        self._check()
+        limit = timeout or STREAM_TIMEOUT
+        deadline = time.monotonic() + limit
+
+        def check():
+            if time.monotonic() > deadline:
+                raise DeadlineExceeded(f"{self.name} stream did not finish within {limit:.3f}s")
+
+        try:
+            yield check
+        except GeneratorExit:
+            # The client went away; says nothing about the upstream
+            self.breaker.record(True)
+            raise
+        except Exception as e:
+            self.breaker.record(not is_transient(e))
+            calls.inc(self.name, "timeout" if isinstance(e, DeadlineExceeded) else "error")
+            raise
+        self.breaker.record(True)
+        calls.inc(self.name, "ok")
+
+    def runnable(self, inner, timeout=None):
+        """A langchain Runnable calling `inner` under this guard."""
+        from langchain_core.runnables import RunnableLambda
+
+        # Passing the config on keeps callbacks and tracing attached to the parent run
+        return RunnableLambda(lambda value, config: self.call(lambda remaining: inner.invoke(value, config), timeout))
+
+    def stats(self):
+        delay = self.hedge_delay()
+        return {
+            "breaker": self.breaker.stats(),
+            "hedge_delay_s": round(delay, 3) if delay is not None else None,
+            "retry_tokens": round(self.budget.tokens, 2),
+            "samples": len(self._latencies),
+        }
+
+
+_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("LLM_GUARD_THREADS", "32")), thread_name_prefix="llm")
+_breakers = {}
+_guards = {}
+_lock = threading.Lock()
+
+
+def get(name, upstream="gemini", **options):
+    """The process-wide guard `name`, created with `options` on first use."""
+    with _lock:
+        guard = _guards.get(name)
+        if guard is None:
+            breaker = _breakers.get(upstream)
+            if breaker is None:
+                breaker = _breakers[upstream] = CircuitBreaker(upstream)
+            guard = _guards[name] = Guard(name, breaker, **options)
+        return guard
+
+
+def stats():
+    return {name: guard.stats() for name, guard in _guards.items()}
+
+
+telemetry.gauge("wealthwise_circuit_open", "1 while calls to an upstream are refused.",
+                lambda: {(("upstream", name),): int(b.state == "open") for name, b in _breakers.items()})
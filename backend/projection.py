@@ -0,0 +1,201 @@
+"""
+Monte Carlo projection of a user's portfolio.
+
+Takes holdings in the onboarding schema ("data input.json" assets) and/or the
+linked bank_data / mf_data payloads, groups them into asset classes and
+simulates correlated monthly log-normal returns for every path, month and
+class in one NumPy array operation. Returns percentile bands of the total
+portfolio value per year.
+"""
+import os
+import time
+
+import numpy as np
+
+# class: (expected annual return, annual volatility)
+ASSET_CLASSES = {
+    "cash": (0.035, 0.005),
+    "debt": (0.07, 0.03),
+    "equity": (0.12, 0.20),
+    "mutual_fund": (0.11, 0.16),
+    "gold": (0.08, 0.15),
+    "real_estate": (0.07, 0.10),
+    "vehicle": (-0.10, 0.05),
+    "crypto": (0.15, 0.60),
+    "other": (0.06, 0.10),
+}
+
+# Correlations between classes that are not independent
+_CORRELATIONS = {
+    ("equity", "mutual_fund"): 0.85,
+    ("equity", "crypto"): 0.30,
+    ("mutual_fund", "crypto"): 0.25,
+    ("equity", "real_estate"): 0.30,
+    ("mutual_fund", "real_estate"): 0.25,
+    ("equity", "gold"): -0.10,
+    ("mutual_fund", "gold"): -0.10,
+    ("debt", "equity"): 0.10,
+    ("debt", "mutual_fund"): 0.10,
+}
+
+_TYPE_ALIASES = {
+    "cash": "cash", "bank": "cash", "savings": "cash", "savingsaccount": "cash",
+    "fd": "debt", "fixeddeposit": "debt", "bond": "debt", "bonds": "debt", "debt": "debt",
+    "debtfund": "debt", "ppf": "debt", "epf": "debt",
+    "stock": "equity", "stocks": "equity", "equity": "equity", "shares": "equity",
+    "investments": "equity", "etf": "equity",
+    "mutualfund": "mutual_fund", "mf": "mutual_fund", "sip": "mutual_fund",
+    "gold": "gold", "sgb": "gold",
+    "realestate": "real_estate", "property": "real_estate",
+    "vehicle": "vehicle", "vehicles": "vehicle", "car": "vehicle",
+    "crypto": "crypto", "cryptocurrency": "crypto",
+}
+
+PERCENTILES = (5, 25, 50, 75, 95)
+MAX_PATHS = 100000
+MAX_YEARS = 50
+# Largest paths x months x classes one request may simulate (about 200 MB of float32 shocks)
+MAX_ELEMENTS = int(float(os.environ.get("PROJECTION_MAX_ELEMENTS", "5e7")))
+# Paths are simulated in chunks of about this many elements, to bound peak memory
+CHUNK_ELEMENTS = int(float(os.environ.get("PROJECTION_CHUNK_ELEMENTS", "4e6")))
+
+
+def asset_class(asset_type: str) -> str:
+    key = "".join(ch for ch in str(asset_type).lower() if ch.isalnum())
+    return _TYPE_ALIASES.get(key, "other")
+
+
+def _field(record, name):
+    # The onboarding schema uses lower-case keys, the linked-account stubs Title-Case
+    for key in (name, name.capitalize(), name.lower()):
+        if key in record:
+            return record[key]
+    return None
+
+
+def holdings_by_class(assets=(), bank_data=None, mf_data=None):
+    """Sum holding values per asset class across all sources."""
+    records = list(assets or [])
+    for linked in (bank_data, mf_data):
+        for record in (linked or {}).get("assets", []):
+            # bank_data nests its liabilities inside the assets list
+            if _field(record, "value") is not None:
+                records.append(record)
+
+    totals = {}
+    for record in records:
+        try:
+            value = float(str(_field(record, "value")).replace(",", ""))
+        except ValueError:
+            continue
+        if value > 0:
+            cls = asset_class(_field(record, "type") or "other")
+            totals[cls] = totals.get(cls, 0.0) + value
+    return totals
+
+
+def _cholesky(classes):
+    n = len(classes)
+    corr = np.eye(n)
+    for i in range(n):
+        for j in range(i + 1, n):
+            rho = _CORRELATIONS.get((classes[i], classes[j]), _CORRELATIONS.get((classes[j], classes[i]), 0.0))
+            corr[i, j] = corr[j, i] = rho
+    return np.linalg.cholesky(corr)
+
+
+def simulate(holdings, years=10, paths=10000, monthly_contribution=0.0, seed=None):
+    """
+    Simulate the portfolio and return percentile bands.
+
+    Args:
+        holdings (dict): Current value per asset class.
+        years (int): Projection horizon in years.
+        paths (int): Number of simulated paths.
+        monthly_contribution (float): Amount added every month, split by current weights.
+        seed (int): Random seed for reproducible results.
+
+    Returns:
+        dict: Yearly percentile bands of the total value plus summary statistics.
+
+    Raises:
+        ValueError: If there is nothing to project, or paths x months x classes
+            exceeds MAX_ELEMENTS.
+    """
+    started = time.perf_counter()
+    years = int(min(max(years, 1), MAX_YEARS))
+    paths = int(min(max(paths, 100), MAX_PATHS))
+    months = years * 12
+    classes = sorted(holdings)
+    initial = np.array([holdings[c] for c in classes], dtype=np.float64)
+    if not len(classes) or initial.sum() <= 0:
+        raise ValueError("No holdings with a positive value to project")
+    if paths * months * len(classes) > MAX_ELEMENTS:
+        raise ValueError(f"Projection too large: at most {MAX_ELEMENTS // (months * len(classes))} paths "
+                         f"for {years} years of {len(classes)} asset classes")
+
+    mu = np.array([ASSET_CLASSES[c][0] for c in classes])
+    sigma = np.array([ASSET_CLASSES[c][1] for c in classes])
+    drift = ((mu - 0.5 * sigma ** 2) / 12).astype(np.float32)
+    vol = (sigma / np.sqrt(12)).astype(np.float32)
+
+    rng = np.random.default_rng(seed)
+    cholesky = _cholesky(classes).T.astype(np.float32)
+    per_class = (monthly_contribution * initial / initial.sum()).astype(np.float32)
+    chunk = max(1, CHUNK_ELEMENTS // (months * len(classes)))
+    # Only the year-end totals of each path are kept across chunks
+    year_ends = np.empty((paths, years), dtype=np.float32)
+    for first in range(0, paths, chunk):
+        n = min(chunk, paths - first)
+        # (paths, months, classes) standard normals, correlated across classes
+        shocks = rng.standard_normal((n, months, len(classes)), dtype=np.float32)
+        shocks = shocks @ cholesky
+        growth = np.exp(np.cumsum(drift + vol * shocks, axis=1))
+        del shocks
+
+        values = growth * initial.astype(np.float32)
+        if monthly_contribution:
+            # V_t = V_{t-1} g_t + c  =>  V_t = G_t (V_0 + c * sum_{s<=t} 1/G_s)
+            values += growth * np.cumsum(1.0 / growth, axis=1) * per_class
+        year_ends[first:first + n] = values.sum(axis=2)[:, 11::12]
+        del growth, values
+
+    bands = np.percentile(year_ends, PERCENTILES, axis=0)
+    invested = initial.sum() + monthly_contribution * months
+    start = float(initial.sum())
+
+    return {
+        "years": list(range(years + 1)),
+        "percentiles": {
+            f"p{p}": [round(start, 2)] + [round(float(v), 2) for v in band]
+            for p, band in zip(PERCENTILES, bands)
+        },
+        "initial_value": round(start, 2),
+        "total_invested": round(float(invested), 2),
+        "probability_of_loss": round(float((year_ends[:, -1] < invested).mean()), 4),
+        "holdings": {c: round(v, 2) for c, v in zip(classes, initial.tolist())},
+        "assumptions": {c: {"return": ASSET_CLASSES[c][0], "volatility": ASSET_CLASSES[c][1]} for c in classes},
+        "paths": paths,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def project(payload):
+    """Run a projection for an /projection request body."""
+    holdings = holdings_by_class(payload.get("assets"), payload.get("bank_data"), payload.get("mf_data"))
+    return simulate(
+        holdings,
+        years=int(payload.get("years", 10)),
+        paths=int(payload.get("paths", 10000)),
+        monthly_contribution=float(payload.get("monthly_contribution", 0) or 0),
+        seed=payload.get("seed"),
+    )
+
+
+if __name__ == "__main__":
+    import json
+    from onboard import bank_data, mf_data
+    with open("data input.json") as f:
+        data = json.load(f)
+    result = project({"assets": data["assets"], "bank_data": bank_data, "mf_data": mf_data, "years": 10})
+    print(json.dumps({k: result[k] for k in ("percentiles", "probability_of_loss", "elapsed_ms")}, indent=2))
@@ -0,0 +1,244 @@
+"""
+Prompt-size budgeting for the ReAct agent.
+
+`create_react_agent` resends every tool's full docstring and the whole
+scratchpad, raw Observations included, on every step, so each step costs more
+than the last. `budgeted_react_agent` builds the same agent (same prompt
+template, stop sequence and output parser) but:
+
+- lists only the tools relevant to the question, with one-line descriptions
+  (every tool can still be called);
+- shrinks the newest Observation to OBSERVATION_TOKENS and older ones to
+  OLD_OBSERVATION_TOKENS, and keeps the whole scratchpad under
+  SCRATCHPAD_TOKENS by dropping the oldest Observations first. Shrinking
+  keeps the figures an answer is built from: price series such as
+  get_historical_price's are summarised (first, last, low, high, change)
+  with evenly spaced rows, tables keep their header and first and last rows,
+  and dict-like dumps such as `str(stock.info)` keep their short fields;
+- measures prompt tokens and latency of every step (see `usage_scope`).
+"""
+import ast
+import contextvars
+import os
+import re
+import time
+from contextlib import contextmanager
+
+OBSERVATION_TOKENS = int(os.environ.get("AGENT_OBSERVATION_TOKENS", "800"))
+OLD_OBSERVATION_TOKENS = int(os.environ.get("AGENT_OLD_OBSERVATION_TOKENS", "250"))
+SCRATCHPAD_TOKENS = int(os.environ.get("AGENT_SCRATCHPAD_TOKENS", "2500"))
+MAX_PROMPT_TOOLS = int(os.environ.get("AGENT_MAX_PROMPT_TOOLS", "7"))
+
+# Listed for every question
+ALWAYS_TOOLS = {"parallel_tools", "duckduckgo_search"}
+
+# Question words -> words that appear in the descriptions of the tools that answer them
+_HINTS = {
+    "invest": "stock price company", "buy": "stock price company", "sell": "stock price",
+    "share": "stock price", "stock": "stock price", "market": "stock price current events",
+    "return": "historical price python", "performance": "historical price", "history": "historical",
+    "trend": "historical price", "compare": "prices several", "vs": "prices several",
+    "news": "current events search", "today": "current date", "now": "current", "latest": "current",
+    "calculate": "python number", "sip": "python number", "cagr": "python number", "emi": "python number",
+    "interest": "python number", "percent": "python number", "total": "add number",
+    "time": "time date", "date": "date", "company": "company information", "fundamental": "company information",
+    "sector": "company information", "about": "company information", "profile": "company information",
+}
+_STOP_WORDS = {"the", "a", "an", "of", "to", "in", "on", "for", "and", "or", "is", "i", "should", "what", "how", "my", "me", "it"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) without a tokenizer."""
+    return len(text) // 4 + 1
+
+
+def _words(text):
+    # Crude stemming: "prices" and "price" should match
+    return {w[:-1] if len(w) > 3 and w.endswith("s") else w for w in re.findall(r"[a-z0-9]+", text.lower())} - _STOP_WORDS
+
+
+def compact_description(tool, max_chars=240):
+    """First paragraph of a tool's description plus its (collapsed) Args section."""
+    text = tool.description
+    summary = text.split("Args:")[0].split("Returns:")[0]
+    summary = " ".join(summary.split())
+    args = re.search(r"Args:(.*?)(Returns:|$)", text, re.DOTALL)
+    if args:
+        summary += " Input: " + " ".join(args.group(1).split())
+    return summary[:max_chars]
+
+
+def select_tools(question, tools, limit=MAX_PROMPT_TOOLS):
+    """The tools worth describing for `question`, best matches first."""
+    wanted = _words(question)
+    for word in list(wanted):
+        wanted |= _words(_HINTS.get(word, ""))
+    if re.search(r"\d", question):
+        wanted |= {"number", "python"}
+
+    scored = []
+    for order, tool in enumerate(tools):
+        if tool.name in ALWAYS_TOOLS:
+            continue
+        score = len(wanted & _words(tool.name.replace("_", " ") + " " + compact_description(tool)))
+        if score:
+            scored.append((-score, order, tool))
+    chosen = [tool for _, _, tool in sorted(scored, key=lambda s: s[:2])[:limit]]
+    chosen += [tool for tool in tools if tool.name in ALWAYS_TOOLS]
+    return chosen
+
+
+def render_tools(tools):
+    return "\n".join(f"{tool.name}: {compact_description(tool)}" for tool in tools)
+
+
+def _figure(value):
+    return f"{value:,.2f}".rstrip("0").rstrip(".")
+
+
+def _summarize_series(values, max_chars):
+    """A {label: number} series (dates and prices) as its key figures plus evenly spaced rows."""
+    (first_key, first), (last_key, last) = values[0], values[-1]
+    low_key, low = min(values, key=lambda kv: kv[1])
+    high_key, high = max(values, key=lambda kv: kv[1])
+    change = f" ({(last - first) / first * 100:+.2f}%)" if first else ""
+    summary = (
+        f"{len(values)} values from {first_key} to {last_key}: first {_figure(first)}, "
+        f"last {_figure(last)}{change}, low {_figure(low)} on {low_key}, high {_figure(high)} on {high_key}"
+    )
+    row_chars = max(len(f"{k}: {_figure(v)}") for k, v in (values[0], values[-1])) + 2
+    count = max(2, min(len(values), (max_chars - len(summary)) // row_chars))
+    picks = sorted({round(i * (len(values) - 1) / (count - 1)) for i in range(count)})
+    rows = ", ".join(f"{values[i][0]}: {_figure(values[i][1])}" for i in picks)
+    return f"{summary}\nSampled: {rows}"
+
+
+def _clip_lines(lines, max_chars):
+    """The first and last whole lines of a table (the header and the latest rows) within `max_chars`."""
+    head, tail = [], []
+    budget = max_chars
+    while len(head) + len(tail) < len(lines):
+        # Alternate between the top and the bottom, starting with the header
+        top = len(head) <= len(tail)
+        line = lines[len(head)] if top else lines[len(lines) - 1 - len(tail)]
+        if len(line) + 1 > budget:
+            break
+        (head if top else tail).append(line)
+        budget -= len(line) + 1
+    omitted = len(lines) - len(head) - len(tail)
+    return "\n".join(head + [f"...[{omitted} rows omitted]..."] + tail[::-1])
+
+
+def compact_observation(text, max_tokens):
+    """Shrink an Observation to about `max_tokens`, keeping its most useful parts."""
+    text = str(text)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max_tokens * 4
+    stripped = text.strip()
+    if stripped.startswith("{") and stripped.endswith("}"):
+        try:
+            data = ast.literal_eval(stripped)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            data = None
+        if isinstance(data, dict) and data:
+            try:
+                values = [(str(k), float(str(v).replace(",", ""))) for k, v in data.items()]
+            except (TypeError, ValueError):
+                values = None
+            if values:
+                return _summarize_series(values, max_chars)
+        if isinstance(data, dict):
+            # Keep the short scalar fields; long text (business summaries) and nested lists are dropped
+            lines, used = [], 0
+            for key, value in data.items():
+                line = f"{key}: {value}"
+                if isinstance(value, (dict, list)) or len(line) > 80 or used + len(line) > max_chars:
+                    continue
+                lines.append(line)
+                used += len(line) + 1
+            return "\n".join(lines) + f"\n[{len(data) - len(lines)} more fields omitted]"
+    lines = stripped.splitlines()
+    if len(lines) > 3 and max(len(line) for line in lines) < max_chars // 3:
+        return _clip_lines(lines, max_chars)
+    head = int(max_chars * 0.7)
+    tail = max_chars - head
+    return f"{text[:head]}\n...[{len(text) - max_chars} characters omitted]...\n{text[-tail:]}"
+
+
+def format_scratchpad(intermediate_steps):
+    """`format_log_to_str` within SCRATCHPAD_TOKENS."""
+    last = len(intermediate_steps) - 1
+    steps = []
+    for i, (action, observation) in enumerate(intermediate_steps):
+        budget = OBSERVATION_TOKENS if i == last else OLD_OBSERVATION_TOKENS
+        steps.append([action.log, compact_observation(observation, budget)])
+
+    total = sum(estimate_tokens(log) + estimate_tokens(obs) for log, obs in steps)
+    for step in steps[:-1]:
+        if total <= SCRATCHPAD_TOKENS:
+            break
+        total -= estimate_tokens(step[1])
+        step[1] = "[omitted to save space]"
+
+    return "".join(f"{log}\nObservation: {obs}\nThought: " for log, obs in steps)
+
+
+_usage = contextvars.ContextVar("agent_usage", default=None)
+
+
+@contextmanager
+def usage_scope():
+    """Collect per-step prompt size and latency of agent runs inside the block."""
+    steps = []
+    token = _usage.set(steps)
+    try:
+        yield steps
+    finally:
+        _usage.reset(token)
+
+
+def _meter_start(prompt_value):
+    tokens = estimate_tokens(prompt_value.to_string())
+    steps = _usage.get()
+    if steps is not None:
+        steps.append({"step": len(steps) + 1, "prompt_tokens": tokens, "started": time.perf_counter()})
+    return prompt_value
+
+
+def _meter_end(message):
+    steps = _usage.get()
+    if steps:
+        step = steps[-1]
+        step["elapsed_ms"] = round((time.perf_counter() - step.pop("started")) * 1000, 1)
+        step["output_tokens"] = estimate_tokens(getattr(message, "content", str(message)))
+    return message
+
+
+def budgeted_react_agent(llm, tools, prompt, guard=None):
+    """
+    Drop-in replacement for langchain's `create_react_agent` with a bounded prompt.
+    With an llm_guard `guard`, every LLM step runs under it.
+    """
+    from langchain.agents.output_parsers import ReActSingleInputOutputParser
+    from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+
+    tools = list(tools)
+    llm_step = llm.bind(stop=["\nObservation"])
+    if guard is not None:
+        llm_step = guard.runnable(llm_step)
+
+    def tool_fields(inputs):
+        selected = select_tools(inputs["input"], tools)
+        return {"tools": render_tools(selected), "tool_names": ", ".join(t.name for t in selected)}
+
+    return (
+        RunnablePassthrough.assign(agent_scratchpad=lambda x: format_scratchpad(x["intermediate_steps"]))
+        # Chosen from the question alone, so the list is the same on every step of a run
+        | RunnableLambda(lambda x: {**x, **tool_fields(x)})
+        | prompt
+        | RunnableLambda(_meter_start)
+        | llm_step
+        | RunnableLambda(_meter_end)
+        | ReActSingleInputOutputParser()
+    )
@@ -25,6 +25,7 @@ Action: the action to take, should be one of [{{tool_names}}]
 Action Input: the input to the action
 Observation: the result of the action
 ... (this Thought/Action/Action Input/Observation can repeat N times)
+When you need several pieces of information that do not depend on each other, get them in a single step with the parallel_tools action.
 Thought: I now know the final answer
 Final Answer: the final answer to the original input question
 
@@ -0,0 +1,74 @@
+"""
+Lazily built shared resources.
+
+LLM clients, tools and the agent executor are registered here as factories
+and only built the first time something asks for them, so importing app.py
+or agent.py stays cheap. `warm_up` builds them ahead of traffic.
+"""
+import os
+import threading
+import time
+
+_factories = {}
+_instances = {}
+_lock = threading.RLock()
+
+
+def register(name, factory):
+    """Register a zero-argument factory under `name` (replacing any previous one)."""
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def get(name):
+    """Return the instance for `name`, building it on first use."""
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _instances:
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+
+def is_built(name):
+    return name in _instances
+
+
+def warm_up(names=None):
+    """
+    Build the given (default: all registered) resources now.
+
+    Returns:
+        dict: Seconds each resource took to build (0 if it already existed).
+    """
+    timings = {}
+    for name in list(names or _factories):
+        start = time.perf_counter()
+        get(name)
+        timings[name] = round(time.perf_counter() - start, 4)
+    return timings
+
+
+def gemini_client_options():
+    """
+    Transport settings for the Gemini clients.
+
+    GEMINI_API_ENDPOINT points them at another server speaking the Gemini REST
+    API (e.g. the stand-in in bench/fakes.py); unset, the public API is used.
+    """
+    endpoint = os.environ.get("GEMINI_API_ENDPOINT")
+    if not endpoint:
+        return {}
+    return {"transport": "rest", "client_options": {"api_endpoint": endpoint}}
+
+
+def _genai():
+    import google.generativeai as genai
+    genai.configure(api_key=os.environ["GEMINI_API_KEY"], **gemini_client_options())
+    return genai
+
+
+register("genai", _genai)
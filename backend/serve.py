@@ -0,0 +1,58 @@
+"""
+Production entry point for the backend.
+
+`python app.py` runs Flask's single-process debug server. This script serves
+the same app with a server that keeps many slow Gemini/agent requests in
+flight at once:
+
+    python serve.py                  # waitress, one thread per in-flight request
+    SERVER=gevent python serve.py    # gevent, one greenlet per request (pip install gevent)
+
+How many upstream calls actually run at once is capped separately by
+MAX_UPSTREAM_CONCURRENCY / MAX_UPSTREAM_QUEUE (see backpressure.py). Set
+WARM_UP=0 to skip building the Gemini clients and agent workers at start-up.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SERVER = os.environ.get("SERVER", "waitress")
+
+if SERVER == "gevent":
+    # Must patch before anything imports socket/threading
+    from gevent import monkey
+    monkey.patch_all()
+
+from app import app, warm_up  # noqa: E402
+
+
+def main():
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = int(os.environ.get("PORT", "5000"))
+    # Enough threads for every running and queued upstream call plus cheap routes
+    default_threads = (
+        int(os.environ.get("MAX_UPSTREAM_CONCURRENCY", "8"))
+        + int(os.environ.get("MAX_UPSTREAM_QUEUE", "32"))
+        + 16
+    )
+    threads = int(os.environ.get("SERVER_THREADS", default_threads))
+
+    # Clients are built lazily; pay for them now rather than on the first request
+    if os.environ.get("WARM_UP", "1") == "1":
+        warm_up()
+
+    if SERVER == "gevent":
+        from gevent.pool import Pool
+        from gevent.pywsgi import WSGIServer
+        print(f"Serving on http://{host}:{port} with gevent ({threads * 4} greenlets)")
+        WSGIServer((host, port), app, spawn=Pool(threads * 4)).serve_forever()
+    else:
+        from waitress import serve
+        print(f"Serving on http://{host}:{port} with waitress ({threads} threads)")
+        serve(app, host=host, port=port, threads=threads, connection_limit=threads * 4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Lightweight tracing and Prometheus metrics.
+
+Spans time a stage of a request and record it in a histogram by kind:
+
+    with telemetry.span("gemini", "upstream"):
+        response = model.generate_content(prompt)
+
+- "upstream" spans: wealthwise_upstream_duration_seconds{upstream=...}
+- "tool" spans:     wealthwise_tool_duration_seconds{tool=...}
+- anything else:    wealthwise_span_duration_seconds{span=...}
+
+A span that raises also counts in the matching *_errors_total counter. Every
+request gets an id (taken from X-Request-ID or generated) that is returned in
+the response headers, passed to agent workers and printed with each span when
+TELEMETRY_LOG=1. Responses also carry a Server-Timing header listing their
+spans. `render()` produces the Prometheus text format for /metrics.
+
+Agent workers record metrics in their own process; `drain()` hands them back
+with the job result and `merge()` adds them to the server's metrics.
+
+With TELEMETRY=0, spans and metric updates return immediately.
+"""
+import contextvars
+import functools
+import os
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+ENABLED = os.environ.get("TELEMETRY", "1") != "0"
+LOG_SPANS = os.environ.get("TELEMETRY_LOG", "0") == "1"
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+request_id = contextvars.ContextVar("request_id", default=None)
+_trace = contextvars.ContextVar("trace", default=None)
+
+_metrics = {}
+_gauges = {}
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics[name] = self
+
+    def inc(self, *label_values, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def _drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return [[list(k), v] for k, v in values.items()]
+
+    def _merge(self, rows):
+        for labels, value in rows:
+            self.inc(*labels, amount=value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = buckets
+        # labels -> [count per bucket..., sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics[name] = self
+
+    def observe(self, value, *label_values):
+        if not ENABLED:
+            return
+        with self._lock:
+            row = self._values.get(label_values)
+            if row is None:
+                row = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def _drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return [[list(k), v] for k, v in values.items()]
+
+    def _merge(self, rows):
+        with self._lock:
+            for labels, incoming in rows:
+                row = self._values.setdefault(tuple(labels), [0] * (len(self.buckets) + 2))
+                for i, value in enumerate(incoming):
+                    row[i] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, row in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, row):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_label_text(self.labels, labels, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, labels, le)} {row[-1]}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, labels)} {row[-2]:.6f}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, labels)} {row[-1]}")
+        return lines
+
+
+def gauge(name, help_text, fn):
+    """Register a gauge read at scrape time; `fn` returns {label dict (as tuple of pairs): value}."""
+    _gauges[name] = (help_text, fn)
+
+
+http_duration = Histogram("wealthwise_http_request_duration_seconds", "Time to respond, per route.", ("route", "method", "status"))
+http_requests = Counter("wealthwise_http_requests_total", "Requests served, per route.", ("route", "method", "status"))
+upstream_duration = Histogram("wealthwise_upstream_duration_seconds", "Latency of calls to external services.", ("upstream",))
+upstream_errors = Counter("wealthwise_upstream_errors_total", "Failed calls to external services.", ("upstream",))
+tool_duration = Histogram("wealthwise_tool_duration_seconds", "Latency of agent tool calls.", ("tool",))
+tool_errors = Counter("wealthwise_tool_errors_total", "Agent tool calls that raised.", ("tool",))
+span_duration = Histogram("wealthwise_span_duration_seconds", "Latency of other traced stages.", ("span",))
+span_errors = Counter("wealthwise_span_errors_total", "Other traced stages that raised.", ("span",))
+cache_requests = Counter("wealthwise_cache_requests_total", "Cache lookups by result.", ("cache", "result"))
+
+_KINDS = {
+    "upstream": (upstream_duration, upstream_errors),
+    "tool": (tool_duration, tool_errors),
+}
+
+
+class _Span:
+    __slots__ = ("name", "kind", "started")
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        duration, errors = _KINDS.get(self.kind, (span_duration, span_errors))
+        duration.observe(elapsed, self.name)
+        # A generator closed early (client went away) is not a failure
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            errors.inc(self.name)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((self.name, elapsed))
+        if LOG_SPANS:
+            status = "error" if exc_type else "ok"
+            print(f"[{request_id.get() or '-'}] {self.kind}:{self.name} {elapsed * 1000:.1f}ms {status}")
+        return False
+
+
+_NOOP = nullcontext()
+
+
+def span(name, kind="internal"):
+    """Time the enclosed block; a no-op when telemetry is disabled."""
+    if not ENABLED:
+        return _NOOP
+    return _Span(name, kind)
+
+
+def traced(name, kind="internal"):
+    """Decorator form of `span`."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Span(name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def cache_result(cache, hit):
+    if ENABLED:
+        cache_requests.inc(cache, "hit" if hit else "miss")
+
+
+def start_request(incoming_id=None):
+    """Begin a request: set its id and start collecting its spans. Returns the id."""
+    rid = incoming_id or uuid.uuid4().hex[:16]
+    request_id.set(rid)
+    if ENABLED:
+        _trace.set([])
+    return rid
+
+
+def server_timing():
+    """Server-Timing header value for the spans of the current request."""
+    trace = _trace.get() or []
+    return ", ".join(f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in trace[:20])
+
+
+def drain():
+    """Take (and reset) this process's metrics, to send them to another process."""
+    if not ENABLED:
+        return None
+    return {name: metric._drain() for name, metric in _metrics.items()}
+
+
+def merge(snapshot):
+    """Add metrics drained in a worker process."""
+    for name, rows in (snapshot or {}).items():
+        metric = _metrics.get(name)
+        if metric is not None:
+            metric._merge(rows)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics.values():
+        lines.extend(metric.render())
+    for name, (help_text, fn) in _gauges.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for labels, value in fn().items():
+            names, values = zip(*labels) if labels else ((), ())
+            lines.append(f"{name}{_label_text(names, values)} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,5 @@
+"""Worker handlers for test_worker_pool (imported by the spawned workers)."""
+
+
+def echo(state, payload, emit):
+    return payload
@@ -0,0 +1,29 @@
+import pytest
+
+import allocation_engine
+
+
+@pytest.mark.parametrize("text, years", [
+    ("invest Rs. 50,000 monthly for 20 years", 20),
+    ("I am 30 years old with 2 lakh", allocation_engine.DEFAULT_HORIZON),
+    ("I am 30 years old and want to invest for 15 years", 15),
+    ("where should I invest ten lakh for 7-10 years", 7),
+    ("saving for 18 months", 1.5),
+    ("I need the money in 18 months", 1.5),
+    ("invest 2 lakh for 1.5 years", 1.5),
+    ("park it for 2.5 yrs", 2.5),
+    ("over 1.5-2 years", 1.5),
+])
+def test_parse_horizon(text, years):
+    assert allocation_engine.parse_horizon(text) == years
+
+
+@pytest.mark.parametrize("amount, risk, horizon", [
+    (1000, "moderate", 12), (1500, "conservative", 1), (12345, "moderate", 4), (1000000, "aggressive", 20),
+])
+def test_allocation_labels_match_amounts(amount, risk, horizon):
+    allocation = allocation_engine.allocate(amount, risk, horizon)
+    assert sum(a for _, _, a in allocation) == amount
+    assert sum(p for _, p, _ in allocation) == 100
+    for _, percent, value in allocation:
+        assert abs(percent - value * 100 / amount) < 1
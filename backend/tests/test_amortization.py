@@ -0,0 +1,100 @@
+import json
+
+import numpy as np
+import pytest
+
+import amortization
+
+LOANS = [
+    {"name": "Home", "amount": "50,00,000", "interestrateanually": 8.5, "startdate": "2020-01-01", "duedate": "2040-01-01"},
+    {"name": "Car", "amount": 800000, "interestrateanually": 9.75, "startdate": "2023-04-01", "duedate": "2028-04-01"},
+    {"name": "Family", "amount": 120000, "interestrateanually": 0, "startdate": "2024-01-01", "duedate": "2025-01-01"},
+]
+
+
+def scalar_emi(principal, monthly_rate, months):
+    if monthly_rate == 0:
+        return principal / months
+    growth = (1 + monthly_rate) ** months
+    return principal * monthly_rate * growth / (growth - 1)
+
+
+def scalar_run(balance, monthly_rate, payment, months=None):
+    """Pay `payment` monthly, for `months` or until the loan is repaid: (balance, months, interest)."""
+    paid, interest = 0, 0.0
+    while balance > 1e-6 and (months is None or paid < months):
+        charge = balance * monthly_rate
+        interest += charge
+        balance = balance + charge - min(payment, balance + charge)
+        paid += 1
+    return balance, paid, interest
+
+
+@pytest.fixture
+def loans():
+    return amortization.to_arrays(LOANS)
+
+
+def test_emi_and_balance_match_the_scalar_formulas(loans):
+    payment = amortization.emi(loans["principal"], loans["rate"], loans["tenure"])
+    for i in range(len(LOANS)):
+        p, r, n = loans["principal"][i], loans["rate"][i], int(loans["tenure"][i])
+        assert payment[i] == pytest.approx(scalar_emi(p, r, n))
+        for k in (0, 1, n // 2, n):
+            expected = scalar_run(p, r, payment[i], k)[0]
+            assert amortization.balance(p, r, payment[i], k) == pytest.approx(expected, abs=1e-4)
+
+
+@pytest.mark.parametrize("mode", ["reduce_tenure", "reduce_emi"])
+def test_prepayment_matches_a_month_by_month_run(loans, mode):
+    amount, at_month = 100000, 12
+    result = amortization.prepayment(loans, amount, at_month, mode)
+    payment = amortization.emi(loans["principal"], loans["rate"], loans["tenure"])
+    for i in range(len(LOANS)):
+        p, r, n = loans["principal"][i], loans["rate"][i], int(loans["tenure"][i])
+        before, _, _ = scalar_run(p, r, payment[i], at_month)
+        _, _, interest_before = scalar_run(before, r, payment[i])
+        after = max(before - amount, 0)
+        new_emi = payment[i] if mode == "reduce_tenure" else scalar_emi(after, r, n - at_month) if after else 0
+        _, months, interest_after = scalar_run(after, r, new_emi) if after else (0, 0, 0.0)
+        assert result["new_emi"][i] == pytest.approx(new_emi)
+        assert result["new_remaining_months"][i] == months
+        assert result["interest_saved"][i] == pytest.approx(interest_before - interest_after, abs=0.01)
+
+
+@pytest.mark.parametrize("record, error", [
+    ({"amount": 1000, "startdate": "2024-01-01"}, "missing duedate"),
+    ({"amount": 1000, "interestrateanually": "eight", "startdate": "2024-01-01", "duedate": "2025-01-01"}, "not a number"),
+    ({"amount": -5, "startdate": "2024-01-01", "duedate": "2025-01-01"}, "non-negative"),
+    ({"amount": 1000, "startdate": "2025-01-01", "duedate": "2024-01-01"}, "before startdate"),
+    ({"amount": 1000, "startdate": "2000-01-01", "duedate": "2833-04-01"}, "longer than"),
+])
+def test_malformed_records_are_rejected(record, error):
+    with pytest.raises(ValueError, match=error):
+        amortization.to_arrays([record])
+
+
+def test_schedule_size_is_bounded(monkeypatch):
+    loans = amortization.to_arrays(LOANS)
+    monkeypatch.setattr(amortization, "MAX_SCHEDULE_ELEMENTS", 500)
+    with pytest.raises(ValueError, match="too large"):
+        amortization.schedule(loans)
+
+
+def test_bulk_skips_malformed_users(tmp_path):
+    users = tmp_path / "users.jsonl"
+    users.write_text("\n".join([
+        json.dumps({"user_id": "u1", "liabilities": LOANS[:2]}),
+        json.dumps({"user_id": "u2", "liabilities": [{**LOANS[0], "duedate": "2833-01-01"}]}),
+        "{not json",
+        json.dumps({"user_id": "u3", "liabilities": []}),
+    ]) + "\n")
+    out = tmp_path / "summaries.jsonl"
+    assert amortization.bulk(str(users), str(out), chunk_size=2, as_of="2024-06-01") == 2
+    summaries = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [s["user_id"] for s in summaries] == ["u1", "u3"]
+    loans = amortization.to_arrays(LOANS[:2])
+    assert summaries[0]["emi"] == pytest.approx(float(np.sum(
+        amortization.emi(loans["principal"], loans["rate"], loans["tenure"]))), abs=0.01)
+    errors = [json.loads(line) for line in (tmp_path / "summaries.jsonl.errors.jsonl").read_text().splitlines()]
+    assert [(e["line"], e["user_id"]) for e in errors] == [(2, "u2"), (3, None)]
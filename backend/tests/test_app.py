@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+import app as backend
+
+
+@pytest.fixture
+def client():
+    return backend.app.test_client()
+
+
+@pytest.mark.parametrize("path", ["/ai-financial-path", "/ai-financial-path/stream"])
+@pytest.mark.parametrize("horizon", ["ten", "nan", "-3"])
+def test_financial_path_rejects_a_bad_horizon(client, path, horizon):
+    response = client.post(path, data={"input": "invest 5 lakh", "horizon": horizon})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "horizon must be a number"}
+
+
+def test_financial_path_takes_a_numeric_horizon(client):
+    response = client.post("/ai-financial-path", data={"input": "invest 5 lakh", "horizon": "12", "mode": "local"})
+    assert response.status_code == 200
+    assert response.get_json()["nodes"]
+
+
+def test_agent_requests_from_different_sessions_are_not_shared(client, monkeypatch):
+    keys = []
+
+    def do(key, call):
+        keys.append(key)
+        return {"output": "ok"}, 200
+
+    monkeypatch.setattr(backend.inflight, "do", do)
+    for session_id in ("a", "b", "a"):
+        client.post("/agent", data={"input": "How is Cipla doing?", "session_id": session_id})
+    assert keys[0] != keys[1]
+    assert keys[0] == keys[2]
+
+
+class FakeStatements:
+    def transactions(self, user_id, source=None, limit=100):
+        self.limit = limit
+        return []
+
+
+@pytest.mark.parametrize("limit, used", [("5", 5), ("-1", 1), ("0", 1), ("100000", 1000)])
+def test_transactions_limit_is_clamped(client, monkeypatch, limit, used):
+    store = FakeStatements()
+    monkeypatch.setattr(backend.ingest, "get_store", lambda: store)
+    assert client.get(f"/transactions?user_id=u1&limit={limit}").status_code == 200
+    assert store.limit == used
+
+
+def test_transactions_rejects_a_non_integer_limit(client):
+    response = client.get("/transactions?user_id=u1&limit=ten")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "limit must be an integer"}
+
+
+def _events(response):
+    events = []
+    for message in response.get_data(as_text=True).strip().split("\n\n"):
+        event, data = message.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_financial_path_stream_stays_local_by_default(client, monkeypatch):
+    monkeypatch.delenv("FIN_PATH_MODE", raising=False)
+
+    def gemini(*args):
+        raise AssertionError("local mode must not call Gemini")
+
+    monkeypatch.setattr(backend.gemini_fin_path, "stream_gemini_response", gemini)
+    events = _events(client.post("/ai-financial-path/stream", data={"input": "invest 5 lakh"}))
+    assert events[1] == ("source", {"source": "local"})
+    assert events[-1][0] == "done" and events[-1][1]["source"] == "local"
+    assert backend.upstream.stats()["active"] == 0
+
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_financial_path_stream_sends_the_local_graph_before_gemini(client, monkeypatch, fails):
+    node = {"id": "index-funds", "position": {"x": 0, "y": 0}, "data": {"label": "Index Funds"}}
+
+    def gemini(input_text, risk):
+        yield "node", node
+        if fails:
+            raise RuntimeError("quota")
+        yield "graph", {"nodes": [node], "edges": []}
+
+    monkeypatch.setattr(backend.gemini_fin_path, "stream_gemini_response", gemini)
+    events = _events(client.post("/ai-financial-path/stream", data={"input": "invest 5 lakh", "mode": "enrich"}))
+    kinds = [kind for kind, _ in events]
+    assert events[1] == ("source", {"source": "local"})
+    switch = kinds.index("source", 2)
+    assert events[switch + 1] == ("node", node)
+    assert events[-1][1]["source"] == ("local" if fails else "gemini")
+    if fails:
+        assert events[switch + 2] == ("source", {"source": "local"})
@@ -0,0 +1,34 @@
+import pytest
+
+
+class FakeChat:
+    def __init__(self, history):
+        self.history = history
+        self.sent = []
+
+    def send_message(self, content):
+        self.sent.append(content)
+        return type("Response", (), {"text": f"answer {len(self.history)}"})()
+
+
+@pytest.mark.parametrize("module", ["gemini_bot", "gemini_flask_bot2"])
+def test_media_turns_are_remembered(monkeypatch, module):
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    bot = pytest.importorskip(module)
+    chats = []
+
+    def start_chat(history):
+        chats.append(FakeChat(history))
+        return chats[-1]
+
+    monkeypatch.setattr(bot.model, "start_chat", start_chat)
+    monkeypatch.setattr(bot, "upload_to_gemini", lambda path, mime_type=None: f"file:{path}")
+
+    bot.chat_with_gemini("What does this statement say?", ["/tmp/uploads/statement.mp3"], session_id="s1")
+    assert chats[0].sent == [["What does this statement say?", "file:/tmp/uploads/statement.mp3"]]
+
+    bot.chat_with_gemini("And what should I cut?", session_id="s1")
+    assert chats[1].history == [
+        {"role": "user", "parts": ["What does this statement say?\n[Attached: statement.mp3]"]},
+        {"role": "model", "parts": ["answer 0"]},
+    ]
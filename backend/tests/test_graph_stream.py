@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from graph_stream import GraphParser
+
+TREE = {"amount": 100000, "children": [
+    {"category": "Index Funds", "amount": 60000, "percent": 60},
+    {"category": "Debt Funds", "amount": 40000, "percent": 40},
+]}
+
+
+def _parse(text, size=7):
+    parser = GraphParser()
+    items = []
+    for i in range(0, len(text), size):
+        items += parser.feed(text[i:i + size])
+    return parser, items
+
+
+@pytest.mark.parametrize("preamble", [
+    "",
+    "Here is a plan for your {goal}, a {rough} split:\n",
+    "Think of it as {\"stage\": one} of your plan.\n",
+    "I will split {your money across:\n",
+])
+def test_braces_in_leading_prose_are_ignored(preamble):
+    parser, items = _parse(f"{preamble}```json\n{json.dumps(TREE)}\n```\nInvest {{wisely}}.")
+    assert items == [("allocation", child) for child in TREE["children"]]
+    assert parser.fields == {"amount": 100000}
+    assert parser.result() == TREE
+
+
+def test_object_without_a_fence_after_prose_braces():
+    parser, items = _parse("A {rough} plan and {\"not\": json} at all: " + json.dumps(TREE))
+    assert [item for _, item in items] == TREE["children"]
+    assert parser.result() == TREE
@@ -0,0 +1,99 @@
+import ingest
+
+
+def _store(tmp_path):
+    drop = tmp_path / "drop"
+    (drop / "u1" / "bank").mkdir(parents=True, exist_ok=True)
+    return ingest.StatementStore(str(tmp_path / "statements.sqlite"), str(drop), batch_size=2), drop / "u1" / "bank"
+
+
+def test_identical_transactions_in_one_statement_are_kept(tmp_path):
+    store, folder = _store(tmp_path)
+    path = folder / "jan.csv"
+    path.write_text("Date,Narration,Withdrawal,Deposit\n"
+                    "2024-01-05,Opening,,1000\n"
+                    "2024-01-06,Cafe,100,\n"
+                    "2024-01-06,Cafe,100,\n")
+    assert store.ingest_file(str(path), "u1", "bank") == 3
+    assert store.net_worth("u1")["assets"] == 800.0
+    # Re-ingesting the same file adds nothing
+    assert store.ingest_file(str(path), "u1", "bank") == 0
+    assert len(store.transactions("u1")) == 3
+
+
+def test_provider_transaction_ids_dedupe_across_files(tmp_path):
+    store, folder = _store(tmp_path)
+    rows = "Date,Narration,Amount,Txn ID\n2024-01-06,Cafe,-100,T1\n2024-01-06,Cafe,-100,T2\n"
+    (folder / "a.csv").write_text(rows)
+    (folder / "b.csv").write_text(rows)
+    assert store.scan() == {str(folder / "a.csv"): 2, str(folder / "b.csv"): 0}
+    assert store.net_worth("u1")["assets"] == -200.0
+
+
+def test_reads_do_not_see_a_half_ingested_file(tmp_path, monkeypatch):
+    store, folder = _store(tmp_path)
+    path = folder / "jan.csv"
+    path.write_text("Date,Narration,Deposit\n" + "".join(f"2024-01-{d:02d},Salary,100\n" for d in range(1, 6)))
+    seen = []
+    apply_batch = store._apply_batch
+
+    def watched(batch):
+        applied = apply_batch(batch)
+        seen.append(store.net_worth("u1"))
+        return applied
+
+    monkeypatch.setattr(store, "_apply_batch", watched)
+    store.ingest_file(str(path), "u1", "bank")
+    assert seen == [None, None, None]
+    assert store.net_worth("u1")["assets"] == 500.0
+
+
+def test_stores_from_older_versions_are_rebuilt(tmp_path):
+    store, folder = _store(tmp_path)
+    (folder / "jan.csv").write_text("Date,Narration,Deposit\n2024-01-01,Salary,100\n")
+    store.scan()
+    store._conn.execute("PRAGMA user_version = 0")
+    store._conn.commit()
+
+    store, _ = _store(tmp_path)
+    assert store.net_worth("u1") is None
+    store.scan()
+    assert store.net_worth("u1")["assets"] == 100.0
+
+
+def test_rows_always_belong_to_the_drop_folders_user(tmp_path):
+    store, folder = _store(tmp_path)
+    (folder / "jan.csv").write_text("Date,Narration,Deposit,User ID,Customer ID\n2024-01-01,Salary,100,u2,u2\n")
+    store.scan()
+    assert store.net_worth("u1")["assets"] == 100.0
+    assert store.net_worth("u2") is None
+    assert store.transactions("u2") == []
+
+
+def test_overlapping_exports_are_not_ingested_twice(tmp_path):
+    store, folder = _store(tmp_path)
+    (folder / "jan.csv").write_text("Date,Narration,Withdrawal,Deposit\n"
+                                    "2024-01-06,Cafe,100,\n"
+                                    "2024-01-06,Cafe,100,\n"
+                                    "2024-01-05,Salary,,1000\n")
+    # The same account exported again newest first under another name, with new rows on top
+    (folder / "jan-feb.csv").write_text("Date,Narration,Withdrawal,Deposit\n"
+                                        "2024-02-01,Rent,500,\n"
+                                        "2024-01-06,Cafe,100,\n"
+                                        "2024-01-06,CAFE ,100,\n"
+                                        "2024-01-06,Cafe,100,\n"
+                                        "2024-01-05,Salary,,1000\n")
+    assert store.scan() == {str(folder / "jan-feb.csv"): 5, str(folder / "jan.csv"): 0}
+    assert len(store.transactions("u1")) == 5
+    assert store.net_worth("u1")["assets"] == 200.0
+
+
+def test_mf_units_are_not_counted_twice_on_re_export(tmp_path):
+    store, _ = _store(tmp_path)
+    folder = tmp_path / "drop" / "u1" / "mf"
+    folder.mkdir()
+    rows = "Date,Scheme,Amount,Units,NAV\n2024-01-10,Index Fund,1000,10,100\n"
+    (folder / "cas-jan.csv").write_text(rows)
+    (folder / "cas-q1.csv").write_text(rows + "2024-02-10,Index Fund,1100,10,110\n")
+    store.scan()
+    assert store.holdings("u1", "mf")["assets"][0]["Quantity"] == "20.000"
@@ -0,0 +1,21 @@
+import time
+
+import pytest
+
+import llm_guard
+
+
+def _guard():
+    return llm_guard.Guard("test-llm", llm_guard.CircuitBreaker("test"), hedge=False, max_retries=0)
+
+
+def test_deadline_message_keeps_sub_second_deadlines():
+    with pytest.raises(llm_guard.DeadlineExceeded, match=r"within 0\.050s"):
+        _guard().call(lambda remaining: time.sleep(0.5), timeout=0.05)
+
+
+def test_stream_deadline_message_names_the_deadline():
+    with pytest.raises(llm_guard.DeadlineExceeded, match=r"within 0\.010s"):
+        with _guard().streaming(timeout=0.01) as check:
+            time.sleep(0.05)
+            check()
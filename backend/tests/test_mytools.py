@@ -0,0 +1,39 @@
+import datetime
+
+import numpy as np
+
+from tools import mytools
+
+TODAY = datetime.date.today()
+YESTERDAY = TODAY - datetime.timedelta(days=1)
+
+
+class FakeStore:
+    """Two stored bars whose adjusted closes are on a different basis (a 2:1 split) from the raw ones."""
+
+    def __init__(self, latest):
+        self._latest = latest
+
+    def read(self, symbol, start, end):
+        return {
+            "date": np.array([start, YESTERDAY], dtype="datetime64[D]"),
+            "close": np.array([100.0, 110.0]),
+            "adj_close": np.array([50.0, 55.0]),
+        }
+
+    def latest(self, symbol):
+        return self._latest
+
+
+def returns(monkeypatch, latest):
+    monkeypatch.setattr(mytools, "get_store", lambda: FakeStore(latest))
+    monkeypatch.setattr(mytools, "get_ticker_from_company", lambda name: "TEST.NS")
+    return mytools.evaluate_returns.func("Test Co, 1Y")
+
+
+def test_returns_use_one_price_series(monkeypatch):
+    assert "changed by 10.00%" in returns(monkeypatch, (YESTERDAY, 110.0))
+
+
+def test_returns_extend_the_adjusted_series_with_todays_move(monkeypatch):
+    assert "changed by 21.00%" in returns(monkeypatch, (TODAY, 121.0))
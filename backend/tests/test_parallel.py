@@ -0,0 +1,42 @@
+from langchain_core.tools import Tool
+
+from caching import SQLiteCache
+from tools import parallel
+
+
+def _counting_tool(name):
+    calls = []
+
+    def run(text):
+        calls.append(text)
+        return f"{name}({text}) #{len(calls)}"
+
+    return parallel.memoized(Tool(name=name, description=name, func=run)), calls
+
+
+def test_session_results_are_shared_between_workers(tmp_path):
+    shared = SQLiteCache(str(tmp_path / "memo.sqlite"))
+    tool, calls = _counting_tool("get_company_info")
+    # Two workers answering follow-ups of the same session, each with its own in-process memo
+    with parallel.scope(parallel.ToolMemo(shared, "s1")):
+        first = tool.run("Cipla")
+    with parallel.scope(parallel.ToolMemo(shared, "s1")):
+        assert tool.run("cipla") == first
+    with parallel.scope(parallel.ToolMemo(shared, "s2")):
+        tool.run("Cipla")
+    assert calls == ["Cipla", "Cipla"]
+
+
+def test_live_prices_are_only_reused_briefly(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel, "LIVE_TTL", 0)
+    shared = SQLiteCache(str(tmp_path / "memo.sqlite"))
+    price, price_calls = _counting_tool("get_current_price")
+    info, info_calls = _counting_tool("get_company_info")
+    with parallel.scope(parallel.ToolMemo(shared, "s1")):
+        for _ in range(2):
+            price.run("Cipla")
+            info.run("Cipla")
+    with parallel.scope(parallel.ToolMemo(shared, "s1")):
+        price.run("Cipla")
+    assert len(price_calls) == 3
+    assert len(info_calls) == 1
@@ -0,0 +1,62 @@
+import datetime
+
+import numpy as np
+
+from tools import price_store
+
+TODAY = datetime.date.today()
+
+
+class FakeYahoo:
+    """Daily bars priced by day number, for the days that are not in `missing`."""
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.calls = []
+
+    def __call__(self, symbol, start, end):
+        self.calls.append((start, end))
+        days = np.array([price_store.to_day(start + datetime.timedelta(days=i))
+                         for i in range((end - start).days + 1)], dtype=np.int64)
+        days = days[[price_store.from_day(d) not in self.missing for d in days]]
+        closes = days.astype(np.float64)
+        return days, {c: closes.copy() for c in price_store.COLUMNS}
+
+
+def test_days_yahoo_did_not_return_are_fetched_again(tmp_path):
+    start, end = TODAY - datetime.timedelta(days=20), TODAY - datetime.timedelta(days=1)
+    outage = {end - datetime.timedelta(days=i) for i in range(3)}
+    fetch = FakeYahoo(missing=outage)
+    store = price_store.PriceStore(str(tmp_path), fetch=fetch)
+    assert len(store.read("TEST.NS", start, end)["close"]) == 17
+
+    fetch.missing = set()
+    bars = store.read("TEST.NS", start, end)
+    assert len(bars["close"]) == 20
+    assert fetch.calls[-1] == (min(outage), end)
+
+
+def test_nothing_is_recorded_when_the_first_fetch_is_empty(tmp_path):
+    start, end = TODAY - datetime.timedelta(days=5), TODAY - datetime.timedelta(days=1)
+    fetch = FakeYahoo(missing={start + datetime.timedelta(days=i) for i in range(5)})
+    store = price_store.PriceStore(str(tmp_path), fetch=fetch)
+    assert len(store.read("TEST.NS", start, end)["close"]) == 0
+    fetch.missing = set()
+    assert len(store.read("TEST.NS", start, end)["close"]) == 5
+
+
+def test_reads_map_the_columns_under_the_symbols_lock(tmp_path, monkeypatch):
+    store = price_store.PriceStore(str(tmp_path), fetch=FakeYahoo())
+    start, end = TODAY - datetime.timedelta(days=10), TODAY - datetime.timedelta(days=1)
+    store.read("TEST.NS", start, end)
+    columns = store._columns
+    held = []
+
+    def watched(symbol):
+        held.append(store._locks[symbol].locked())
+        return columns(symbol)
+
+    monkeypatch.setattr(store, "_columns", watched)
+    bars = store.read("TEST.NS", start, end)
+    assert held == [True]
+    assert (bars["close"] == bars["date"].astype(np.int64)).all()
@@ -0,0 +1,18 @@
+import pytest
+
+import projection
+
+HOLDINGS = {"equity": 500000, "debt": 300000, "gold": 100000, "cash": 50000, "crypto": 10000}
+
+
+def test_rejects_projections_over_the_element_budget():
+    with pytest.raises(ValueError, match="too large"):
+        projection.simulate(HOLDINGS, years=50, paths=projection.MAX_PATHS)
+
+
+def test_chunked_simulation_matches_one_chunk(monkeypatch):
+    whole = projection.simulate(HOLDINGS, years=5, paths=2000, monthly_contribution=1000, seed=7)
+    monkeypatch.setattr(projection, "CHUNK_ELEMENTS", 10000)
+    chunked = projection.simulate(HOLDINGS, years=5, paths=2000, monthly_contribution=1000, seed=7)
+    assert chunked["percentiles"] == whole["percentiles"]
+    assert chunked["probability_of_loss"] == whole["probability_of_loss"]
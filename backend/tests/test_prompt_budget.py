@@ -0,0 +1,44 @@
+import datetime
+
+from langchain_core.agents import AgentAction
+
+import prompt_budget
+
+
+START = datetime.date(2022, 1, 3)
+LAST = str(START + datetime.timedelta(days=749))
+
+
+def _history(start_price, step, days=750):
+    return str({str(START + datetime.timedelta(days=i)): f"{start_price + i * step:.2f}" for i in range(days)})
+
+
+def _step(tool, tool_input, observation):
+    log = f"Thought: I need {tool}\nAction: {tool}\nAction Input: {tool_input}"
+    return AgentAction(tool, tool_input, log), observation
+
+
+def test_earlier_figures_survive_until_the_answer():
+    steps = [
+        _step("get_historical_price", "Infosys, 2022-01-03, 750", _history(1500, 1)),
+        _step("get_historical_price", "TCS, 2022-01-03, 750", _history(3000, -1)),
+        _step("get_current_prices", "Infosys, TCS", "Company | Symbol | Price | Day change\n"
+              "Infosys | INFY.NS | 2251.00 | +0.40%\nTCS | TCS.NS | 2251.00 | -0.10%"),
+    ]
+    scratchpad = prompt_budget.format_scratchpad(steps)
+    # First and last prices and the change of both histories, not just the newest observation
+    for figures in (["first 1,500", "last 2,249", "+49.93%", f"to {LAST}"],
+                    ["first 3,000", "last 2,251", "-24.97%", f"low 2,251 on {LAST}"]):
+        for figure in figures:
+            assert figure in scratchpad
+    assert "INFY.NS | 2251.00" in scratchpad
+    assert prompt_budget.estimate_tokens(scratchpad) <= prompt_budget.SCRATCHPAD_TOKENS + 100
+
+
+def test_tables_keep_their_header_and_latest_rows():
+    table = "\n".join(["Date | Close"] + [f"2023-01-{i % 28 + 1:02d} | {i}.00" for i in range(400)])
+    compact = prompt_budget.compact_observation(table, 100)
+    lines = compact.splitlines()
+    assert lines[0] == "Date | Close"
+    assert lines[-1].endswith("| 399.00")
+    assert "rows omitted" in compact
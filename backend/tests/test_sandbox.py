@@ -0,0 +1,42 @@
+import os
+import time
+
+import pytest
+
+from tools import sandbox
+
+
+@pytest.fixture(scope="module")
+def repl():
+    repl = sandbox.SandboxREPL(size=1, timeout=30)
+    yield repl
+    repl.pool.shutdown()
+
+
+def _scratch_dirs():
+    return set(os.listdir(sandbox.ROOT)) if os.path.isdir(sandbox.ROOT) else set()
+
+
+def test_scratch_directories_are_removed(repl):
+    before = _scratch_dirs()
+    for _ in range(3):
+        assert repl.run("open('out.txt', 'w').write('x' * 1000)\nprint('ok')").strip() == "ok"
+    repl.run("import os, signal\nos.kill(os.getpid(), signal.SIGKILL)")
+    # Only the warm sandbox waiting for the next call may still have one
+    deadline = time.time() + 10
+    while len(_scratch_dirs() - before) > 1 and time.time() < deadline:
+        time.sleep(0.2)
+        sandbox.sweep()
+    left = _scratch_dirs() - before
+    assert len(left) <= 1
+    assert all(sandbox._running(int(name.split("-")[0])) for name in left)
+
+
+def test_file_size_is_limited(repl):
+    output = repl.run(f"with open('big', 'wb') as f:\n    f.write(b'0' * ({sandbox.FILE_MB} * 1024 * 1024 + 1))")
+    assert "File too large" in output
+
+
+def test_open_files_are_limited(repl):
+    output = repl.run(f"files = [open('f%d' % i, 'w') for i in range({sandbox.OPEN_FILES})]")
+    assert "Too many open files" in output
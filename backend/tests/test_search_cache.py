@@ -0,0 +1,26 @@
+import pytest
+
+from tools.search_cache import search_key
+from tools.ticker_index import TickerIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    return TickerIndex(str(tmp_path / "ticker_index.json"))
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Bank of India news", "Indian Bank news"),
+    ("Indian Oil share price", "oil price"),
+    ("NSE holidays", "BSE holidays"),
+])
+def test_different_companies_and_exchanges_get_different_keys(index, first, second):
+    assert search_key(first, index) != search_key(second, index)
+
+
+def test_names_resolving_to_one_symbol_share_a_key(index):
+    assert search_key("Cipla pharmaceuticals news", index) == search_key("Cipla share news", index)
+
+
+def test_news_and_evergreen_queries_are_kept_apart(index):
+    assert search_key("Cipla news", index) != search_key("Cipla annual report", index)
@@ -0,0 +1,29 @@
+import threading
+
+import pytest
+
+from worker_pool import WorkerError, WorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(None, "pool_jobs:echo", size=1, timeout=30, name="test-worker")
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def test_failed_send_gives_the_slot_back(pool):
+    for _ in range(3):
+        with pytest.raises(WorkerError):
+            pool.submit(threading.Lock())  # cannot be pickled
+    assert pool.submit("still serving") == "still serving"
+
+
+def test_broken_pipe_retires_the_worker(pool):
+    worker = pool._checkout(30)
+    worker.conn.close()
+    pool._idle.put(worker)
+    with pytest.raises(WorkerError):
+        pool.submit("lost")
+    assert pool.submit("hello") == "hello"
@@ -0,0 +1,205 @@
+"""
+Cached company fundamentals for the finance tools.
+
+yfinance's `Ticker.info` is a dict of 150+ fields that takes a Yahoo
+round trip or two to fetch. The advisor only ever uses a couple of dozen of
+them, so `get` keeps just those as a Fundamentals record, cached per symbol
+for FUNDAMENTALS_TTL seconds (default a day) in memory and in a SQLite file
+shared by all agent workers, and `describe` renders a record as a few short
+fixed-format lines for the agent to read.
+
+    from tools import fundamentals
+    print(fundamentals.describe(fundamentals.get("CIPLA.NS")))
+"""
+import os
+import threading
+from typing import NamedTuple, Optional
+
+import yfinance as yf
+
+import telemetry
+from caching import SQLiteCache, TieredCache, TTLCache, cache_dir, make_key
+from tools import http_pool
+
+TTL = float(os.environ.get("FUNDAMENTALS_TTL", "86400"))
+
+
+class Fundamentals(NamedTuple):
+    """
+    The fields of a company's Yahoo profile the advisor uses. Margins, returns
+    and growth rates are fractions; dividend_yield is in percent, as Yahoo gives it.
+    """
+    symbol: str
+    name: Optional[str] = None
+    sector: Optional[str] = None
+    industry: Optional[str] = None
+    currency: Optional[str] = None
+    price: Optional[float] = None
+    market_cap: Optional[float] = None
+    trailing_pe: Optional[float] = None
+    forward_pe: Optional[float] = None
+    price_to_book: Optional[float] = None
+    eps: Optional[float] = None
+    dividend_yield: Optional[float] = None
+    profit_margin: Optional[float] = None
+    operating_margin: Optional[float] = None
+    return_on_equity: Optional[float] = None
+    debt_to_equity: Optional[float] = None
+    revenue: Optional[float] = None
+    revenue_growth: Optional[float] = None
+    earnings_growth: Optional[float] = None
+    week52_low: Optional[float] = None
+    week52_high: Optional[float] = None
+    beta: Optional[float] = None
+    recommendation: Optional[str] = None
+    target_price: Optional[float] = None
+
+
+# Fundamentals field: Yahoo info keys to take it from, first present wins
+INFO_KEYS = {
+    "name": ("longName", "shortName"),
+    "sector": ("sector",),
+    "industry": ("industry",),
+    "currency": ("currency", "financialCurrency"),
+    "price": ("currentPrice", "regularMarketPrice", "previousClose"),
+    "market_cap": ("marketCap",),
+    "trailing_pe": ("trailingPE",),
+    "forward_pe": ("forwardPE",),
+    "price_to_book": ("priceToBook",),
+    "eps": ("trailingEps",),
+    "dividend_yield": ("dividendYield",),
+    "profit_margin": ("profitMargins",),
+    "operating_margin": ("operatingMargins",),
+    "return_on_equity": ("returnOnEquity",),
+    "debt_to_equity": ("debtToEquity",),
+    "revenue": ("totalRevenue",),
+    "revenue_growth": ("revenueGrowth",),
+    "earnings_growth": ("earningsGrowth",),
+    "week52_low": ("fiftyTwoWeekLow",),
+    "week52_high": ("fiftyTwoWeekHigh",),
+    "beta": ("beta",),
+    "recommendation": ("recommendationKey",),
+    "target_price": ("targetMeanPrice",),
+}
+
+
+def from_info(symbol, info):
+    """Project a yfinance `info` dict onto a Fundamentals record."""
+    values = {}
+    for field, keys in INFO_KEYS.items():
+        for key in keys:
+            value = info.get(key)
+            if value not in (None, "", "Infinity", "NaN"):
+                break
+        else:
+            continue
+        kind = Fundamentals.__annotations__[field]
+        if kind == Optional[float]:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            if value != value:  # NaN
+                continue
+        else:
+            value = str(value)
+        values[field] = value
+    return Fundamentals(symbol=symbol, **values)
+
+
+def found(f: Fundamentals) -> bool:
+    """Whether Yahoo knew the symbol (unknown ones come back without a name or price)."""
+    return bool(f.name) or f.price is not None
+
+
+def _fetch_info(symbol):
+    with telemetry.span("yahoo_info", "upstream"), http_pool.limited(http_pool.YAHOO):
+        return yf.Ticker(symbol).info
+
+
+def _number(value, digits=2):
+    return "n/a" if value is None else f"{value:,.{digits}f}"
+
+
+def _percent(value, fraction=True, digits=1):
+    return "n/a" if value is None else f"{value * 100 if fraction else value:.{digits}f}%"
+
+
+def _big(value):
+    """1.2e12 -> 1.20T"""
+    if value is None:
+        return "n/a"
+    for size, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+        if abs(value) >= size:
+            return f"{value / size:.2f}{suffix}"
+    return f"{value:,.0f}"
+
+
+def describe(f: Fundamentals) -> str:
+    """A company's fundamentals as six short lines, always in the same format."""
+    currency = f" {f.currency}" if f.currency else ""
+    money = lambda text, value: text + currency if value is not None else text
+    growth = f" ({_percent(f.revenue_growth)} y/y)" if f.revenue_growth is not None else ""
+    return "\n".join([
+        f"{f.name or f.symbol} ({f.symbol}) | {f.sector or 'n/a'} / {f.industry or 'n/a'}",
+        f"Price {money(_number(f.price), f.price)} | Market cap {money(_big(f.market_cap), f.market_cap)} | "
+        f"52w range {_number(f.week52_low)} - {_number(f.week52_high)}",
+        f"P/E {_number(f.trailing_pe, 1)} (forward {_number(f.forward_pe, 1)}) | P/B {_number(f.price_to_book, 1)} | "
+        f"EPS {_number(f.eps)} | Dividend yield {_percent(f.dividend_yield, fraction=False, digits=2)}",
+        f"Profit margin {_percent(f.profit_margin)} | Operating margin {_percent(f.operating_margin)} | "
+        f"ROE {_percent(f.return_on_equity)} | Debt/Equity {_number(f.debt_to_equity, 1)}",
+        f"Revenue {money(_big(f.revenue), f.revenue)}{growth} | Earnings growth {_percent(f.earnings_growth)} | "
+        f"Beta {_number(f.beta)}",
+        f"Analysts: {f.recommendation or 'n/a'}, mean target {_number(f.target_price)}",
+    ])
+
+
+class FundamentalsCache:
+    """
+    Fundamentals by symbol, fetched from Yahoo at most once per `ttl`.
+
+    Args:
+        cache: Any cache with get/set/stats; defaults to memory + SQLite.
+        fetch: fetch(symbol) -> yfinance-style info dict (tests, other sources).
+        ttl (float): Seconds a record is reused.
+    """
+
+    def __init__(self, cache=None, fetch=None, ttl=TTL):
+        if cache is None:
+            path = os.environ.get("FUNDAMENTALS_CACHE_DB") or os.path.join(cache_dir(), "fundamentals.sqlite")
+            cache = TieredCache(TTLCache(maxsize=512, ttl=ttl), SQLiteCache(path, maxsize=5000, ttl=ttl))
+        self.cache = cache
+        self.fetch = fetch or _fetch_info
+        self.ttl = ttl
+
+    def get(self, symbol: str) -> Fundamentals:
+        """The symbol's fundamentals; every field is None if Yahoo does not know it."""
+        key = make_key("fundamentals", symbol.upper())
+        stored = self.cache.get(key)
+        telemetry.cache_result("fundamentals", stored is not None)
+        if stored is not None:
+            return Fundamentals(**stored)
+        record = from_info(symbol, self.fetch(symbol) or {})
+        if found(record):
+            self.cache.set(key, record._asdict(), self.ttl)
+        return record
+
+    def stats(self):
+        return self.cache.stats()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> FundamentalsCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FundamentalsCache()
+    return _cache
+
+
+def get(symbol: str) -> Fundamentals:
+    return get_cache().get(symbol)
@@ -0,0 +1,226 @@
+"""
+Shared outbound HTTP for the finance tools.
+
+Every Yahoo lookup goes through here:
+
+- one keep-alive `requests.Session` per process, so repeated lookups reuse
+  their TCP/TLS connections;
+- at most HTTP_HOST_CONCURRENCY requests in flight per site in each process;
+- a token bucket per site (HTTP_HOST_RATE requests per second, bursts of
+  HTTP_HOST_BURST) kept in a file under the cache directory, so the server and
+  all agent workers share one budget and do not trip Yahoo's throttling
+  together. A 429 pauses the bucket for the Retry-After time;
+- `fan_out(fn, items)` to run lookups concurrently on a shared thread pool.
+
+    from tools import http_pool
+    response = http_pool.get(url, params=params, headers=HEADERS)
+    quotes = http_pool.fan_out(fetch_quote, symbols)
+    with http_pool.limited(http_pool.YAHOO):    # clients with their own connections, e.g. yfinance
+        info = yf.Ticker(symbol).info
+
+Sites are registered domains ("yahoo.com" for query1/query2.finance.yahoo.com),
+or the address itself for IPs.
+"""
+import contextvars
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import telemetry
+from caching import cache_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows: the bucket is per process only
+    fcntl = None
+
+HOST_CONCURRENCY = int(os.environ.get("HTTP_HOST_CONCURRENCY", "4"))
+HOST_RATE = float(os.environ.get("HTTP_HOST_RATE", "5"))
+HOST_BURST = float(os.environ.get("HTTP_HOST_BURST", "10"))
+POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "16"))
+# Longest a request waits for a slot and a token before giving up
+MAX_WAIT = float(os.environ.get("HTTP_MAX_WAIT", "30"))
+
+YAHOO = "yahoo.com"
+
+limit_wait = telemetry.Histogram("wealthwise_http_limit_wait_seconds", "Time outbound requests waited for the per-site limits.", ("site",))
+throttled = telemetry.Counter("wealthwise_http_throttled_total", "Outbound requests answered with 429.", ("site",))
+
+
+class Throttled(Exception):
+    """A request could not get a slot or a token in time."""
+
+
+def site_of(url_or_host):
+    """The rate-limited site of a URL or host name."""
+    host = urlsplit(url_or_host).hostname if "//" in url_or_host else url_or_host
+    host = (host or "").lower()
+    if re.fullmatch(r"[\d.]+|[0-9a-f:]*:[0-9a-f:]*", host):
+        return host
+    return ".".join(host.split(".")[-2:])
+
+
+class TokenBucket:
+    """
+    Token bucket, optionally shared between processes through a file.
+
+    Args:
+        rate (float): Tokens added per second.
+        burst (float): Most tokens the bucket holds.
+        path (str): File holding the bucket's state; None keeps it in this process.
+    """
+
+    def __init__(self, rate, burst, path=None):
+        self.rate = rate
+        self.burst = burst
+        self.path = path if fcntl is not None else None
+        self._state = [burst, time.time(), 0.0]  # tokens, updated at, paused until
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked_state(self):
+        with self._lock:
+            if self.path is None:
+                yield self._state
+                return
+            with open(self.path, "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        state = [float(v) for v in f.read().split()]
+                    except ValueError:
+                        state = []
+                    if len(state) != 3:
+                        state = [self.burst, time.time(), 0.0]
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(" ".join(repr(v) for v in state))
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _try_take(self):
+        """Take a token; returns 0, or the seconds to wait before trying again."""
+        with self._locked_state() as state:
+            now = time.time()
+            if state[2] > now:
+                return state[2] - now
+            state[0] = min(self.burst, state[0] + (now - state[1]) * self.rate)
+            state[1] = now
+            if state[0] >= 1:
+                state[0] -= 1
+                return 0
+            return (1 - state[0]) / self.rate
+
+    def take(self, timeout=MAX_WAIT):
+        """
+        Wait for a token.
+
+        Raises:
+            Throttled: If none is available within `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._try_take()
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise Throttled(f"No request budget left for the next {wait:.1f}s")
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hand out no tokens for `seconds` (e.g. after a 429)."""
+        with self._locked_state() as state:
+            state[2] = max(state[2], time.time() + seconds)
+            state[0] = 0
+
+
+_sites = {}
+_sites_lock = threading.Lock()
+
+
+def _limits(site):
+    with _sites_lock:
+        limits = _sites.get(site)
+        if limits is None:
+            path = os.path.join(cache_dir("http"), re.sub(r"[^a-z0-9.]", "_", site) + ".bucket")
+            limits = _sites[site] = (threading.BoundedSemaphore(HOST_CONCURRENCY), TokenBucket(HOST_RATE, HOST_BURST, path))
+        return limits
+
+
+@contextmanager
+def limited(site, timeout=MAX_WAIT):
+    """
+    Hold one of the site's concurrent slots and spend one of its tokens.
+
+    Raises:
+        Throttled: If that takes longer than `timeout` seconds.
+    """
+    slots, bucket = _limits(site_of(site))
+    started = time.monotonic()
+    if not slots.acquire(timeout=timeout):
+        raise Throttled(f"Too many requests to {site} in flight")
+    try:
+        bucket.take(max(0, timeout - (time.monotonic() - started)))
+        limit_wait.observe(time.monotonic() - started, site_of(site))
+        yield
+    finally:
+        slots.release()
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def session():
+    """This process's pooled session (a new one after a fork)."""
+    global _session, _session_pid
+    if _session_pid != os.getpid():
+        with _session_lock:
+            if _session_pid != os.getpid():
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_SIZE, max_retries=0)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session, _session_pid = s, os.getpid()
+    return _session
+
+
+def request(method, url, timeout=10, **kwargs):
+    """
+    Send a request through the shared session within the site's limits.
+
+    Raises:
+        Throttled: If the site's limits did not allow it within MAX_WAIT.
+        requests.RequestException: As `requests` would.
+    """
+    site = site_of(url)
+    with limited(site):
+        response = session().request(method, url, timeout=timeout, **kwargs)
+    if response.status_code == 429:
+        throttled.inc(site)
+        retry_after = response.headers.get("Retry-After", "")
+        _limits(site)[1].pause(float(retry_after) if retry_after.isdigit() else 10)
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+_fanout = ThreadPoolExecutor(max_workers=int(os.environ.get("HTTP_FANOUT_WORKERS", "8")), thread_name_prefix="http")
+
+
+def fan_out(fn, items):
+    """`fn` over `items` concurrently on the shared pool; results in input order."""
+    futures = [_fanout.submit(contextvars.copy_context().run, fn, item) for item in items]
+    return [future.result() for future in futures]
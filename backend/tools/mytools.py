@@ -48,16 +48,33 @@ def power(a: int, b: int) -> int:
 
 # ======================================== USEFUL TOOLS ========================================
 from langchain_core.tools import Tool
-from langchain_experimental.utilities import PythonREPL
-from langchain_community.tools import DuckDuckGoSearchRun
-
-search = DuckDuckGoSearchRun()
+import registry
+
+# The search client and the REPL are only built when the agent first uses them
+def _build_search():
+    from langchain_community.tools import DuckDuckGoSearchRun
+    # Repeated searches are answered from a shared cache (see tools/search_cache.py)
+    from tools.search_cache import CachedSearch
+    return CachedSearch(DuckDuckGoSearchRun())
+
+def _build_python_repl():
+    # Runs each command in a separate, resource-limited process (see tools/sandbox.py)
+    from tools.sandbox import SandboxREPL
+    return SandboxREPL()
+
+registry.register("ddg_search", _build_search)
+registry.register("python_repl", _build_python_repl)
+
+search = Tool(
+    name="duckduckgo_search",
+    description="A wrapper around DuckDuckGo Search. Useful for when you need to answer questions about current events. Input should be a search query.",
+    func=lambda query: registry.get("ddg_search").run(query),
+)
 
-python_repl = PythonREPL()
 repl_tool = Tool(
     name="python_repl",
-    description="A Python shell. Use this to execute python commands. Input should be a valid python command. If you want to see the output of a value, you should print it out with `print(...)`.",
-    func=python_repl.run,
+    description="A Python shell. Use this to execute python commands. Input should be a valid python command. If you want to see the output of a value, you should print it out with `print(...)`. numpy (np) and pandas (pd) are already imported; every command runs in a fresh interpreter with a time and memory limit.",
+    func=lambda command: registry.get("python_repl").run(command),
 )
 
 # ======================================== FINANCE TOOLS ========================================
@@ -66,34 +83,24 @@ from typing import List, Dict
 import requests
 import json
 from pathlib import Path
+import re
+from tools import fundamentals, http_pool, ticker_index
+from tools.price_store import get_store
 
 def get_ticker_from_company(company_name: str) -> str:
     """
     Get the stock ticker symbol for a given company name.
 
+    Names are resolved from the local ticker index (see tools/ticker_index.py);
+    only unknown names trigger a Yahoo search.
+
     Args:
         company_name (str): The name of the company.
 
     Returns:
         str: The stock ticker symbol.
     """
-    base_url = f"https://query1.finance.yahoo.com/v1/finance/search?q={company_name}&lang=en-US&region=US&quotesCount=5&newsCount=3&listsCount=2&enableFuzzyQuery=false&quotesQueryId=tss_match_phrase_query&multiQuoteQueryId=multi_quote_single_token_query&newsQueryId=news_cie_vespa&enableCb=true&enableNavLinks=true&enableEnhancedTrivialQuery=true&enableResearchReports=true&enableCulturalAssets=true&enableLogoUrl=true&enableLists=false&recommendCount=5"
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'application/json, text/plain, */*',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Referer': 'https://finance.yahoo.com/',
-        'Origin': 'https://finance.yahoo.com'
-    }
-    
-    response = requests.get(base_url, headers=headers)
-    data = response.json()
-    try:
-        symbol = data['quotes'][0]['symbol']
-    except:
-        return Exception("Company name not found, try again by providing a valid company name.")
-    return symbol
+    return ticker_index.resolve(company_name)
 
 # 1. Fetch Historical Data
 @tool
@@ -102,7 +109,7 @@ def get_historical_price(inputs: str) -> str:
     Fetch historical stock prices for a given company over a specified date range.
 
     Args:
-        inputs (str): A string containing the company name(The name of the company), start date(Start date in the format 'YYYY-MM-DD'), and duration(number of days to fetch the data for) max 30 days.
+        inputs (str): A string containing the company name(The name of the company), start date(Start date in the format 'YYYY-MM-DD'), and duration(number of days to fetch the data for).
 
     Returns:
         str: A string representation of the historical stock prices.
@@ -110,20 +117,21 @@ def get_historical_price(inputs: str) -> str:
     try:
         company_name, start_date, duration = inputs.split(",")
         company_name = company_name.strip()
-        start_date = start_date.strip()
+        start_date = datetime.datetime.strptime(start_date.strip(), "%Y-%m-%d").date()
         duration = duration.strip()
-        end_date = datetime.datetime.strptime(start_date, "%Y-%m-%d") + datetime.timedelta(days=int(duration))
+        end_date = start_date + datetime.timedelta(days=int(duration) - 1)
         ticker = get_ticker_from_company(company_name)
-        stock = yf.Ticker(ticker)
-        data = stock.history(start=start_date, end=end_date.strftime("%Y-%m-%d").split(" ")[0])
+        data = get_store().read(ticker, start_date, end_date)
 
         values = {}
-        for key, value in data["Close"].items():
-            # Extract the date portion from the key
-            date = str(key).split(" ")[0]
-            values[date] = f'{value:.2f}'
-
-        print("\nStock Prices (RPOWER.NS):")
+        for date, value in zip(data["date"], data["close"]):
+            values[str(date)] = f'{value:.2f}'
+        # Today's bar is not stored yet
+        latest = get_store().latest(ticker) if end_date >= datetime.date.today() else None
+        if latest and latest[0] >= start_date:
+            values[latest[0].isoformat()] = f'{latest[1]:.2f}'
+
+        print(f"\nStock Prices ({ticker}):")
         print("-" * 30)
         print("Date          | Price (INR)")
         print("-" * 30)
@@ -149,34 +157,97 @@ def get_current_price(company_name: str) -> str:
     """
     try:
         symbol = get_ticker_from_company(company_name)
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period='1d')
-        if not hist.empty:
-            return f"{hist['Close'].iloc[-1]:.2f}"
+        latest = get_store().latest(symbol)
+        if latest:
+            return f"{latest[1]:.2f}"
         return 'No data available'
     except Exception as e:
         return str(e)
 
+# 2b. Get Current Prices for several companies at once
+
+def _quote(company_name: str) -> Dict:
+    try:
+        symbol = get_ticker_from_company(company_name)
+        latest = get_store().latest(symbol)
+        if not latest:
+            return {"company": company_name, "symbol": symbol, "error": "No data available"}
+        date, price = latest
+        previous = get_store().read(symbol, date - datetime.timedelta(days=10), date - datetime.timedelta(days=1))
+        change = None
+        if len(previous["close"]):
+            change = (price - previous["close"][-1]) / previous["close"][-1] * 100
+        return {"company": company_name, "symbol": symbol, "price": price, "change": change, "date": date.isoformat()}
+    except Exception as e:
+        return {"company": company_name, "error": str(e)}
+
+def get_quotes(company_names: List[str]) -> List[Dict]:
+    """
+    Resolve and fetch the latest price of several companies concurrently.
+
+    Args:
+        company_names (List[str]): The names of the companies.
+
+    Returns:
+        List[Dict]: One dict per company, in input order, with symbol, price,
+        day change (%) and date, or an error message.
+    """
+    return http_pool.fan_out(_quote, company_names)
+
+@tool
+def get_current_prices(company_names: str) -> str:
+    """
+    Get the current prices of several stocks in one call. Prefer this over calling get_current_price repeatedly when comparing companies.
+
+    Args:
+        company_names (str): Comma separated company names, e.g. 'Infosys, TCS, Wipro, HCL Technologies'.
+
+    Returns:
+        str: A table with the symbol, price and day change of each company.
+    """
+    names = [name.strip() for name in company_names.split(",") if name.strip()]
+    if not names:
+        return "No company names provided"
+    lines = ["Company | Symbol | Price | Day change"]
+    for quote in get_quotes(names):
+        if "error" in quote:
+            lines.append(f"{quote['company']} | {quote.get('symbol', '-')} | {quote['error']} |")
+            continue
+        change = f"{quote['change']:+.2f}%" if quote["change"] is not None else "-"
+        lines.append(f"{quote['company']} | {quote['symbol']} | {quote['price']:.2f} | {change}")
+    return "\n".join(lines)
+
 # 3. Fetch Company Info
 @tool
 def get_company_info(company_name: str) -> str:
     """
-    Retrieve company information for a given ticker.
+    Retrieve company fundamentals (sector, valuation, margins, 52-week range, dividends) for a given company.
 
     Args:
         company_name (str): The name of the company.
 
     Returns:
-        str: A string representation of the company information.
+        str: The key fundamentals in a few short lines.
     """
     try:
         ticker = get_ticker_from_company(company_name)
-        stock = yf.Ticker(ticker)
-        return str(stock.info)
+        info = fundamentals.get(ticker)
+        if not fundamentals.found(info):
+            return f"No company information found for {ticker}"
+        return fundamentals.describe(info)
     except Exception as e:
         return str(e)
 
 # 4. Calculate Returns
+_DURATION_DAYS = {"d": 1, "w": 7, "m": 30, "mo": 30, "y": 365}
+
+def parse_duration(duration: str) -> datetime.timedelta:
+    """Turn durations like '1D', '2W', '6M', '6mo' or '5Y' into a timedelta."""
+    match = re.fullmatch(r"(\d+)\s*(d|w|mo|m|y)", duration.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid duration '{duration}', use values like '1D', '1W', '1M' or '1Y'")
+    return datetime.timedelta(days=int(match.group(1)) * _DURATION_DAYS[match.group(2)])
+
 @tool
 def evaluate_returns(inputs:str) -> str:
     """
@@ -184,7 +255,7 @@ def evaluate_returns(inputs:str) -> str:
 
     Args:
         inputs (str): A string containing the company name and duration (comma separated).
-        The duration can be like '1M', '1W', '1D'. Max 1 month data can be fetched.
+        The duration can be like '1D', '1W', '1M', '6M' or '5Y'.
 
     Returns:
         str: A string representation of the percentage change in stock price.
@@ -195,14 +266,20 @@ def evaluate_returns(inputs:str) -> str:
         duration = duration.strip()
 
         ticker = get_ticker_from_company(company_name)
-        stock = yf.Ticker(ticker)
-        data = stock.history(period=duration)
-        
-        if data.empty:
+        today = datetime.date.today()
+        data = get_store().read(ticker, today - parse_duration(duration), today)
+        latest = get_store().latest(ticker)
+
+        if not len(data["adj_close"]):
             return "No data available"
-            
-        first_close = data['Close'].iloc[0]
-        last_close = data['Close'].iloc[-1]
+
+        # Adjusted closes at both ends so splits and dividends inside the window
+        # don't distort the change; today's live bar only carries a raw close, so
+        # it extends the adjusted series by its move from the last stored close
+        first_close = data['adj_close'][0]
+        last_close = data['adj_close'][-1]
+        if latest and latest[0] > data['date'][-1].astype(datetime.date) and data['close'][-1]:
+            last_close *= latest[1] / data['close'][-1]
         percentage_change = ((last_close - first_close) / first_close * 100)
         
         return f"The stock price of {company_name} has changed by {percentage_change:.2f}% in the last {duration}"
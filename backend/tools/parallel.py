@@ -0,0 +1,230 @@
+"""
+Parallel tool calls and per-run tool-result memoization for the ReAct agent.
+
+`memoized(tool)` returns a copy of a tool whose results are remembered by
+(tool, normalised input) in the memo of the current run, so asking for the
+same company info twice in one answer only calls Yahoo once. Runs set their
+memo with `scope(...)`; a session memo also keeps its results for
+TOOL_MEMO_SESSION_TTL seconds in a SQLite file shared by all agent workers, so
+follow-up questions in the same session reuse them whichever worker answers.
+Live prices (LIVE_TOOLS) are only reused for TOOL_MEMO_LIVE_TTL seconds.
+
+`parallel_tool(tools)` is an extra action that lets the model request several
+independent tool calls in one step:
+
+    Action: parallel_tools
+    Action Input: [{"tool": "get_current_price", "input": "Cipla"}, {"tool": "get_company_info", "input": "Cipla"}]
+"""
+import contextvars
+import functools
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from langchain_core.tools import Tool
+
+import telemetry
+from caching import SQLiteCache, TTLCache, cache_dir, make_key, normalize_query
+
+# Results of these depend on when or how often they run
+UNCACHED_TOOLS = {"python_repl", "check_system_time"}
+# Results of these move with the market, so they are only reused briefly
+LIVE_TOOLS = {"get_current_price", "get_current_prices", "get_historical_price"}
+LIVE_TTL = float(os.environ.get("TOOL_MEMO_LIVE_TTL", "60"))
+SESSION_TTL = float(os.environ.get("TOOL_MEMO_SESSION_TTL", "900"))
+MAX_PARALLEL_CALLS = int(os.environ.get("MAX_PARALLEL_TOOL_CALLS", "8"))
+
+_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("PARALLEL_TOOL_WORKERS", "8")), thread_name_prefix="tool")
+_current = contextvars.ContextVar("tool_memo", default=None)
+_sessions = TTLCache(maxsize=256, ttl=SESSION_TTL)
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    """Session tool results shared by every agent worker process."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                path = os.environ.get("TOOL_MEMO_DB") or os.path.join(cache_dir(), "tool_memo.sqlite")
+                _shared = SQLiteCache(path, maxsize=int(os.environ.get("TOOL_MEMO_SIZE", "5000")), ttl=SESSION_TTL)
+    return _shared
+
+
+class ToolMemo:
+    """
+    Tool results of one run or session. Concurrent identical calls share one execution.
+
+    Args:
+        shared: Optional cache with get/set (e.g. SQLiteCache) the results are
+            also kept in, so other processes can reuse them.
+        namespace (str): Separates this memo's entries in `shared` (the session id).
+    """
+
+    def __init__(self, shared=None, namespace=None):
+        self._results = {}  # key: (Future, expiry as a monotonic time or None)
+        self._lock = threading.Lock()
+        self.shared = shared
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def call(self, key, fn, ttl=None):
+        """fn()'s result, reused for `ttl` seconds (None: as long as the memo lives)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._results.get(key)
+            owner = entry is None or (entry[1] is not None and entry[1] <= now)
+            if owner:
+                future = Future()
+                self._results[key] = (future, now + ttl if ttl is not None else None)
+            else:
+                future = entry[0]
+        if not owner:
+            self._count(True)
+            return future.result()
+
+        shared_key = make_key("tool_memo", self.namespace, key) if self.shared is not None else None
+        stored = self.shared.get(shared_key) if shared_key else None
+        self._count(stored is not None)
+        if stored is not None:
+            future.set_result(stored)
+            return stored
+        try:
+            result = fn()
+        except Exception as e:
+            # Failures are not remembered; the next call tries again
+            with self._lock:
+                if self._results.get(key, (None,))[0] is future:
+                    del self._results[key]
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        if shared_key and isinstance(result, str):
+            self.shared.set(shared_key, result, ttl)
+        return result
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        telemetry.cache_result("tool_memo", hit)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._results)}
+
+
+def session_memo(session_id=None):
+    """A fresh memo for a single run, or the shared memo of a session."""
+    if not session_id:
+        return ToolMemo()
+    memo = _sessions.get(session_id)
+    if memo is None:
+        memo = ToolMemo(shared_cache(), session_id)
+        _sessions.set(session_id, memo)
+    return memo
+
+
+@contextmanager
+def scope(memo):
+    """Memoize tool calls made inside the block (including from parallel_tools) in `memo`."""
+    token = _current.set(memo)
+    try:
+        yield memo
+    finally:
+        _current.reset(token)
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        # The model quotes inputs inconsistently ("Cipla", 'cipla', Cipla)
+        return normalize_query(value.strip().strip("'\"`"))
+    return value
+
+
+def memoized(tool):
+    """Copy of `tool` whose results are memoized in the current run's memo."""
+    func = getattr(tool, "func", None)
+    if tool.name in UNCACHED_TOOLS or func is None:
+        return tool
+    ttl = LIVE_TTL if tool.name in LIVE_TOOLS else None
+
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        memo = _current.get()
+        if memo is None:
+            return func(*args, **kwargs)
+        key = make_key(
+            tool.name,
+            [_normalize(a) for a in args],
+            {k: _normalize(v) for k, v in kwargs.items()},
+        )
+        return memo.call(key, lambda: func(*args, **kwargs), ttl)
+
+    return tool.model_copy(update={"func": call})
+
+
+def _parse_calls(text):
+    text = text.strip()
+    # Models sometimes wrap the list in a ```json fence
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    calls = json.loads(text)
+    if isinstance(calls, dict):
+        calls = [calls]
+    if not isinstance(calls, list) or not all(isinstance(c, dict) and "tool" in c for c in calls):
+        raise ValueError('expected a JSON list of {"tool": ..., "input": ...} objects')
+    return calls
+
+
+def parallel_tool(tools):
+    """
+    Build the `parallel_tools` action over `tools`.
+
+    Returns:
+        Tool: Runs up to MAX_PARALLEL_CALLS independent calls concurrently and
+        returns every result, labelled with its tool and input.
+    """
+    by_name = {t.name: t for t in tools}
+
+    def run_all(calls_json: str) -> str:
+        try:
+            calls = _parse_calls(calls_json)
+        except ValueError as e:
+            return f"Invalid parallel_tools input: {e}"
+        calls = calls[:MAX_PARALLEL_CALLS]
+
+        def run_one(call):
+            tool = by_name.get(call["tool"])
+            if tool is None:
+                return f"Unknown tool {call['tool']!r}; choose from {', '.join(by_name)}"
+            try:
+                return str(tool.run(call.get("input", "")))
+            except Exception as e:
+                return f"Error: {e}"
+
+        # Each call runs in a copy of this context so it sees the run's memo
+        futures = [_pool.submit(contextvars.copy_context().run, run_one, call) for call in calls]
+        results = []
+        for call, future in zip(calls, futures):
+            results.append(f"[{call['tool']}({call.get('input', '')})]\n{future.result()}")
+        return "\n\n".join(results)
+
+    return Tool(
+        name="parallel_tools",
+        description=(
+            "Runs several independent tool calls at the same time and returns all their results. "
+            "Use it instead of calling tools one by one when the calls do not depend on each other. "
+            'Input should be a JSON list like [{"tool": "get_current_price", "input": "Cipla"}, '
+            '{"tool": "get_company_info", "input": "Cipla"}].'
+        ),
+        func=run_all,
+    )
@@ -0,0 +1,291 @@
+"""
+Local daily price history store for the finance tools.
+
+Each symbol gets a directory under backend/.cache/prices holding one flat
+binary file per column (dates as int64 day numbers, OHLCV as float64) plus a
+meta.json with the date range already fetched from Yahoo. New days are
+appended to the column files; reads memory-map them and return zero-copy
+slices. Bars come from Yahoo's chart API (YAHOO_API_URL), with yfinance as a
+fallback. Only the parts of a requested range that were never fetched go to the
+network, so overlapping and repeated queries are served locally.
+
+Today's bar is still moving, so it is never persisted: `latest` fetches it
+live behind a short TTL cache.
+"""
+import datetime
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import requests
+import yfinance as yf
+
+import telemetry
+from caching import TTLCache, cache_dir
+from tools import http_pool
+from tools.ticker_index import HEADERS, YAHOO_API_URL
+
+try:
+    import fcntl
+except ImportError:  # Windows: only guard against other threads
+    fcntl = None
+
+COLUMNS = ("open", "high", "low", "close", "adj_close", "volume")
+_YF_COLUMNS = {
+    "open": "Open", "high": "High", "low": "Low",
+    "close": "Close", "adj_close": "Adj Close", "volume": "Volume",
+}
+_EPOCH = datetime.date(1970, 1, 1)
+
+
+def to_day(d: datetime.date) -> int:
+    return (d - _EPOCH).days
+
+
+def from_day(day: int) -> datetime.date:
+    return _EPOCH + datetime.timedelta(days=int(day))
+
+
+def _empty_bars():
+    return np.empty(0, dtype=np.int64), {c: np.empty(0) for c in COLUMNS}
+
+
+def fetch_chart(symbol, params):
+    """
+    Daily bars from Yahoo's chart API as (days, {column: values}).
+
+    Args:
+        symbol (str): Yahoo symbol, e.g. "CIPLA.NS".
+        params (dict): Query parameters: period1/period2 (epoch seconds) or range.
+    """
+    response = http_pool.get(
+        f"{YAHOO_API_URL}/v8/finance/chart/{symbol}",
+        params={"interval": "1d", "includeAdjustedClose": "true", **params},
+        headers=HEADERS,
+        timeout=10,
+    )
+    response.raise_for_status()
+    result = response.json()["chart"]["result"]
+    if not result or not result[0].get("timestamp"):
+        return _empty_bars()
+    result = result[0]
+    # Keep the exchange's local trading date, not the UTC one
+    offset = result["meta"].get("gmtoffset") or 0
+    days = (np.asarray(result["timestamp"], dtype=np.int64) + offset) // 86400
+    quote = result["indicators"]["quote"][0]
+    # Missing values come back as null, i.e. NaN here
+    columns = {c: np.asarray(quote[c], dtype=np.float64) for c in COLUMNS if c != "adj_close"}
+    adj = result["indicators"].get("adjclose")
+    columns["adj_close"] = np.asarray(adj[0]["adjclose"], dtype=np.float64) if adj else columns["close"]
+    keep = ~np.isnan(columns["close"])
+    return days[keep], {c: v[keep] for c, v in columns.items()}
+
+
+def _yfinance_bars(symbol, **history):
+    """Daily bars through yfinance, used when the chart API call fails."""
+    # yfinance keeps its own connections but shares the Yahoo limits
+    with http_pool.limited(http_pool.YAHOO):
+        data = yf.Ticker(symbol).history(interval="1d", auto_adjust=False, actions=False, **history)
+    if data.empty:
+        return _empty_bars()
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        # Keep the exchange's local trading date, not the UTC one
+        index = index.tz_localize(None)
+    days = index.values.astype("datetime64[D]").astype(np.int64)
+    columns = {}
+    for name in COLUMNS:
+        source = _YF_COLUMNS[name]
+        values = data[source] if source in data else data["Close"]
+        columns[name] = values.to_numpy(dtype=np.float64)
+    return days, columns
+
+
+def _fetch_yahoo(symbol, start, end):
+    """Fetch daily bars for [start, end] (inclusive) as (days, {column: values})."""
+    stop = end + datetime.timedelta(days=1)
+    with telemetry.span("yahoo_chart", "upstream"):
+        try:
+            return fetch_chart(symbol, {"period1": to_day(start) * 86400, "period2": to_day(stop) * 86400})
+        except (requests.RequestException, KeyError, IndexError, TypeError, ValueError) as e:
+            print(f"Yahoo chart API failed for {symbol} ({e}), trying yfinance")
+            return _yfinance_bars(symbol, start=start.isoformat(), end=stop.isoformat())
+
+
+def _fetch_latest(symbol):
+    with telemetry.span("yahoo_quote", "upstream"):
+        try:
+            return fetch_chart(symbol, {"range": "1d"})
+        except (requests.RequestException, KeyError, IndexError, TypeError, ValueError) as e:
+            print(f"Yahoo chart API failed for {symbol} ({e}), trying yfinance")
+            return _yfinance_bars(symbol, period="1d")
+
+
+class PriceStore:
+    """
+    Append-only, memory-mapped per-symbol store of daily OHLCV bars.
+
+    Args:
+        root (str): Directory holding one sub-directory per symbol.
+        fetch (callable): fetch(symbol, start, end) -> (days, columns); defaults to Yahoo.
+        live_ttl (float): Seconds today's live bar is cached for.
+    """
+
+    def __init__(self, root, fetch=None, live_ttl=60):
+        self.root = root
+        self.fetch = fetch or _fetch_yahoo
+        self.live = TTLCache(maxsize=1024, ttl=live_ttl)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _dir(self, symbol):
+        path = os.path.join(self.root, re.sub(r"[^A-Za-z0-9.&^-]", "_", symbol))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @contextmanager
+    def _locked(self, symbol):
+        with self._locks_guard:
+            lock = self._locks.setdefault(symbol, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            # Agent worker processes share the store, so also lock across processes
+            with open(os.path.join(self._dir(symbol), ".lock"), "w") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _meta(self, symbol):
+        path = os.path.join(self._dir(symbol), "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_meta(self, symbol, first, last):
+        path = os.path.join(self._dir(symbol), "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({"first": first, "last": last}, f)
+        os.replace(path + ".tmp", path)
+
+    def _path(self, symbol, column):
+        ext = "i8" if column == "date" else "f8"
+        return os.path.join(self._dir(symbol), f"{column}.{ext}")
+
+    def _columns(self, symbol):
+        """Memory-map every column of a symbol (read-only)."""
+        arrays = {}
+        for column in ("date",) + COLUMNS:
+            path = self._path(symbol, column)
+            dtype = np.int64 if column == "date" else np.float64
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                arrays[column] = np.empty(0, dtype=dtype)
+            else:
+                arrays[column] = np.memmap(path, dtype=dtype, mode="r")
+        # An interrupted append can leave some columns one write ahead
+        n = min(len(a) for a in arrays.values())
+        return {c: a[:n] for c, a in arrays.items()}
+
+    def _write(self, symbol, days, columns, prepend=False):
+        if prepend:
+            # Backfilling older history is rare; rewrite the files in that case
+            current = self._columns(symbol)
+            days = np.concatenate([days, current["date"]])
+            columns = {c: np.concatenate([columns[c], current[c]]) for c in COLUMNS}
+            del current
+        mode = "wb" if prepend else "ab"
+        for column, values in [("date", days)] + [(c, columns[c]) for c in COLUMNS]:
+            path = self._path(symbol, column)
+            with open(path + ".tmp" if prepend else path, mode) as f:
+                f.write(np.ascontiguousarray(values).tobytes())
+            if prepend:
+                os.replace(path + ".tmp", path)
+
+    def ensure(self, symbol, start, end):
+        """Fetch whatever part of [start, end] is not stored yet (up to yesterday)."""
+        end = min(end, datetime.date.today() - datetime.timedelta(days=1))
+        if start > end:
+            return
+        with self._locked(symbol):
+            meta = self._meta(symbol)
+            if meta is None:
+                days, columns = self.fetch(symbol, start, end)
+                if not len(days):
+                    # Nothing came back (an outage, or a holiday): try again next time
+                    return
+                self._write(symbol, days, columns)
+                self._save_meta(symbol, start.isoformat(), from_day(days[-1]).isoformat())
+                return
+
+            first = datetime.date.fromisoformat(meta["first"])
+            last = datetime.date.fromisoformat(meta["last"])
+            if start < first:
+                days, columns = self.fetch(symbol, start, first - datetime.timedelta(days=1))
+                keep = days < to_day(first)
+                self._write(symbol, days[keep], {c: v[keep] for c, v in columns.items()}, prepend=True)
+                first = start
+            if end > last:
+                days, columns = self.fetch(symbol, last + datetime.timedelta(days=1), end)
+                stored = self._columns(symbol)["date"]
+                keep = days > (stored[-1] if len(stored) else to_day(last))
+                self._write(symbol, days[keep], {c: v[keep] for c, v in columns.items()})
+                # Only as far as Yahoo actually returned bars, so a gap is fetched again later
+                if len(days):
+                    last = max(last, from_day(days[-1]))
+            self._save_meta(symbol, first.isoformat(), last.isoformat())
+
+    def read(self, symbol, start, end):
+        """
+        Return the stored bars for [start, end] as a dict of numpy arrays
+        ("date" as datetime64[D] plus the OHLCV columns). The arrays are
+        slices of the memory-mapped files, not copies.
+        """
+        self.ensure(symbol, start, end)
+        # A concurrent backfill replaces the column files one by one; map them all under the lock
+        with self._locked(symbol):
+            arrays = self._columns(symbol)
+        lo = np.searchsorted(arrays["date"], to_day(start), side="left")
+        hi = np.searchsorted(arrays["date"], to_day(end), side="right")
+        out = {c: arrays[c][lo:hi] for c in COLUMNS}
+        out["date"] = arrays["date"][lo:hi].view("datetime64[D]")
+        return out
+
+    def latest(self, symbol):
+        """
+        Return (date, close) for the most recent bar, including today's live one.
+        Returns None when Yahoo has no data for the symbol.
+        """
+        bar = self.live.get(symbol)
+        if bar is None:
+            days, columns = _fetch_latest(symbol)
+            if len(days):
+                bar = (from_day(days[-1]), float(columns["close"][-1]))
+            else:
+                today = datetime.date.today()
+                stored = self.read(symbol, today - datetime.timedelta(days=10), today)
+                if not len(stored["date"]):
+                    return None
+                bar = (stored["date"][-1].astype(datetime.date), float(stored["close"][-1]))
+            self.live.set(symbol, bar)
+        return bar
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> PriceStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PriceStore(cache_dir("prices"))
+    return _store
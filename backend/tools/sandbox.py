@@ -0,0 +1,150 @@
+"""
+Sandboxed Python execution for the agent's python_repl tool.
+
+Code runs in a pool of pre-forked interpreters (NumPy and pandas already
+imported by the forkserver) instead of inside the agent process. Every
+interpreter is limited with RLIMIT_CPU, RLIMIT_AS, RLIMIT_FSIZE and
+RLIMIT_NOFILE, works in its own scratch directory under SANDBOX_DIR, runs
+exactly one snippet and is then replaced, so a runaway or crashing
+calculation only ever takes down its own sandbox. Scratch directories are
+removed when their sandbox exits, or by the next call if it was killed.
+
+    SANDBOX_POOL_SIZE     warm interpreters kept ready (default 2)
+    SANDBOX_TIMEOUT       wall-clock seconds per call (default 15)
+    SANDBOX_CPU_SECONDS   CPU seconds per call (default 10)
+    SANDBOX_MEMORY_MB     extra address space per call (default 512)
+    SANDBOX_FILE_MB       largest file a call may write (default 64)
+    SANDBOX_OPEN_FILES    file descriptors a call may have open (default 64)
+    SANDBOX_DIR           parent of the scratch directories (default <tmp>/python-sandbox)
+"""
+import io
+import os
+import re
+import shutil
+import signal
+import tempfile
+import traceback
+from contextlib import redirect_stdout
+from multiprocessing import util
+
+from worker_pool import WorkerPool, WorkerError, WorkerTimeout
+
+POOL_SIZE = int(os.environ.get("SANDBOX_POOL_SIZE", "2"))
+TIMEOUT = float(os.environ.get("SANDBOX_TIMEOUT", "15"))
+CPU_SECONDS = int(os.environ.get("SANDBOX_CPU_SECONDS", "10"))
+MEMORY_MB = int(os.environ.get("SANDBOX_MEMORY_MB", "512"))
+FILE_MB = int(os.environ.get("SANDBOX_FILE_MB", "64"))
+OPEN_FILES = int(os.environ.get("SANDBOX_OPEN_FILES", "64"))
+ROOT = os.environ.get("SANDBOX_DIR") or os.path.join(tempfile.gettempdir(), "python-sandbox")
+MAX_OUTPUT = 10000
+
+
+def _limit_resources():
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return
+    # Limits are relative to what the preloaded interpreter already uses
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = int(usage.ru_utime + usage.ru_stime) + CPU_SECONDS
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    # Oversized writes fail with an OSError the snippet sees instead of killing the sandbox
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (FILE_MB * 1024 * 1024,) * 2)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (OPEN_FILES, OPEN_FILES))
+    try:
+        with open("/proc/self/statm") as f:
+            mapped = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        limit = mapped + MEMORY_MB * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (OSError, ValueError):
+        # No /proc (macOS) or RLIMIT_AS unsupported: rely on the CPU and wall-clock limits
+        pass
+
+
+def sandbox_setup():
+    import numpy
+    import pandas
+    os.makedirs(ROOT, exist_ok=True)
+    # Named after the pid so sweep() can tell whether its sandbox is still running
+    scratch = tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=ROOT)
+    os.chdir(scratch)
+    # Runs when the sandbox process exits normally; sweep() covers killed ones
+    util.Finalize(None, shutil.rmtree, args=(scratch, True), exitpriority=0)
+    _limit_resources()
+    return {"np": numpy, "numpy": numpy, "pd": pandas, "pandas": pandas}
+
+
+def sandbox_run(preloaded, command, emit):
+    namespace = {"__name__": "__main__", **preloaded}
+    out = io.StringIO()
+    try:
+        with redirect_stdout(out):
+            exec(command, namespace)
+    except MemoryError:
+        out.write(f"MemoryError: the calculation needed more than {MEMORY_MB} MB")
+    except Exception as e:
+        out.write("".join(traceback.format_exception_only(type(e), e)))
+    return out.getvalue()[:MAX_OUTPUT]
+
+
+def _running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def sweep():
+    """Remove the scratch directories of sandboxes that are no longer running."""
+    try:
+        names = os.listdir(ROOT)
+    except FileNotFoundError:
+        return
+    for name in names:
+        pid = name.split("-", 1)[0]
+        if pid.isdigit() and not _running(int(pid)):
+            shutil.rmtree(os.path.join(ROOT, name), ignore_errors=True)
+
+
+def sanitize(command: str) -> str:
+    """Strip the markdown fences and stray backticks models wrap code in."""
+    command = re.sub(r"^(\s|`)*(?i:python)?\s*", "", command)
+    return re.sub(r"(\s|`)*$", "", command)
+
+
+class SandboxREPL:
+    """Drop-in for langchain's PythonREPL that runs each command in a fresh sandbox."""
+
+    def __init__(self, size=POOL_SIZE, timeout=TIMEOUT):
+        self.pool = WorkerPool(
+            "tools.sandbox:sandbox_setup",
+            "tools.sandbox:sandbox_run",
+            size=size,
+            max_jobs=1,
+            timeout=timeout,
+            start_timeout=60,
+            start_method="forkserver",
+            name="python-sandbox",
+            # "__main__" too, so forked sandboxes do not each re-import the main script
+            preload=["__main__", "numpy", "pandas", "tools.sandbox"],
+        )
+        self.pool.start()
+        sweep()
+
+    def run(self, command: str) -> str:
+        try:
+            return self.pool.submit(sanitize(command))
+        except WorkerTimeout as e:
+            return f"Error: {e}. Use a smaller or faster calculation."
+        except WorkerError as e:
+            return (
+                f"Error: {e}. The calculation probably exceeded the {CPU_SECONDS}s CPU "
+                f"or {MEMORY_MB} MB memory limit."
+            )
+        finally:
+            # Sandboxes killed for running over their limits leave their directory behind
+            sweep()
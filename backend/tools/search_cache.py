@@ -0,0 +1,117 @@
+"""
+Cache for the agent's DuckDuckGo searches.
+
+Queries are reduced to a key of their significant words. Company and exchange
+names are kept, so "Bank of India news" and "Indian Bank news" stay apart;
+when part of a query is a name the ticker index knows exactly, that part is
+replaced by the symbol, so "Cipla share news" and "Cipla Pharmaceuticals news"
+share one entry. News-like queries
+expire after SEARCH_NEWS_TTL seconds (default 1 hour), everything else after
+SEARCH_EVERGREEN_TTL (default 7 days). Results are kept in memory and in a
+SQLite file that survives restarts and is shared by all agent workers; the
+file holds at most SEARCH_CACHE_SIZE results, least recently used first out.
+"""
+import os
+import re
+
+import telemetry
+from caching import SQLiteCache, TieredCache, TTLCache, cache_dir, make_key
+from tools.ticker_index import get_index, normalize_name
+
+NEWS_TTL = float(os.environ.get("SEARCH_NEWS_TTL", "3600"))
+EVERGREEN_TTL = float(os.environ.get("SEARCH_EVERGREEN_TTL", str(7 * 24 * 3600)))
+
+# Words that make a query time-sensitive
+NEWS_WORDS = {
+    "news", "latest", "today", "todays", "yesterday", "current", "currently", "now", "recent",
+    "update", "updates", "live", "breaking", "results", "earnings", "quarter", "q1", "q2", "q3",
+    "q4", "dividend", "announcement", "announces", "week", "month", "outlook", "forecast",
+}
+# Words that do not change what a search returns
+FILLER_WORDS = {
+    "a", "an", "and", "the", "of", "for", "in", "on", "about", "is", "are", "what", "whats", "how",
+    "to", "with", "latest", "recent", "current", "currently", "today", "todays", "now",
+}
+# Dropped next to a company name resolved to its symbol ("Cipla share news")
+TICKER_WORDS = {"share", "shares", "stock", "stocks"}
+# Longest run of words tried as a company name
+MAX_NAME_WORDS = 5
+
+# DuckDuckGoSearchRun's answer when nothing matched; not worth remembering
+NO_RESULTS = "No good DuckDuckGo Search Result was found"
+
+
+def _words(query: str):
+    return re.sub(r"[^a-z0-9 ]", " ", query.lower().replace("&", " and ").replace("'", "")).split()
+
+
+def query_words(query: str):
+    """Significant words of a search query, de-duplicated and sorted."""
+    words = _words(query)
+    return sorted({w for w in words if w not in FILLER_WORDS}) or sorted(set(words))
+
+
+def find_ticker(words, index=None):
+    """
+    The longest run of `words` the ticker index knows exactly.
+
+    Returns:
+        tuple: (symbol, the words outside that run), or (None, words).
+    """
+    index = index or get_index()
+    for size in range(min(MAX_NAME_WORDS, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            symbol = index.lookup(" ".join(words[start:start + size]), exact=True)
+            if symbol:
+                return symbol, words[:start] + words[start + size:]
+    return None, words
+
+
+def is_news_query(query: str) -> bool:
+    words = set(normalize_name(query).split())
+    return bool(words & NEWS_WORDS) or bool(re.search(r"\b20\d\d\b", query))
+
+
+def search_key(query: str, index=None) -> str:
+    symbol, rest = find_ticker(_words(query), index)
+    if symbol is None:
+        return make_key("ddg", is_news_query(query), query_words(query))
+    rest = sorted({w for w in rest if w not in FILLER_WORDS and w not in TICKER_WORDS})
+    return make_key("ddg", is_news_query(query), symbol, rest)
+
+
+def default_cache():
+    path = os.environ.get("SEARCH_CACHE_DB") or os.path.join(cache_dir(), "search.sqlite")
+    return TieredCache(
+        TTLCache(maxsize=256, ttl=NEWS_TTL),
+        SQLiteCache(path, maxsize=int(os.environ.get("SEARCH_CACHE_SIZE", "5000")), ttl=EVERGREEN_TTL),
+    )
+
+
+class CachedSearch:
+    """
+    Wraps a search client with a `run(query)` method.
+
+    Args:
+        client: The underlying search (e.g. DuckDuckGoSearchRun).
+        cache: Any cache with get/set(ttl=...)/stats; defaults to memory + SQLite.
+    """
+
+    def __init__(self, client, cache=None):
+        self.client = client
+        self.cache = cache if cache is not None else default_cache()
+
+    def run(self, query: str) -> str:
+        key = search_key(query)
+        result = self.cache.get(key)
+        telemetry.cache_result("search", result is not None)
+        if result is not None:
+            return result
+        with telemetry.span("duckduckgo", "upstream"):
+            result = self.client.run(query)
+        if result and not result.startswith(NO_RESULTS):
+            self.cache.set(key, result, NEWS_TTL if is_news_query(query) else EVERGREEN_TTL)
+        return result
+
+    def stats(self):
+        return self.cache.stats()
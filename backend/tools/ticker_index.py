@@ -0,0 +1,339 @@
+"""
+Company name -> Yahoo Finance ticker resolution.
+
+Lookups go through an in-memory LRU (with TTL), then a name->symbol index
+persisted on disk (seeded with common Indian equities), and only then the Yahoo
+search API. Every name resolved over the network is added to the index, so it
+is resolved locally from then on.
+
+Preload the index from the command line:
+    python -m tools.ticker_index preload [names.txt]
+    python -m tools.ticker_index lookup "Reliance Industries"
+"""
+import argparse
+import bisect
+import difflib
+import json
+import os
+import re
+import threading
+
+import telemetry
+from caching import TTLCache, cache_dir
+from tools import http_pool
+
+# Common NSE equities and indices, keyed by normalised name
+SEED_INDEX = {
+    "reliance": "RELIANCE.NS",
+    "reliance industries": "RELIANCE.NS",
+    "tata consultancy services": "TCS.NS",
+    "tcs": "TCS.NS",
+    "hdfc bank": "HDFCBANK.NS",
+    "icici bank": "ICICIBANK.NS",
+    "infosys": "INFY.NS",
+    "state bank of india": "SBIN.NS",
+    "sbi": "SBIN.NS",
+    "bharti airtel": "BHARTIARTL.NS",
+    "airtel": "BHARTIARTL.NS",
+    "itc": "ITC.NS",
+    "hindustan unilever": "HINDUNILVR.NS",
+    "hul": "HINDUNILVR.NS",
+    "larsen and toubro": "LT.NS",
+    "l and t": "LT.NS",
+    "kotak mahindra bank": "KOTAKBANK.NS",
+    "axis bank": "AXISBANK.NS",
+    "bajaj finance": "BAJFINANCE.NS",
+    "bajaj finserv": "BAJAJFINSV.NS",
+    "bajaj auto": "BAJAJ-AUTO.NS",
+    "asian paints": "ASIANPAINT.NS",
+    "maruti suzuki": "MARUTI.NS",
+    "maruti": "MARUTI.NS",
+    "hcl technologies": "HCLTECH.NS",
+    "hcl tech": "HCLTECH.NS",
+    "hcl": "HCLTECH.NS",
+    "wipro": "WIPRO.NS",
+    "tech mahindra": "TECHM.NS",
+    "sun pharmaceutical industries": "SUNPHARMA.NS",
+    "sun pharma": "SUNPHARMA.NS",
+    "cipla": "CIPLA.NS",
+    "cipla pharmaceuticals": "CIPLA.NS",
+    "dr reddys laboratories": "DRREDDY.NS",
+    "dr reddys": "DRREDDY.NS",
+    "divis laboratories": "DIVISLAB.NS",
+    "lupin": "LUPIN.NS",
+    "titan company": "TITAN.NS",
+    "titan": "TITAN.NS",
+    "ultratech cement": "ULTRACEMCO.NS",
+    "nestle india": "NESTLEIND.NS",
+    "power grid corporation of india": "POWERGRID.NS",
+    "power grid": "POWERGRID.NS",
+    "ntpc": "NTPC.NS",
+    "oil and natural gas corporation": "ONGC.NS",
+    "ongc": "ONGC.NS",
+    "coal india": "COALINDIA.NS",
+    "tata motors": "TATAMOTORS.NS",
+    "tata steel": "TATASTEEL.NS",
+    "tata power": "TATAPOWER.NS",
+    "tata consumer products": "TATACONSUM.NS",
+    "jsw steel": "JSWSTEEL.NS",
+    "hindalco industries": "HINDALCO.NS",
+    "hindalco": "HINDALCO.NS",
+    "grasim industries": "GRASIM.NS",
+    "adani enterprises": "ADANIENT.NS",
+    "adani ports and special economic zone": "ADANIPORTS.NS",
+    "adani ports": "ADANIPORTS.NS",
+    "mahindra and mahindra": "M&M.NS",
+    "eicher motors": "EICHERMOT.NS",
+    "hero motocorp": "HEROMOTOCO.NS",
+    "britannia industries": "BRITANNIA.NS",
+    "britannia": "BRITANNIA.NS",
+    "indusind bank": "INDUSINDBK.NS",
+    "sbi life insurance": "SBILIFE.NS",
+    "hdfc life insurance": "HDFCLIFE.NS",
+    "apollo hospitals enterprise": "APOLLOHOSP.NS",
+    "apollo hospitals": "APOLLOHOSP.NS",
+    "bharat petroleum corporation": "BPCL.NS",
+    "bpcl": "BPCL.NS",
+    "bharat electronics": "BEL.NS",
+    "shriram finance": "SHRIRAMFIN.NS",
+    "trent": "TRENT.NS",
+    "ltimindtree": "LTIM.NS",
+    "avenue supermarts": "DMART.NS",
+    "dmart": "DMART.NS",
+    "pidilite industries": "PIDILITIND.NS",
+    "dabur india": "DABUR.NS",
+    "godrej consumer products": "GODREJCP.NS",
+    "bank of baroda": "BANKBARODA.NS",
+    "punjab national bank": "PNB.NS",
+    "yes bank": "YESBANK.NS",
+    "vedanta": "VEDL.NS",
+    "reliance power": "RPOWER.NS",
+    "indian railway catering and tourism corporation": "IRCTC.NS",
+    "irctc": "IRCTC.NS",
+    "nifty": "^NSEI",
+    "nifty 50": "^NSEI",
+    "nifty bank": "^NSEBANK",
+    "bank nifty": "^NSEBANK",
+    "sensex": "^BSESN",
+}
+
+# Words that do not help to tell companies apart
+_NOISE_WORDS = {
+    "the", "ltd", "limited", "pvt", "private", "inc", "incorporated", "corp",
+    "co", "company", "plc", "share", "shares", "stock", "stocks", "price",
+}
+_EXCHANGE_WORDS = {"nse": ".NS", "bse": ".BO"}
+_SYMBOL_RE = re.compile(r"^[A-Z0-9&^-]+(\.(NS|BO))?$")
+
+# Base of the Yahoo Finance API; YAHOO_API_URL points it at a stand-in (see bench/fakes.py)
+YAHOO_API_URL = os.environ.get("YAHOO_API_URL", "https://query1.finance.yahoo.com").rstrip("/")
+SEARCH_URL = YAHOO_API_URL + "/v1/finance/search"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Referer': 'https://finance.yahoo.com/',
+    'Origin': 'https://finance.yahoo.com'
+}
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case a company name and drop punctuation and corporate suffixes."""
+    name = name.lower().replace("&", " and ").replace("'", "")
+    words = re.sub(r"[^a-z0-9 ]", " ", name).split()
+    return " ".join(w for w in words if w not in _NOISE_WORDS)
+
+
+def with_exchange(symbol: str, suffix: str) -> str:
+    """Switch an NSE/BSE listed symbol to the requested exchange suffix."""
+    if symbol.endswith((".NS", ".BO")):
+        return symbol[:-3] + suffix
+    return symbol
+
+
+def _search_yahoo(company_name: str) -> str:
+    params = {
+        "q": company_name, "lang": "en-US", "region": "US",
+        "quotesCount": 5, "newsCount": 0, "listsCount": 0, "enableFuzzyQuery": "false",
+    }
+    with telemetry.span("yahoo_search", "upstream"):
+        response = http_pool.get(SEARCH_URL, params=params, headers=HEADERS, timeout=10)
+    quotes = response.json().get("quotes", [])
+    if not quotes:
+        raise ValueError("Company name not found, try again by providing a valid company name.")
+    # Prefer the NSE listing, then BSE, then whatever Yahoo ranked first
+    for suffix in (".NS", ".BO"):
+        for quote in quotes:
+            if quote.get("symbol", "").endswith(suffix):
+                return quote["symbol"]
+    return quotes[0]["symbol"]
+
+
+class TickerIndex:
+    """
+    Persisted name->symbol index with an LRU+TTL cache in front of it.
+
+    Args:
+        path (str): JSON file backing the index.
+        cache_size (int): Entries kept in the in-memory LRU.
+        cache_ttl (float): Seconds an in-memory entry stays valid.
+    """
+
+    def __init__(self, path, cache_size=2048, cache_ttl=86400):
+        self.path = path
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._lock = threading.Lock()
+        self._names = dict(SEED_INDEX)
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._names.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Could not read ticker index {path}: {e}")
+        self._sorted = sorted(self._names)
+        self._symbols = set(self._names.values())
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name, symbol, save=True):
+        key = normalize_name(name)
+        if not key:
+            return
+        with self._lock:
+            if self._names.get(key) == symbol:
+                return
+            if key not in self._names:
+                bisect.insort(self._sorted, key)
+            self._names[key] = symbol
+            self._symbols.add(symbol)
+            if save:
+                self.save()
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._names, f, indent=0, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def lookup(self, name, exact=False):
+        """
+        Resolve a name from the local index only; returns None when unknown.
+        With `exact`, only a name the index holds (after normalising) matches,
+        not a symbol, a prefix or a near miss.
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self._names or exact:
+            return self._names.get(key)
+
+        symbol = name.strip().upper()
+        if _SYMBOL_RE.match(symbol):
+            if symbol in self._symbols:
+                return symbol
+            if symbol + ".NS" in self._symbols:
+                return symbol + ".NS"
+
+        # Prefix match, only when every candidate agrees on the symbol
+        if len(key) >= 3:
+            i = bisect.bisect_left(self._sorted, key)
+            candidates = set()
+            while i < len(self._sorted) and self._sorted[i].startswith(key):
+                candidates.add(self._names[self._sorted[i]])
+                i += 1
+            if len(candidates) == 1:
+                return candidates.pop()
+
+        # Fuzzy match for typos ("infosis", "tata steels")
+        close = difflib.get_close_matches(key, self._sorted, n=1, cutoff=0.85)
+        if close:
+            return self._names[close[0]]
+        return None
+
+    def resolve(self, company_name: str) -> str:
+        """
+        Resolve a company name to a ticker symbol, hitting the network only for
+        names the local index does not know.
+
+        Raises:
+            ValueError: If Yahoo does not know the company either.
+        """
+        words = normalize_name(company_name).split()
+        suffix = next((_EXCHANGE_WORDS[w] for w in words if w in _EXCHANGE_WORDS), None)
+        name = " ".join(w for w in words if w not in _EXCHANGE_WORDS) or company_name
+        cache_key = (name, suffix)
+
+        symbol = self.cache.get(cache_key)
+        if symbol is None:
+            symbol = self.lookup(name)
+            if symbol is None:
+                symbol = _search_yahoo(name)
+                self.add(name, symbol)
+            if suffix:
+                symbol = with_exchange(symbol, suffix)
+            self.cache.set(cache_key, symbol)
+        return symbol
+
+    def preload(self, names):
+        """Resolve names not yet in the index over the network and persist them."""
+        unknown = [name.strip() for name in names if name.strip() and not self.lookup(name.strip())]
+
+        def search(name):
+            try:
+                return _search_yahoo(name)
+            except Exception as e:
+                print(f"Could not resolve {name!r}: {e}")
+                return None
+
+        added = 0
+        # Concurrent, within the shared Yahoo rate limit
+        for name, symbol in zip(unknown, http_pool.fan_out(search, unknown)):
+            if symbol:
+                self.add(name, symbol, save=False)
+                added += 1
+        with self._lock:
+            self.save()
+        return added
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> TickerIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TickerIndex(
+                    os.path.join(cache_dir(), "ticker_index.json"),
+                    cache_size=int(os.environ.get("TICKER_CACHE_SIZE", "2048")),
+                    cache_ttl=float(os.environ.get("TICKER_CACHE_TTL", "86400")),
+                )
+    return _index
+
+
+def resolve(company_name: str) -> str:
+    return get_index().resolve(company_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the local ticker index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    preload = sub.add_parser("preload", help="resolve company names (one per line) into the index")
+    preload.add_argument("file", nargs="?", help="file with company names; defaults to only writing the seed index")
+    lookup = sub.add_parser("lookup", help="resolve one company name")
+    lookup.add_argument("name")
+    args = parser.parse_args()
+
+    index = get_index()
+    if args.command == "preload":
+        names = []
+        if args.file:
+            with open(args.file) as f:
+                names = f.read().splitlines()
+        added = index.preload(names)
+        print(f"Added {added} names, index now has {len(index)} entries at {index.path}")
+    else:
+        print(index.resolve(args.name))
@@ -0,0 +1,275 @@
+"""
+Pool of long-lived worker processes.
+
+Each worker imports its setup function once (e.g. building the LangChain
+AgentExecutor in agent.py), then serves jobs sent to it over a pipe until it
+has handled `max_jobs` jobs, after which it is recycled. Jobs and results are
+plain picklable objects, so callers never have to scrape stdout. Handlers can
+also emit progress events while a job runs; `WorkerPool.stream` yields them
+as they arrive.
+
+Setup and handler functions are given as "module:function" strings so the
+parent process never has to import the (heavy) worker modules itself.
+"""
+import atexit
+import importlib
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import threading
+import time
+import traceback
+
+
+class WorkerError(Exception):
+    """The job raised inside the worker process, or the worker died."""
+
+
+class WorkerTimeout(WorkerError):
+    """No worker became available, or the job did not finish, in time."""
+
+
+def _resolve(path):
+    module_name, func_name = path.split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _worker_main(conn, setup_path, handler_path):
+    try:
+        state = _resolve(setup_path)() if setup_path else None
+        handler = _resolve(handler_path)
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}", traceback.format_exc()))
+        return
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            payload = conn.recv()
+        except (EOFError, OSError):
+            break
+        if payload is None:
+            break
+        emit = lambda event: conn.send(("event", event))
+        try:
+            conn.send(("result", handler(state, payload, emit)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}", traceback.format_exc()))
+
+
+class _Worker:
+    def __init__(self, ctx, setup_path, handler_path, name):
+        self.conn, child_conn = ctx.Pipe()
+        # Not daemonic: workers may need to start processes of their own.
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, setup_path, handler_path),
+            name=name,
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def wait_ready(self, timeout):
+        if not self.conn.poll(timeout):
+            raise WorkerTimeout(f"worker {self.process.name} did not start within {timeout}s")
+        msg = self.conn.recv()
+        if msg[0] != "ready":
+            raise WorkerError(f"worker {self.process.name} failed to start: {msg[1]}")
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def stop(self, timeout=2):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    A fixed-size pool of warm worker processes.
+
+    Args:
+        setup (str): "module:function" called once per worker; its return value
+            is passed to every job as `state`.
+        handler (str): "module:function" called as handler(state, payload, emit)
+            per job; `emit(event)` streams a progress event back to the caller.
+        size (int): Number of worker processes.
+        max_jobs (int): Jobs a worker serves before it is replaced by a fresh one.
+        timeout (float): Default per-job timeout in seconds.
+        start_timeout (float): How long a worker may take to run `setup`.
+        start_method (str): multiprocessing start method.
+        name (str): Prefix for worker process names.
+        preload (list): Modules the forkserver imports once, so workers forked
+            from it start with them already loaded (forkserver only).
+    """
+
+    def __init__(self, setup, handler, size=2, max_jobs=50, timeout=120,
+                 start_timeout=120, start_method="spawn", name="worker", preload=()):
+        self.setup = setup
+        self.handler = handler
+        self.size = size
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.name = name
+        self._ctx = mp.get_context(start_method)
+        if preload and start_method == "forkserver":
+            self._ctx.set_forkserver_preload(list(preload))
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._spawned = 0
+        self._closed = False
+        atexit.register(self.shutdown)
+
+    def start(self):
+        """Spawn workers up to `size` without waiting for them to become ready."""
+        with self._lock:
+            missing = self.size - self._live
+            self._live += missing
+        for _ in range(missing):
+            self._spawn()
+
+    def _spawn(self):
+        self._spawned += 1
+        name = f"{self.name}-{self._spawned}"
+
+        def boot():
+            try:
+                worker = _Worker(self._ctx, self.setup, self.handler, name)
+                worker.wait_ready(self.start_timeout)
+            except Exception as e:
+                print(f"Worker {name} failed to start: {e}")
+                with self._lock:
+                    self._live -= 1
+                return
+            if self._closed:
+                worker.stop()
+                return
+            self._idle.put(worker)
+
+        threading.Thread(target=boot, name=f"{name}-boot", daemon=True).start()
+
+    def _checkout(self, timeout):
+        self.start()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerTimeout(f"no {self.name} available")
+            try:
+                worker = self._idle.get(timeout=min(remaining, 1.0))
+            except queue.Empty:
+                # Replace workers that failed to boot.
+                self.start()
+                continue
+            if worker.alive():
+                return worker
+            self._retire(worker, kill=True)
+
+    def _retire(self, worker, kill=False):
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        with self._lock:
+            self._live -= 1
+        if not self._closed:
+            self.start()
+
+    def _checkin(self, worker):
+        if self._closed or not worker.alive() or worker.jobs >= self.max_jobs:
+            threading.Thread(target=self._retire, args=(worker,), daemon=True).start()
+        else:
+            self._idle.put(worker)
+
+    def submit(self, payload, timeout=None):
+        """
+        Run one job on a warm worker and return the handler's result.
+
+        Raises:
+            WorkerTimeout: If the job does not complete within `timeout` seconds.
+            WorkerError: If the handler raised or the worker died.
+        """
+        for kind, value in self._run(payload, timeout):
+            if kind == "result":
+                return value
+
+    def stream(self, payload, timeout=None):
+        """
+        Run one job and yield ("event", event) for every event the handler emits,
+        followed by ("result", result). Raises like `submit`.
+        """
+        yield from self._run(payload, timeout)
+
+    def _run(self, payload, timeout):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        worker = self._checkout(timeout)
+        worker.jobs += 1
+        try:
+            try:
+                worker.conn.send(payload)
+            except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+                # A dead worker's pipe, or a payload that cannot be pickled
+                self._retire(worker, kill=True)
+                worker = None
+                raise WorkerError(f"could not send the job to the worker: {e}") from e
+            while True:
+                if not worker.conn.poll(max(deadline - time.monotonic(), 0)):
+                    self._retire(worker, kill=True)
+                    worker = None
+                    raise WorkerTimeout(f"job timed out after {timeout}s")
+                try:
+                    msg = worker.conn.recv()
+                except EOFError:
+                    self._retire(worker, kill=True)
+                    worker = None
+                    raise WorkerError("worker exited while running the job")
+                if msg[0] == "event":
+                    yield msg
+                    continue
+                self._checkin(worker)
+                worker = None
+                if msg[0] == "error":
+                    raise WorkerError(msg[1])
+                yield msg
+                return
+        finally:
+            if worker is not None:
+                # The caller stopped listening mid-job; let the job finish in
+                # the background so the warm worker is not thrown away.
+                threading.Thread(target=self._drain, args=(worker, deadline), daemon=True).start()
+
+    def _drain(self, worker, deadline):
+        try:
+            while worker.conn.poll(max(deadline - time.monotonic(), 0)):
+                if worker.conn.recv()[0] != "event":
+                    self._checkin(worker)
+                    return
+        except (EOFError, OSError):
+            pass
+        self._retire(worker, kill=True)
+
+    def shutdown(self):
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
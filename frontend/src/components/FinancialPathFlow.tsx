@@ -1,5 +1,4 @@
 import { useCallback, useState, useRef, useEffect } from 'react';
-import axios from 'axios';
 import {
   ReactFlow,
   Controls,
@@ -176,52 +175,94 @@ const FinancialPathFlow = () => {
     setActiveTab(strategy);
   };
 
+  const styleNode = (node: FlowNode) => ({
+    ...node,
+    className: `${node.style.background} border-2 ${node.style.border} rounded-lg p-4 text-center font-medium`,
+    data: {
+      ...node.data,
+      label: (node.data as { label: string }).label.replace('â‚¹', '₹')
+    }
+  });
+
+  const styleEdge = (edge: FlowEdge) => ({
+    ...edge,
+    className: edge.style.stroke,
+    source: edge.source,
+    target: edge.target,
+    label: edge.label
+  });
+
   const handleGenerate = async () => {
     if (!activeTab) return;
     
     setIsGenerating(true);
     setShowFlowchart(false);
+    setNodes([]);
+    setEdges([]);
     
     try {
       const formData = new FormData();
       formData.append('input', userInput || 'I\'m looking for a low-risk investment strategy to preserve my capital. I prefer stable returns and want to invest ₹1 lakh for 3-5 years. Safety is my primary concern.');
       formData.append('risk', activeTab);
 
-      const config = {
-        method: 'post',
-        maxBodyLength: Infinity,
-        url: `${SERVER_URL}/ai-financial-path`,
-        data: formData
-      };
+      // Nodes and edges arrive as server-sent events: the local graph at once, then,
+      // if the server's FIN_PATH_MODE is enrich or llm, Gemini's as it is generated
+      const response = await fetch(`${SERVER_URL}/ai-financial-path/stream`, {
+        method: 'POST',
+        body: formData
+      });
+      if (!response.ok || !response.body) {
+        throw new Error(`Server responded with ${response.status}`);
+      }
 
-      const response = await axios.request(config);
-      const data: ServerResponse = response.data;
-      setServerData(data);
-      
-      // Update nodes and edges with styles
-      setNodes(data.nodes.map(node => ({
-        ...node,
-        className: `${node.style.background} border-2 ${node.style.border} rounded-lg p-4 text-center font-medium`,
-        data: {
-          ...node.data,
-          label: (node.data as { label: string }).label.replace('â‚¹', '₹')
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let shown = false;
+
+      const handleEvent = (event: string, data: any) => {
+        if (event === 'source') {
+          // The server switched to another source; start the graph over
+          setNodes([]);
+          setEdges([]);
+        } else if (event === 'node') {
+          setNodes((nds: any) => [...nds, styleNode(data)]);
+          if (!shown) {
+            shown = true;
+            setServerData({ nodes: [], edges: [] });
+            setShowFlowchart(true);
+            // Add a small delay to ensure the flowchart is rendered before scrolling
+            setTimeout(() => {
+              flowchartRef.current?.scrollIntoView({ behavior: 'smooth', block: 'start' });
+            }, 100);
+          }
+        } else if (event === 'edge') {
+          setEdges((eds: any) => [...eds, styleEdge(data)]);
+        } else if (event === 'done') {
+          // Nodes sent early were placed for the graph so far; settle on the final layout
+          setServerData(data.graph);
+          setNodes(data.graph.nodes.map(styleNode));
+          setEdges(data.graph.edges.map(styleEdge));
+        } else if (event === 'error') {
+          throw new Error(data.error);
         }
-      })));
-      
-      setEdges(data.edges.map(edge => ({
-        ...edge,
-        className: edge.style.stroke,
-        source: edge.source,
-        target: edge.target,
-        label: edge.label
-      })));
-      
-      setShowFlowchart(true);
+      };
 
-      // Add a small delay to ensure the flowchart is rendered before scrolling
-      setTimeout(() => {
-        flowchartRef.current?.scrollIntoView({ behavior: 'smooth', block: 'start' });
-      }, 100);
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const message = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const event = message.match(/^event: (.*)$/m)?.[1];
+          const data = message.match(/^data: (.*)$/m)?.[1];
+          if (event && data) {
+            handleEvent(event, JSON.parse(data));
+          }
+        }
+      }
       
     } catch (error) {
       console.error('Error generating pathway:', error);
@@ -360,7 +401,7 @@ const FinancialPathFlow = () => {
       </div>
 
       {/* Loading State */}
-      {isGenerating && (
+      {isGenerating && !showFlowchart && (
         <div className="bg-white dark:bg-gray-800 rounded-2xl shadow-xl p-10 text-center max-w-2xl mx-auto">
           <div className="animate-spin rounded-full h-16 w-16 border-4 border-indigo-600 dark:border-indigo-400 border-t-transparent mx-auto"></div>
           <h3 className="mt-6 text-xl font-semibold text-gray-900 dark:text-white">Creating Your Personalized Investment Pathway</h3>